@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestion_taches.settings')
 
+# /api/evenements/ (Server-Sent Events) garde une tâche asyncio par client connecté :
+# servir ce module avec un serveur ASGI (uvicorn, daphne) plutôt qu'en WSGI
 application = get_asgi_application()
@@ -0,0 +1,73 @@
+"""Profils de base de données, choisis par variables d'environnement.
+
+DB_PROFIL=sqlite (défaut)
+    SQLite en WAL, synchronous=NORMAL, mmap, busy_timeout et une connexion
+    persistante par worker. DB_NOM change le fichier.
+DB_PROFIL=postgresql
+    DB_NOM, DB_UTILISATEUR, DB_MOT_DE_PASSE, DB_HOTE, DB_PORT.
+    DB_POOL=1 active le pool de connexions de psycopg (Django >= 5.1),
+    sinon les connexions sont persistantes (DB_CONN_MAX_AGE, 60 s par défaut).
+    Dans les deux cas les connexions sont vérifiées avant réutilisation.
+DB_PROFIL=sqlite-simple
+    L'ancienne configuration (journal par défaut, une connexion par requête).
+"""
+import os
+
+# PRAGMA exécutés à l'ouverture de chaque connexion SQLite
+PRAGMAS_SQLITE = (
+    'PRAGMA journal_mode=WAL;'
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA mmap_size=268435456;'   # 256 Mo
+    'PRAGMA busy_timeout=5000;'
+    'PRAGMA temp_store=MEMORY;'
+    'PRAGMA foreign_keys=ON;'
+)
+
+
+def configuration_base(base_dir, env=os.environ):
+    profil = env.get('DB_PROFIL', 'sqlite')
+
+    if profil == 'sqlite-simple':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env.get('DB_NOM', base_dir / 'db.sqlite3'),
+        }
+
+    if profil == 'sqlite':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env.get('DB_NOM', base_dir / 'db.sqlite3'),
+            # une connexion par thread de worker, gardée entre les requêtes
+            'CONN_MAX_AGE': None,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'init_command': PRAGMAS_SQLITE,
+                # verrou d'écriture pris dès le début de la transaction :
+                # pas d'échec « database is locked » à la promotion lecture -> écriture
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 5,
+            },
+        }
+
+    if profil == 'postgresql':
+        pool = env.get('DB_POOL', '0') == '1'
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': env.get('DB_NOM', 'gestion_taches'),
+            'USER': env.get('DB_UTILISATEUR', ''),
+            'PASSWORD': env.get('DB_MOT_DE_PASSE', ''),
+            'HOST': env.get('DB_HOTE', 'localhost'),
+            'PORT': env.get('DB_PORT', '5432'),
+            # le pool de psycopg remplace les connexions persistantes
+            'CONN_MAX_AGE': 0 if pool else int(env.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(env.get('DB_POOL_MIN', 2)),
+                    'max_size': int(env.get('DB_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            } if pool else {},
+        }
+
+    raise ValueError(f"DB_PROFIL inconnu : {profil!r} (sqlite, sqlite-simple ou postgresql)")
@@ -0,0 +1,215 @@
+"""Cache des réponses de liste, par utilisateur et par version des données.
+
+La clé contient la version de l'utilisateur (utilisateurs.versions) : dès
+qu'un signal sur Projet, Tache ou Utilisateur l'incrémente, les anciennes
+entrées deviennent inaccessibles et sont supprimées par invalider().
+"""
+import abc
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class CacheReponsesBase(abc.ABC):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._verrou_stats = threading.Lock()
+
+    def compter(self, hit):
+        with self._verrou_stats:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def statistiques(self):
+        return {'backend': type(self).__name__, 'hits': self.hits, 'misses': self.misses}
+
+    @abc.abstractmethod
+    def get(self, cle):
+        """Réponse sérialisée (octets) enregistrée sous cette clé, ou None."""
+
+    @abc.abstractmethod
+    def set(self, cle, portee, valeur):
+        """Enregistre la réponse ; portee regroupe les entrées supprimées ensemble par invalider()."""
+
+    @abc.abstractmethod
+    def invalider(self, portees):
+        """Supprime les entrées de ces portées."""
+
+    @abc.abstractmethod
+    def vider(self):
+        """Supprime toutes les entrées."""
+
+
+class CacheMemoire(CacheReponsesBase):
+    """Cache LRU en mémoire du processus, borné en octets."""
+
+    def __init__(self, taille_max=32 * 1024 * 1024):
+        super().__init__()
+        self.taille_max = taille_max
+        self.taille = 0
+        self._entrees = OrderedDict()  # cle -> (portee, valeur)
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                self._entrees.move_to_end(cle)
+        self.compter(entree is not None)
+        return entree and entree[1]
+
+    def set(self, cle, portee, valeur):
+        if len(valeur) > self.taille_max:
+            return
+        with self._verrou:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self.taille -= len(ancienne[1])
+            self._entrees[cle] = (portee, valeur)
+            self.taille += len(valeur)
+            while self.taille > self.taille_max:
+                _, (_, retiree) = self._entrees.popitem(last=False)
+                self.taille -= len(retiree)
+
+    def invalider(self, portees):
+        with self._verrou:
+            for cle in [cle for cle, (portee, _) in self._entrees.items() if portee in portees]:
+                self.taille -= len(self._entrees.pop(cle)[1])
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+            self.taille = 0
+
+    def statistiques(self):
+        return {**super().statistiques(), 'entrees': len(self._entrees), 'octets': self.taille}
+
+
+class CacheSQLite(CacheReponsesBase):
+    """Cache dans un fichier SQLite, partagé par tous les workers d'une machine."""
+
+    def __init__(self, chemin=None, taille_max=256 * 1024 * 1024):
+        super().__init__()
+        self.chemin = str(chemin or settings.BASE_DIR / 'cache_reponses.sqlite3')
+        self.taille_max = taille_max
+        self._local = threading.local()
+
+    @property
+    def connexion(self):
+        # une connexion par thread
+        connexion = getattr(self._local, 'connexion', None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin, timeout=5, isolation_level=None)
+            connexion.execute('PRAGMA journal_mode=WAL')
+            connexion.execute('PRAGMA synchronous=NORMAL')
+            connexion.execute(
+                'CREATE TABLE IF NOT EXISTS reponses ('
+                'cle TEXT PRIMARY KEY, portee TEXT NOT NULL, valeur BLOB NOT NULL, '
+                'taille INTEGER NOT NULL, date_ajout REAL NOT NULL)'
+            )
+            connexion.execute('CREATE INDEX IF NOT EXISTS reponses_portee ON reponses (portee)')
+            connexion.execute('CREATE INDEX IF NOT EXISTS reponses_date_ajout ON reponses (date_ajout)')
+            self._local.connexion = connexion
+        return connexion
+
+    def get(self, cle):
+        ligne = self.connexion.execute('SELECT valeur FROM reponses WHERE cle = ?', (cle,)).fetchone()
+        self.compter(ligne is not None)
+        return ligne and ligne[0]
+
+    def set(self, cle, portee, valeur):
+        if len(valeur) > self.taille_max:
+            return
+        connexion = self.connexion
+        connexion.execute(
+            'INSERT OR REPLACE INTO reponses (cle, portee, valeur, taille, date_ajout) VALUES (?, ?, ?, ?, ?)',
+            (cle, portee, valeur, len(valeur), time.time()),
+        )
+        # éviction des entrées les plus anciennes au-delà de la taille maximale
+        (taille,) = connexion.execute('SELECT COALESCE(SUM(taille), 0) FROM reponses').fetchone()
+        if taille > self.taille_max:
+            connexion.execute(
+                'DELETE FROM reponses WHERE cle IN ('
+                ' SELECT cle FROM (SELECT cle, taille, SUM(taille) OVER (ORDER BY date_ajout) AS cumul FROM reponses)'
+                ' WHERE cumul - taille < ?)',
+                (taille - self.taille_max,),
+            )
+
+    def invalider(self, portees):
+        portees = list(portees)
+        self.connexion.execute(
+            f"DELETE FROM reponses WHERE portee IN ({', '.join('?' * len(portees))})", portees
+        )
+
+    def vider(self):
+        self.connexion.execute('DELETE FROM reponses')
+
+    def statistiques(self):
+        entrees, octets = self.connexion.execute(
+            'SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM reponses'
+        ).fetchone()
+        return {**super().statistiques(), 'entrees': entrees, 'octets': octets}
+
+
+def _creer_cache():
+    config = getattr(settings, 'CACHE_REPONSES', {})
+    if not config.get('ACTIF', True):
+        return None
+    backend = import_string(config.get('BACKEND', 'gestion_taches.cache_reponses.CacheMemoire'))
+    return backend(**config.get('OPTIONS', {}))
+
+
+cache_reponses = _creer_cache()
+
+
+def invalider(portees):
+    if cache_reponses is not None:
+        cache_reponses.invalider(set(portees))
+
+
+class CacheListeMixin:
+    """Met en cache le résultat de list() par utilisateur, URL et version des données."""
+
+    def list(self, request, *args, **kwargs):
+        # import local : utilisateurs.versions importe ce module pour invalider()
+        from utilisateurs.versions import cle_version, version_de_requete
+
+        if cache_reponses is None:
+            return super().list(request, *args, **kwargs)
+
+        portee = cle_version(request.user)
+        version, _ = version_de_requete(request)
+        cle = f"{portee}|{version}|{request.user.pk}|{request.build_absolute_uri()}"
+
+        valeur = cache_reponses.get(cle)
+        if valeur is not None:
+            reponse = Response(pickle.loads(valeur))
+            reponse['X-Cache'] = 'HIT'
+            return reponse
+
+        reponse = super().list(request, *args, **kwargs)
+        if reponse.status_code == 200:
+            cache_reponses.set(cle, portee, pickle.dumps(reponse.data, protocol=pickle.HIGHEST_PROTOCOL))
+        reponse['X-Cache'] = 'MISS'
+        return reponse
+
+
+# compteurs du cache, réservés aux administrateurs
+class StatistiquesCacheView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        if cache_reponses is None:
+            return Response({'actif': False})
+        return Response({'actif': True, **cache_reponses.statistiques()})
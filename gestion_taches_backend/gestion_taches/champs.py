@@ -0,0 +1,122 @@
+"""Champs à la demande (?fields=) et relations incluses (?expand=) sur les lectures.
+
+``?fields=id,nom,statut`` ne renvoie que ces champs et ne lit que leurs
+colonnes (only()). ``?expand=projet,assignee`` remplace les ids par les objets,
+chargés par select_related() (clés étrangères) ou prefetch_related() (relations
+inverses) : une liste étendue garde un nombre constant de requêtes.
+
+Les serializers déclarent leurs relations extensibles dans
+``Meta.expansions = {'projet': Expansion('projets.serializers.ProjetSerializer')}``.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+
+class Expansion:
+    def __init__(self, serializer):
+        # chemin en texte pour éviter les imports circulaires entre applications
+        self._serializer = serializer
+
+    @property
+    def serializer(self):
+        if isinstance(self._serializer, str):
+            self._serializer = import_string(self._serializer)
+        return self._serializer
+
+
+def _liste(valeur):
+    return [nom.strip() for nom in valeur.split(',') if nom.strip()]
+
+
+def colonnes(serializer, prefixe=''):
+    """Champs du modèle lus par le serializer, ou None si l'un d'eux n'est pas une colonne."""
+    modele = serializer.Meta.model
+    resultat = set()
+    for champ in serializer.fields.values():
+        if champ.source == '*':
+            return None
+        try:
+            champ_modele = modele._meta.get_field(champ.source)
+        except FieldDoesNotExist:
+            return None
+        if champ_modele.concrete:
+            resultat.add(prefixe + champ_modele.name)
+    return resultat
+
+
+class ChampsDynamiquesMixin:
+    """Serializer qui accepte champs=[...] et expand=[...] à la construction."""
+
+    def __init__(self, *args, champs=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for nom in expand:
+            relation = self.Meta.model._meta.get_field(nom)
+            self.fields[nom] = self.Meta.expansions[nom].serializer(
+                read_only=True, many=relation.one_to_many or relation.many_to_many)
+        if champs is not None:
+            for nom in set(self.fields) - set(champs) - set(expand):
+                self.fields.pop(nom)
+
+
+class ChampsDynamiquesVueMixin:
+    """Lit ?fields= et ?expand= sur list/retrieve/export et adapte serializer et queryset."""
+
+    actions_champs_dynamiques = ('list', 'retrieve', 'export')
+
+    def champs_demandes(self):
+        if self.action not in self.actions_champs_dynamiques:
+            return None, ()
+        if not hasattr(self, '_champs_demandes'):
+            parametres = self.request.query_params
+            classe = self.get_serializer_class()
+            champs = _liste(parametres['fields']) if 'fields' in parametres else None
+            expand = tuple(dict.fromkeys(_liste(parametres.get('expand', ''))))
+
+            inconnus = [nom for nom in expand if nom not in getattr(classe.Meta, 'expansions', {})]
+            if inconnus:
+                raise ValidationError({'expand': f"Relations non extensibles : {', '.join(inconnus)}."})
+            if champs is not None:
+                inconnus = [nom for nom in champs if nom not in classe().fields and nom not in expand]
+                if inconnus:
+                    raise ValidationError({'fields': f"Champs inconnus : {', '.join(inconnus)}."})
+            self._champs_demandes = champs, expand
+        return self._champs_demandes
+
+    def get_serializer(self, *args, **kwargs):
+        champs, expand = self.champs_demandes()
+        if champs is not None or expand:
+            kwargs.update(champs=champs, expand=expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        champs, expand = self.champs_demandes()
+        if champs is None and not expand:
+            return queryset
+
+        modele = queryset.model
+        serializer = self.get_serializer_class()(champs=champs)
+        lues = colonnes(serializer)
+        jointures, prefetch = [], []
+        for nom in expand:
+            relation = modele._meta.get_field(nom)
+            if relation.many_to_one or relation.one_to_one:
+                jointures.append(nom)
+                if lues is not None:
+                    lues.add(nom)
+                    lues_relation = colonnes(self.get_serializer_class().Meta.expansions[nom].serializer(), f'{nom}__')
+                    lues = None if lues_relation is None else lues | lues_relation
+            else:
+                prefetch.append(nom)
+        if jointures:
+            queryset = queryset.select_related(*jointures)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+
+        if lues is not None:
+            # clé primaire et champs de tri (curseur de pagination compris) restent chargés
+            tri = [*queryset.query.order_by, *getattr(self.paginator, 'ordering', ())]
+            lues |= {'pk'} | {champ.lstrip('-') for champ in tri if isinstance(champ, str)}
+            queryset = queryset.only(*lues)
+        return queryset
@@ -0,0 +1,231 @@
+"""Diffusion en temps réel des modifications (Server-Sent Events sur /api/evenements/).
+
+Les signaux de Projet et Tache publient chaque événement après le commit,
+adressé aux mêmes clés que les versions de données : 'u:<id>' pour chaque
+utilisateur qui voit l'objet et 'tout' pour les superusers. Chaque connexion
+ouverte est abonnée à sa clé dans le courtier du processus.
+
+BrokerMemoire ne diffuse qu'aux connexions du processus. BrokerLocal relaie
+en plus chaque événement aux autres workers de la machine par des sockets Unix
+en datagrammes (un socket par processus dans un dossier commun), sans service
+externe. Le dossier (``BASE_DIR/evenements`` par défaut) est réservé au compte
+du serveur (mode 0700, propriétaire vérifié) : aucun autre compte de la machine
+ne peut y déposer de socket ni envoyer d'événement.
+
+Les connexions sont tenues par la boucle asyncio du serveur ASGI (une tâche par
+connexion, aucun thread). Sous WSGI (runserver sans daphne), Django lirait le
+flux en entier avant de répondre, c'est-à-dire jamais : la vue répond alors 501.
+
+EventSource ne sait pas envoyer d'en-tête : le navigateur demande d'abord un
+ticket (POST /api/evenements/ticket/, à usage unique, valable ``TICKET_TTL``
+secondes) et le passe en ?ticket=, plutôt que le jeton d'accès qui finirait dans
+les journaux des proxys.
+
+Une connexion ouverte est fermée à l'expiration du jeton d'accès, et le compte
+est revérifié (is_active) toutes les ``REVERIFICATION`` secondes : un
+utilisateur désactivé cesse de recevoir des événements.
+"""
+import asyncio
+import atexit
+import json
+import logging
+import os
+import socket
+import stat
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CONFIG = {
+    'BACKEND': 'gestion_taches.evenements.BrokerMemoire',
+    'OPTIONS': {},
+    'KEEPALIVE': 15,  # secondes entre deux commentaires ": keepalive"
+    'REVERIFICATION': 60,  # secondes entre deux vérifications du compte d'une connexion ouverte
+    'TICKET_TTL': 30,  # secondes de validité d'un ticket de connexion
+    **getattr(settings, 'EVENEMENTS', {}),
+}
+
+# clé des superusers, identique à utilisateurs.versions.CLE_GLOBALE
+CLE_GLOBALE = 'tout'
+
+
+def message_sse(evenement, donnees):
+    return f"event: {evenement}\ndata: {json.dumps(donnees, ensure_ascii=False)}\n\n".encode()
+
+
+class Abonnement:
+    """File bornée d'une connexion ; un client trop lent est marqué « débordé »."""
+
+    def __init__(self, cles, taille_file):
+        self.cles = tuple(cles)
+        self.boucle = asyncio.get_running_loop()
+        self.file = asyncio.Queue(taille_file)
+        self.deborde = False
+
+    def livrer(self, message):
+        # toujours appelé dans la boucle de la connexion
+        if self.deborde:
+            return
+        try:
+            self.file.put_nowait(message)
+        except asyncio.QueueFull:
+            self.deborde = True
+
+
+class BrokerMemoire:
+    """Courtier du processus : clé -> abonnements, sûr entre threads."""
+
+    def __init__(self, taille_file=100):
+        self.taille_file = taille_file
+        self._abonnes = defaultdict(set)
+        self._verrou = threading.Lock()
+
+    def abonner(self, cles):
+        abonnement = Abonnement(cles, self.taille_file)
+        with self._verrou:
+            for cle in abonnement.cles:
+                self._abonnes[cle].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            for cle in abonnement.cles:
+                abonnes = self._abonnes.get(cle)
+                if abonnes is not None:
+                    abonnes.discard(abonnement)
+                    if not abonnes:
+                        del self._abonnes[cle]
+
+    def actif(self):
+        # sans abonné, les signaux ne sérialisent rien
+        return bool(self._abonnes)
+
+    def nombre_abonnes(self):
+        with self._verrou:
+            return len({abonnement for abonnes in self._abonnes.values() for abonnement in abonnes})
+
+    def publier(self, cles, message):
+        self.diffuser(cles, message)
+
+    def diffuser(self, cles, message):
+        with self._verrou:
+            destinataires = {abonnement for cle in cles for abonnement in self._abonnes.get(cle, ())}
+        # un seul réveil par boucle, quel que soit le nombre de connexions
+        par_boucle = defaultdict(list)
+        for abonnement in destinataires:
+            par_boucle[abonnement.boucle].append(abonnement)
+        for boucle, abonnements in par_boucle.items():
+            try:
+                boucle.call_soon_threadsafe(_livrer, abonnements, message)
+            except RuntimeError:
+                # boucle fermée : les abonnements partiront avec leurs connexions
+                pass
+
+    def statistiques(self):
+        return {'backend': type(self).__name__, 'abonnes': self.nombre_abonnes()}
+
+
+def _livrer(abonnements, message):
+    for abonnement in abonnements:
+        abonnement.livrer(message)
+
+
+class BrokerLocal(BrokerMemoire):
+    """BrokerMemoire relayé aux autres workers de la machine par des sockets Unix."""
+
+    def __init__(self, dossier=None, taille_file=100):
+        super().__init__(taille_file)
+        self.dossier = Path(dossier or Path(settings.BASE_DIR) / 'evenements')
+        self.dossier.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self._verifier_dossier()
+        self.chemin = self.dossier / f'{os.getpid()}.sock'
+        self._envoi = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._envoi.setblocking(False)
+        self._ecoute = None
+        self._verrou_ecoute = threading.Lock()
+
+    def abonner(self, cles):
+        self._demarrer_ecoute()
+        return super().abonner(cles)
+
+    def actif(self):
+        # les autres workers peuvent avoir des abonnés
+        return True
+
+    def publier(self, cles, message):
+        self.diffuser(cles, message)
+        paquet = json.dumps([list(cles), message.decode()]).encode()
+        for chemin in self.dossier.glob('*.sock'):
+            if chemin == self.chemin:
+                continue
+            try:
+                self._envoi.sendto(paquet, str(chemin))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # worker arrêté sans nettoyer son socket
+                chemin.unlink(missing_ok=True)
+            except OSError as erreur:
+                # file du worker pleine ou paquet trop gros : ses clients se resynchroniseront
+                logger.warning("Événement non relayé à %s : %s", chemin.name, erreur)
+
+    def _verifier_dossier(self):
+        # un dossier créé d'avance par un autre compte, ou ouvert aux autres, laisserait
+        # n'importe quel processus de la machine publier vers u:<id>
+        infos = self.dossier.stat()
+        if infos.st_uid != os.getuid() or stat.S_IMODE(infos.st_mode) & 0o077:
+            raise ImproperlyConfigured(
+                f"{self.dossier} doit appartenir au compte du serveur et n'être accessible qu'à lui (0700).")
+
+    def _demarrer_ecoute(self):
+        if self._ecoute is not None:
+            return
+        with self._verrou_ecoute:
+            if self._ecoute is not None:
+                return
+            ecoute = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self.chemin.unlink(missing_ok=True)
+            ecoute.bind(str(self.chemin))
+            self.chemin.chmod(0o600)
+            atexit.register(self.chemin.unlink, missing_ok=True)
+            threading.Thread(target=self._recevoir, args=(ecoute,), daemon=True,
+                             name='evenements-local').start()
+            self._ecoute = ecoute
+
+    def _recevoir(self, ecoute):
+        while True:
+            paquet = ecoute.recv(256 * 1024)
+            try:
+                cles, message = json.loads(paquet)
+            except ValueError:
+                continue
+            self.diffuser(cles, message.encode())
+
+
+def _creer_broker():
+    backend = import_string(CONFIG['BACKEND'])
+    return backend(**CONFIG['OPTIONS'])
+
+
+broker = _creer_broker()
+
+
+def cles_de(user_ids, superusers=True):
+    cles = {f'u:{user_id}' for user_id in user_ids if user_id}
+    if superusers:
+        cles.add(CLE_GLOBALE)
+    return cles
+
+
+def publier(modele, action, objet_id, donnees, user_ids, superusers=True, using=DEFAULT_DB_ALIAS):
+    """Publie un événement après le commit de la transaction en cours."""
+    cles = cles_de(user_ids, superusers)
+    if not cles:
+        return
+    message = message_sse(modele, {'action': action, 'id': objet_id, 'data': donnees})
+    transaction.on_commit(lambda: broker.publier(cles, message), using=using)
@@ -0,0 +1,127 @@
+"""Export en flux (CSV ou NDJSON) des listes de tâches et de projets.
+
+L'action ``export`` reprend le queryset de la liste (visibilité, filtres,
+?ordering=, ?fields=) sans pagination et l'écrit par lots de
+``taille_lot_export`` lignes lues avec ``iterator()`` : la mémoire ne dépend
+que de la taille d'un lot, pas du nombre de lignes exportées. Les lignes sont
+converties par la lecture rapide quand elle est possible, sinon par le
+serializer, lot par lot.
+
+En CSV, une cellule texte qui commence par ``=``, ``+``, ``-`` ou ``@`` est
+préfixée d'une apostrophe : le tableur l'affiche comme texte au lieu de
+l'évaluer.
+
+Le format se choisit comme pour les autres rendus DRF : ``?format=csv``
+(par défaut), ``?format=ndjson``, un suffixe (``export.ndjson``) ou l'en-tête
+Accept.
+
+Sous ASGI le flux est asynchrone : un itérateur synchrone serait lu en entier
+par Django avant l'envoi.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer
+
+
+class _RenduExport(BaseRenderer):
+    charset = 'utf-8'
+
+    # le contenu passe par StreamingHttpResponse : render() ne sert qu'aux erreurs
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class RenduCSV(_RenduExport):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class RenduNDJSON(_RenduExport):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+# début de cellule lu comme une formule par Excel et LibreOffice
+_DEBUTS_FORMULE = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _cellule(valeur):
+    if valeur is None:
+        return ''
+    if isinstance(valeur, (dict, list)):
+        valeur = json.dumps(valeur, ensure_ascii=False)
+    if isinstance(valeur, str) and valeur.startswith(_DEBUTS_FORMULE):
+        # un nom saisi par un utilisateur (« =HYPERLINK(...) ») reste du texte
+        return "'" + valeur
+    return valeur
+
+
+def morceaux_csv(colonnes, lots):
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    # BOM : Excel lit alors le fichier en UTF-8 (accents)
+    tampon.write('\ufeff')
+    ecrivain.writerow(colonnes)
+    for lot in lots:
+        ecrivain.writerows([_cellule(ligne.get(nom)) for nom in colonnes] for ligne in lot)
+        yield tampon.getvalue().encode()
+        tampon.seek(0)
+        tampon.truncate()
+    if tampon.tell():
+        yield tampon.getvalue().encode()
+
+
+def morceaux_ndjson(colonnes, lots):
+    for lot in lots:
+        yield ''.join(json.dumps(ligne, ensure_ascii=False) + '\n' for ligne in lot).encode()
+
+
+async def _flux_async(morceaux):
+    # thread_sensitive : le curseur reste sur le thread qui l'a ouvert
+    suivant = sync_to_async(next)
+    while (morceau := await suivant(morceaux, None)) is not None:
+        yield morceau
+
+
+class ExportMixin:
+    """Ajoute GET <liste>/export/ : toute la liste filtrée, en CSV ou NDJSON, en flux."""
+
+    taille_lot_export = 2000
+    nom_export = None
+
+    @action(detail=False, methods=['GET'], url_path='export', renderer_classes=[RenduCSV, RenduNDJSON])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if not queryset.query.order_by:
+            queryset = queryset.order_by('pk')
+        colonnes = [nom for nom, champ in self.get_serializer().fields.items() if not champ.write_only]
+
+        rendu = request.accepted_renderer
+        ecrire = morceaux_csv if rendu.format == 'csv' else morceaux_ndjson
+        morceaux = ecrire(colonnes, self.lots_export(queryset))
+        if isinstance(request._request, ASGIRequest):
+            morceaux = _flux_async(morceaux)
+
+        response = StreamingHttpResponse(morceaux, content_type=f'{rendu.media_type}; charset=utf-8')
+        nom = self.nom_export or queryset.model._meta.verbose_name_plural
+        response['Content-Disposition'] = (
+            f'attachment; filename="{nom}-{timezone.localdate():%Y%m%d}.{rendu.format}"')
+        return response
+
+    def lots_export(self, queryset):
+        taille = self.taille_lot_export
+        lecteur = self.lecteur_rapide() if hasattr(self, 'lecteur_rapide') else None
+        if lecteur is not None:
+            lignes = lecteur.preparer(queryset).iterator(chunk_size=taille)
+        else:
+            lignes = queryset.iterator(chunk_size=taille)
+        while lot := list(islice(lignes, taille)):
+            yield lecteur.convertir(lot) if lecteur is not None else self.get_serializer(lot, many=True).data
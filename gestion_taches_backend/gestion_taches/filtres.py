@@ -0,0 +1,99 @@
+"""Filtres déclaratifs sur les paramètres de requête, appliqués en SQL.
+
+Chaque vue déclare ``filtres = {'parametre': Filtre(...)}`` ; les valeurs
+multiples s'écrivent ``?statut=À faire&statut=En cours`` ou ``?statut=À faire,En cours``.
+"""
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+# bornes d'un entier SQL 64 bits (SQLite INTEGER, PostgreSQL bigint)
+ENTIER_MIN, ENTIER_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+def entier(valeur):
+    resultat = int(valeur)
+    # au-delà, le pilote lève OverflowError (erreur 500) au lieu d'une valeur invalide
+    if not ENTIER_MIN <= resultat <= ENTIER_MAX:
+        raise ValueError
+    return resultat
+
+
+def jour(valeur):
+    resultat = parse_date(valeur)
+    if resultat is None:
+        raise ValueError
+    return resultat
+
+
+def instant(valeur):
+    resultat = parse_datetime(valeur)
+    if resultat is None:
+        # une date seule vaut minuit dans le fuseau courant
+        resultat = datetime.combine(jour(valeur), datetime.min.time())
+    if timezone.is_naive(resultat):
+        resultat = timezone.make_aware(resultat)
+    return resultat
+
+
+def booleen(valeur):
+    if valeur.lower() in ('1', 'true', 'oui'):
+        return True
+    if valeur.lower() in ('0', 'false', 'non'):
+        return False
+    raise ValueError
+
+
+class Filtre:
+    def __init__(self, lookup, conversion=str, multiple=False, choix=None, condition=None):
+        self.lookup = lookup
+        self.conversion = conversion
+        self.multiple = multiple
+        self.choix = choix
+        # condition(valeur) -> Q pour les filtres qui ne sont pas un simple lookup
+        self.condition = condition
+
+    def valeurs(self, parametre, brutes):
+        valeurs = []
+        for brute in brutes:
+            valeurs += [v.strip() for v in brute.split(',')] if self.multiple else [brute]
+        try:
+            valeurs = [self.conversion(v) for v in valeurs if v != '']
+        except (TypeError, ValueError):
+            raise ValidationError({parametre: ["Valeur invalide."]})
+        if self.choix is not None and any(v not in self.choix for v in valeurs):
+            raise ValidationError({parametre: [f"Valeurs possibles : {', '.join(self.choix)}."]})
+        return valeurs
+
+    def q(self, parametre, brutes):
+        valeurs = self.valeurs(parametre, brutes)
+        if not valeurs:
+            return Q()
+        if self.condition is not None:
+            return self.condition(valeurs[-1])
+        if self.multiple:
+            return Q(**{f'{self.lookup}__in': valeurs})
+        return Q(**{self.lookup: valeurs[-1]})
+
+
+class FiltresRequete(BaseFilterBackend):
+    """Applique les filtres déclarés dans ``view.filtres``."""
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = Q()
+        for parametre, filtre in getattr(view, 'filtres', {}).items():
+            brutes = request.query_params.getlist(parametre)
+            if brutes:
+                conditions &= filtre.q(parametre, brutes)
+        return queryset.filter(conditions) if conditions else queryset
+
+
+def en_retard(valeur):
+    # date limite dépassée et pas encore terminé
+    retard = Q(date_limite__lt=timezone.localdate()) & ~Q(statut='Terminé')
+    return retard if valeur else ~retard
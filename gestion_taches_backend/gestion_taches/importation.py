@@ -0,0 +1,112 @@
+"""Import CSV en flux, par lots.
+
+Le fichier est lu ligne à ligne (csv.DictReader sur le flux binaire) et
+chaque ligne passe par le serializer de l'API (mêmes règles de validation),
+avec une seule instance de serializer pour tout le fichier. Les lignes valides
+sont accumulées par lots de ``TAILLE_LOT`` : chaque lot est vérifié en
+quelques requêtes (unicité, références, droits), puis écrit par bulk_create
+dans une transaction. Les lignes refusées n'arrêtent pas l'import : elles sont
+rapportées avec leur numéro de ligne dans le fichier.
+
+Seuls un lot et les ``ERREURS_MAX`` premières erreurs restent en mémoire.
+"""
+import abc
+import csv
+import io
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+CONFIG = {
+    'TAILLE_LOT': 500,
+    # processus de hachage des mots de passe (None : un par cœur)
+    'PROCESSUS': None,
+    'ERREURS_MAX': 1000,
+    **getattr(settings, 'IMPORT_CSV', {}),
+}
+
+
+def lire_csv(fichier):
+    """(numéro de ligne, dict) pour chaque ligne d'un fichier CSV binaire, sans les cellules vides."""
+    # utf-8-sig : accepte le BOM ajouté par Excel (et par l'export)
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    lecteur = csv.DictReader(texte)
+    for ligne in lecteur:
+        cellules = {cle.strip(): valeur.strip() for cle, valeur in ligne.items()
+                    if cle and isinstance(valeur, str) and valeur.strip()}
+        # lignes vides (« ,,, » des tableurs) ignorées
+        if cellules:
+            yield lecteur.line_num, cellules
+
+
+class Rapport:
+    def __init__(self):
+        self.lignes = 0
+        self.creees = 0
+        self.nombre_erreurs = 0
+        self.erreurs = []
+
+    def erreur(self, ligne, erreurs):
+        self.nombre_erreurs += 1
+        if len(self.erreurs) < CONFIG['ERREURS_MAX']:
+            self.erreurs.append({'ligne': ligne, 'erreurs': erreurs})
+
+    def donnees(self):
+        return {
+            'lignes': self.lignes,
+            'creees': self.creees,
+            'refusees': self.nombre_erreurs,
+            'erreurs': sorted(self.erreurs, key=lambda erreur: erreur['ligne']),
+            'erreurs_omises': self.nombre_erreurs - len(self.erreurs),
+        }
+
+
+class Importeur(abc.ABC):
+    """Valide chaque ligne avec serializer_class puis écrit par lots (preparer_lot / enregistrer)."""
+
+    serializer_class = None
+
+    def __init__(self, user=None, taille_lot=None):
+        # user=None : import sans contrôle de droits (commande d'administration)
+        self.user = user
+        self.taille_lot = taille_lot or CONFIG['TAILLE_LOT']
+
+    def validateur(self):
+        return self.serializer_class()
+
+    def importer(self, fichier):
+        rapport = Rapport()
+        validateur = self.validateur()
+        lot = []
+        try:
+            for numero, ligne in lire_csv(fichier):
+                rapport.lignes += 1
+                try:
+                    lot.append((numero, validateur.run_validation(ligne)))
+                except ValidationError as exc:
+                    rapport.erreur(numero, exc.detail)
+                if len(lot) >= self.taille_lot:
+                    self.ecrire(lot, rapport)
+                    lot = []
+        except (csv.Error, UnicodeDecodeError) as exc:
+            # fichier illisible : les lots déjà écrits restent
+            rapport.erreur(rapport.lignes + 1, {'fichier': [f"CSV illisible : {exc}"]})
+        if lot:
+            self.ecrire(lot, rapport)
+        return rapport.donnees()
+
+    def ecrire(self, lot, rapport):
+        objets = self.preparer_lot(lot, rapport)
+        if objets:
+            with transaction.atomic():
+                self.enregistrer(objets)
+            rapport.creees += len(objets)
+
+    @abc.abstractmethod
+    def preparer_lot(self, lot, rapport):
+        """[(numéro, données validées)] -> [objets à créer], les lignes refusées ajoutées au rapport."""
+
+    @abc.abstractmethod
+    def enregistrer(self, objets):
+        """Écrit les objets d'un lot (appelé dans une transaction)."""
@@ -0,0 +1,167 @@
+"""Lecture rapide des listes : tuples values_list() convertis sans ModelSerializer.
+
+Pour chaque serializer (et jeu de champs ?fields=), la conversion de chaque
+champ est choisie une seule fois : les champs dont la représentation
+est la valeur brute de la base (entiers, textes, clés étrangères, choix) sont
+recopiés, les dates et instants ISO 8601 sont convertis en ligne avec les mêmes
+règles que DRF, les autres passent par le to_representation() du champ. La
+sortie est donc identique à celle du serializer, octet pour octet une fois
+rendue en JSON.
+
+Un serializer qui contient un champ non pris en charge (fichier, méthode,
+relation imbriquée...) garde le chemin habituel.
+"""
+import threading
+from collections import OrderedDict
+from datetime import timezone as fuseau_utc
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework import fields as champs_drf
+from rest_framework import relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from gestion_taches.metriques import mesurer
+
+# to_representation(valeur de la base) == valeur
+IDENTITE = (champs_drf.IntegerField, champs_drf.CharField, champs_drf.ReadOnlyField)
+# to_representation(valeur de la base) suffit, sans l'objet
+CONVERTIS = (champs_drf.ChoiceField, champs_drf.DateTimeField, champs_drf.DateField,
+             champs_drf.TimeField, champs_drf.BooleanField, champs_drf.FloatField,
+             champs_drf.DecimalField, champs_drf.UUIDField)
+
+
+def instant_iso(valeur, fuseau):
+    # DateTimeField.to_representation (enforce_timezone puis isoformat) sans passer par le champ
+    if fuseau is not None:
+        valeur = valeur.astimezone(fuseau) if valeur.tzinfo is not None else timezone.make_aware(valeur, fuseau)
+    elif valeur.tzinfo is not None:
+        valeur = timezone.make_naive(valeur, fuseau_utc.utc)
+    texte = valeur.isoformat()
+    return texte[:-6] + 'Z' if texte.endswith('+00:00') else texte
+
+
+def _format_iso(champ, defaut):
+    format_sortie = getattr(champ, 'format', defaut)
+    return isinstance(format_sortie, str) and format_sortie.lower() == ISO_8601
+
+
+def _colonne(modele, champ):
+    try:
+        champ_modele = modele._meta.get_field(champ.source)
+    except FieldDoesNotExist:
+        return None
+    return champ_modele.name if champ_modele.concrete else None
+
+
+def _sans_none(convertir):
+    return lambda valeur, fuseau: None if valeur is None else convertir(valeur, fuseau)
+
+
+def _convertisseur(champ):
+    """Conversion (valeur, fuseau de la requête) -> représentation ; None si la valeur est recopiée."""
+    if isinstance(champ, relations.PrimaryKeyRelatedField) and champ.pk_field is None:
+        return None
+    if type(champ) in IDENTITE:
+        return None
+    if type(champ) is champs_drf.ChoiceField and all(isinstance(cle, str) for cle in champ.choices):
+        # choix en texte : la représentation est la valeur stockée
+        return None
+    if type(champ) is champs_drf.DateTimeField and _format_iso(champ, api_settings.DATETIME_FORMAT):
+        # fuseau du champ, sinon celui de la requête
+        if hasattr(champ, 'timezone'):
+            fuseau_champ = champ.timezone
+            return _sans_none(lambda valeur, fuseau: instant_iso(valeur, fuseau_champ))
+        return _sans_none(instant_iso)
+    if type(champ) is champs_drf.DateField and _format_iso(champ, api_settings.DATE_FORMAT):
+        return _sans_none(lambda valeur, fuseau: valeur.isoformat())
+    if type(champ) in CONVERTIS:
+        representation = champ.to_representation
+        return _sans_none(lambda valeur, fuseau: representation(valeur))
+    raise ValueError(champ.field_name)
+
+
+class LecteurRapide:
+    def __init__(self, serializer):
+        self.modele = serializer.Meta.model
+        self.noms, self.colonnes, champs = [], [], []
+        for nom, champ in serializer.fields.items():
+            if champ.write_only:
+                continue
+            colonne = _colonne(self.modele, champ)
+            if colonne is None:
+                raise ValueError(nom)
+            champs.append((nom, len(self.noms), _convertisseur(champ)))
+            self.noms.append(nom)
+            self.colonnes.append(colonne)
+        # (nom, index dans la ligne, conversion) choisis une fois pour toutes les lignes
+        self.champs = tuple(champs)
+
+    def preparer(self, queryset, tri=(), nommees=False):
+        # la pagination par curseur lit les champs de tri sur la dernière ligne (namedtuple)
+        colonnes = self.colonnes + [champ for champ in tri if champ not in self.colonnes]
+        return queryset.values_list(*colonnes, named=nommees)
+
+    def convertir(self, lignes):
+        # même fuseau que DateTimeField.default_timezone(), résolu une fois par liste
+        fuseau = timezone.get_current_timezone() if settings.USE_TZ else None
+        champs = self.champs
+        # l'équivalent de serializer.data (gestion_taches/metriques.py)
+        with mesurer('serialisation', hors_sql=True):
+            return [{nom: ligne[index] if convertir is None else convertir(ligne[index], fuseau)
+                     for nom, index, convertir in champs}
+                    for ligne in lignes]
+
+
+_verrou_lecteurs = threading.Lock()
+
+
+class LectureRapideMixin:
+    """list() en lecture rapide quand le serializer (et ?fields=) s'y prête."""
+
+    taille_lot_lecture = 2000
+    # lecteurs construits gardés par classe de vue (les moins récemment utilisés sortent)
+    lecteurs_max = 64
+
+    def lecteur_rapide(self):
+        champs, expand = self.champs_demandes() if hasattr(self, 'champs_demandes') else (None, ())
+        if expand:
+            return None
+        # un lecteur par jeu de champs, construit au premier appel ; l'ordre de sortie suit
+        # le serializer, donc ?fields=nom,id, ?fields=id,nom et ?fields=id,id,nom se partagent le même
+        cle = None if champs is None else tuple(sorted(set(champs)))
+        classe = self.__class__
+        with _verrou_lecteurs:
+            cache = classe.__dict__.get('_lecteurs')
+            if cache is None:
+                cache = classe._lecteurs = OrderedDict()
+            if cle in cache:
+                cache.move_to_end(cle)
+                return cache[cle]
+        kwargs = {} if champs is None else {'champs': champs}
+        try:
+            lecteur = LecteurRapide(self.get_serializer_class()(**kwargs))
+        except ValueError:
+            lecteur = None
+        with _verrou_lecteurs:
+            cache[cle] = lecteur
+            while len(cache) > self.lecteurs_max:
+                cache.popitem(last=False)
+        return lecteur
+
+    def list(self, request, *args, **kwargs):
+        lecteur = self.lecteur_rapide()
+        if lecteur is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        tri = [champ.lstrip('-') for champ in (*queryset.query.order_by, *getattr(self.paginator, 'ordering', ()))
+               if isinstance(champ, str)]
+        page = self.paginate_queryset(lecteur.preparer(queryset, tri, nommees=True))
+        if page is not None:
+            return self.get_paginated_response(lecteur.convertir(page))
+        lignes = lecteur.preparer(queryset).iterator(chunk_size=self.taille_lot_lecture)
+        return Response(lecteur.convertir(lignes))
@@ -0,0 +1,311 @@
+"""Instrumentation des requêtes : en-tête Server-Timing et métriques Prometheus.
+
+MetriquesMiddleware mesure chaque requête : durée totale, nombre et durée des
+requêtes SQL, durée de la sérialisation (hors SQL), durée du rendu JSON et
+taille de la réponse. Les valeurs partent dans l'en-tête Server-Timing et
+s'accumulent par vue dans des histogrammes exposés au format texte de
+Prometheus sur /api/metrics (un jeu de compteurs par processus).
+
+La sérialisation est mesurée par les vues du projet : ``serializer.data`` des
+vues génériques (SerialisationMesureeMixin), lecture rapide et vues APIView
+(``mesurer('serialisation', hors_sql=True)``).
+
+Les requêtes SQL passent par un execute_wrapper posé une fois sur chaque
+connexion (signal connection_created) ; la mesure en cours est retrouvée par une
+ContextVar, ce qui suit aussi les vues synchrones exécutées dans un thread sous
+ASGI.
+
+N+1 : une même requête SQL (texte paramétré) répétée au moins
+N_PLUS_UN_SEUIL fois dans une requête HTTP est signalée dans les logs, dans
+Server-Timing et dans le compteur gestion_taches_n_plus_un_total. Une vue peut
+changer le seuil avec l'attribut ``seuil_n_plus_un`` (None pour ne rien signaler).
+"""
+import ipaddress
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+CONFIG = {
+    'ACTIF': True,
+    'N_PLUS_UN_SEUIL': 10,
+    # jeton attendu par /api/metrics (Authorization: Bearer ...) ; sans jeton, accès local seulement
+    'JETON': None,
+    **getattr(settings, 'METRIQUES', {}),
+}
+
+SECONDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+NOMBRES = (1, 2, 5, 10, 20, 50, 100, 200)
+OCTETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+_mesure_courante = ContextVar('mesure_courante', default=None)
+
+
+class Mesure:
+    """Compteurs d'une requête HTTP en cours."""
+
+    __slots__ = ('debut', 'requetes', 'duree_sql', 'sections', 'textes_sql')
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.requetes = 0
+        self.duree_sql = 0.0
+        self.sections = defaultdict(float)
+        self.textes_sql = Counter()
+
+
+def _enregistrer_sql(execute, sql, params, many, context):
+    mesure = _mesure_courante.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesure.duree_sql += time.perf_counter() - debut
+        mesure.requetes += 1
+        mesure.textes_sql[sql] += 1
+
+
+def _installer_wrapper(sender, connection, **kwargs):
+    if _enregistrer_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_enregistrer_sql)
+
+
+@contextmanager
+def mesurer(section, hors_sql=False):
+    """Ajoute la durée du bloc à une section de Server-Timing de la requête en cours.
+
+    hors_sql : sans les requêtes SQL exécutées dans le bloc (queryset évalué
+    pendant la sérialisation), déjà comptées dans « db ».
+    """
+    mesure = _mesure_courante.get()
+    debut = time.perf_counter()
+    sql = mesure.duree_sql if mesure is not None else 0.0
+    try:
+        yield
+    finally:
+        if mesure is not None:
+            duree = time.perf_counter() - debut
+            if hors_sql:
+                duree -= mesure.duree_sql - sql
+            mesure.sections[section] += duree
+
+
+class JSONRendererMesure(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with mesurer('rendu'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _data_mesuree(serializer):
+    with mesurer('serialisation', hors_sql=True):
+        return super(type(serializer), serializer).data
+
+
+@lru_cache(maxsize=None)
+def _classe_mesuree(classe):
+    # les serializers imbriqués (champs, ?expand=) gardent leur classe : comptés une fois
+    return type(classe.__name__, (classe,), {'__module__': classe.__module__, 'data': property(_data_mesuree)})
+
+
+class SerialisationMesureeMixin:
+    """Vues génériques : la durée de ``serializer.data`` (hors SQL) va dans la section « serialisation »."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if CONFIG['ACTIF']:
+            serializer.__class__ = _classe_mesuree(type(serializer))
+        return serializer
+
+
+class Histogramme:
+    __slots__ = ('bornes', 'comptes', 'somme', 'total')
+
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.total = 0
+
+    def observer(self, valeur):
+        self.comptes[bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.total += 1
+
+
+class Registre:
+    """Histogrammes et compteurs du processus, par vue et méthode."""
+
+    HISTOGRAMMES = {
+        'gestion_taches_requete_duree_secondes': ("Durée des requêtes HTTP", SECONDES),
+        'gestion_taches_sql_requetes': ("Requêtes SQL par requête HTTP", NOMBRES),
+        'gestion_taches_sql_duree_secondes': ("Durée SQL par requête HTTP", SECONDES),
+        'gestion_taches_serialisation_duree_secondes': ("Durée de sérialisation (hors SQL) par requête HTTP",
+                                                        SECONDES),
+        'gestion_taches_rendu_duree_secondes': ("Durée du rendu JSON par requête HTTP", SECONDES),
+        'gestion_taches_reponse_octets': ("Taille des réponses", OCTETS),
+    }
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._histogrammes = {}
+        self._statuts = Counter()
+        self._n_plus_un = Counter()
+
+    def enregistrer(self, vue, methode, statut, valeurs, n_plus_un=False):
+        etiquettes = (vue, methode)
+        with self._verrou:
+            for nom, valeur in valeurs.items():
+                histogramme = self._histogrammes.get((nom, etiquettes))
+                if histogramme is None:
+                    histogramme = self._histogrammes[(nom, etiquettes)] = Histogramme(self.HISTOGRAMMES[nom][1])
+                histogramme.observer(valeur)
+            self._statuts[(vue, methode, statut)] += 1
+            if n_plus_un:
+                self._n_plus_un[etiquettes] += 1
+
+    def exposition(self):
+        lignes = []
+        with self._verrou:
+            lignes += ["# HELP gestion_taches_requetes_total Requêtes HTTP traitées",
+                       "# TYPE gestion_taches_requetes_total counter"]
+            for (vue, methode, statut), nombre in sorted(self._statuts.items()):
+                lignes.append(f'gestion_taches_requetes_total{{vue="{vue}",methode="{methode}",'
+                              f'statut="{statut}"}} {nombre}')
+            lignes += ["# HELP gestion_taches_n_plus_un_total Requêtes HTTP avec une requête SQL répétée",
+                       "# TYPE gestion_taches_n_plus_un_total counter"]
+            for (vue, methode), nombre in sorted(self._n_plus_un.items()):
+                lignes.append(f'gestion_taches_n_plus_un_total{{vue="{vue}",methode="{methode}"}} {nombre}')
+            for nom, (description, _) in self.HISTOGRAMMES.items():
+                lignes += [f"# HELP {nom} {description}", f"# TYPE {nom} histogram"]
+                for (nom_histogramme, (vue, methode)), histogramme in sorted(self._histogrammes.items()):
+                    if nom_histogramme != nom:
+                        continue
+                    etiquettes = f'vue="{vue}",methode="{methode}"'
+                    cumul = 0
+                    for borne, compte in zip((*histogramme.bornes, '+Inf'), histogramme.comptes):
+                        cumul += compte
+                        lignes.append(f'{nom}_bucket{{{etiquettes},le="{borne}"}} {cumul}')
+                    lignes.append(f'{nom}_sum{{{etiquettes}}} {histogramme.somme:.6f}')
+                    lignes.append(f'{nom}_count{{{etiquettes}}} {histogramme.total}')
+        return '\n'.join(lignes) + '\n'
+
+
+registre = Registre()
+
+if CONFIG['ACTIF']:
+    connection_created.connect(_installer_wrapper, dispatch_uid='metriques_sql')
+    # connexions déjà ouvertes avant le chargement du middleware
+    for _connexion in connections.all(initialized_only=True):
+        _installer_wrapper(None, _connexion)
+
+
+def _nom_vue(request):
+    correspondance = getattr(request, 'resolver_match', None)
+    return correspondance.view_name if correspondance and correspondance.view_name else 'inconnue'
+
+
+def _seuil_n_plus_un(request):
+    correspondance = getattr(request, 'resolver_match', None)
+    vue = correspondance and correspondance.func
+    classe = getattr(vue, 'cls', None) or getattr(vue, 'view_class', None)
+    return getattr(classe, 'seuil_n_plus_un', CONFIG['N_PLUS_UN_SEUIL'])
+
+
+class MetriquesMiddleware:
+    """Mesure chaque requête et ajoute l'en-tête Server-Timing (synchrone et asynchrone)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not CONFIG['ACTIF']:
+            return self.get_response(request)
+        mesure = Mesure()
+        jeton = _mesure_courante.set(mesure)
+        try:
+            response = self.get_response(request)
+        finally:
+            _mesure_courante.reset(jeton)
+        return self.terminer(request, response, mesure)
+
+    async def __acall__(self, request):
+        if not CONFIG['ACTIF']:
+            return await self.get_response(request)
+        mesure = Mesure()
+        jeton = _mesure_courante.set(mesure)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _mesure_courante.reset(jeton)
+        return self.terminer(request, response, mesure)
+
+    def terminer(self, request, response, mesure):
+        total = time.perf_counter() - mesure.debut
+        vue = _nom_vue(request)
+        seuil = _seuil_n_plus_un(request)
+        repetee, repetitions = (mesure.textes_sql.most_common(1) or [(None, 0)])[0]
+        n_plus_un = seuil is not None and repetitions >= seuil
+        if n_plus_un:
+            logger.warning("N+1 probable dans %s : %d fois la même requête SQL : %s", vue, repetitions, repetee)
+
+        valeurs = {
+            'gestion_taches_requete_duree_secondes': total,
+            'gestion_taches_sql_requetes': mesure.requetes,
+            'gestion_taches_sql_duree_secondes': mesure.duree_sql,
+            'gestion_taches_serialisation_duree_secondes': mesure.sections.get('serialisation', 0.0),
+            'gestion_taches_rendu_duree_secondes': mesure.sections.get('rendu', 0.0),
+        }
+        if not response.streaming:
+            valeurs['gestion_taches_reponse_octets'] = len(response.content)
+        registre.enregistrer(vue, request.method, response.status_code, valeurs, n_plus_un)
+
+        # en-tête en ASCII : certains clients refusent le latin-1
+        entrees = [f'db;dur={mesure.duree_sql * 1000:.1f};desc="{mesure.requetes} requetes SQL"']
+        entrees += [f'{section};dur={duree * 1000:.1f}' for section, duree in mesure.sections.items()]
+        if n_plus_un:
+            entrees.append(f'n1;desc="{repetitions} requetes SQL identiques"')
+        entrees.append(f'total;dur={total * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(entrees)
+        return response
+
+
+def _adresse_locale(request):
+    try:
+        return ipaddress.ip_address(request.META.get('REMOTE_ADDR', '')).is_loopback
+    except ValueError:
+        return False
+
+
+# /api/metrics au format texte de Prometheus
+def exposition_metriques(request):
+    jeton = CONFIG['JETON']
+    if jeton:
+        autorise = request.headers.get('Authorization') == f'Bearer {jeton}'
+    else:
+        autorise = _adresse_locale(request)
+    if not autorise:
+        return HttpResponse(status=403)
+    return HttpResponse(registre.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
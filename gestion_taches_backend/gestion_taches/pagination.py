@@ -0,0 +1,117 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+# pagination par curseur (keyset) sur (date_creation, id)
+# elle est optionnelle : sans ?cursor= ni ?page_size= la liste complète est renvoyée
+#
+# CursorPagination ne place le curseur que sur le premier champ de tri et saute
+# les ex aequo avec un offset (plafonné à offset_cutoff) : avec ?ordering=statut
+# les pages se chevauchent ou s'arrêtent. Ici le tri se termine toujours par id
+# et le curseur porte la valeur de chaque champ de tri : la position est unique,
+# le filtre est une comparaison lexicographique et l'offset reste à 0.
+class PaginationCurseur(CursorPagination):
+    ordering = ('date_creation', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if (self.cursor_query_param not in request.query_params
+                and self.page_size_query_param not in request.query_params):
+            return None
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, position = 0, False, None
+        else:
+            offset, reverse, position = self.cursor
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.apres(position, reverse, connections[queryset.db]))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # une ligne de plus pour savoir s'il y a une page suivante
+        resultats = list(queryset[offset:offset + self.page_size + 1])
+        self.page = resultats[:self.page_size]
+        suivante = self._get_position_from_instance(resultats[-1], self.ordering) \
+            if len(resultats) > len(self.page) else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None or offset > 0
+            self.has_previous = suivante is not None
+            self.next_position, self.previous_position = position, suivante
+        else:
+            self.has_next = suivante is not None
+            self.has_previous = position is not None or offset > 0
+            self.next_position, self.previous_position = suivante, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        # id départage les ex aequo : la position d'une ligne est unique
+        ordering = super().get_ordering(request, queryset, view)
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering += ('id',)
+        return ordering
+
+    def decode_cursor(self, request):
+        curseur = super().decode_cursor(request)
+        if curseur is not None and curseur.position is not None:
+            try:
+                valeurs = json.loads(curseur.position)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(valeurs, list) or len(valeurs) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            curseur = curseur._replace(position=valeurs)
+        return curseur
+
+    def encode_cursor(self, cursor):
+        if isinstance(cursor.position, list):
+            cursor = cursor._replace(position=json.dumps(cursor.position))
+        return super().encode_cursor(cursor)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # une ligne du queryset, un dict ou le namedtuple de lecture_rapide
+        valeurs = []
+        for champ in ordering:
+            champ = champ.lstrip('-')
+            valeur = instance[champ] if isinstance(instance, dict) else getattr(instance, champ)
+            valeurs.append(None if valeur is None else str(valeur))
+        return valeurs
+
+    def apres(self, position, reverse, connection):
+        """Lignes situées après ``position`` dans le sens de lecture (avant si ``reverse``).
+
+        (a, b, c) > (x, y, z) s'écrit a > x OU (a = x ET (b > y OU (b = y ET c > z))).
+        NULL est placé comme le fait la base (le plus petit sous SQLite).
+        """
+        condition = Q(pk__in=[])
+        for champ, valeur in reversed(list(zip(self.ordering, position))):
+            decroissant = champ.startswith('-') != reverse
+            champ = champ.lstrip('-')
+            # NULL lu avant toute valeur (croissant sous SQLite, décroissant sous PostgreSQL)
+            nulls_en_tete = decroissant == connection.features.nulls_order_largest
+            if valeur is None:
+                egal = Q(**{f'{champ}__isnull': True})
+                suivant = Q(**{f'{champ}__isnull': False}) if nulls_en_tete else Q(pk__in=[])
+            else:
+                egal = Q(**{champ: valeur})
+                suivant = Q(**{f'{champ}__{"lt" if decroissant else "gt"}': valeur})
+                if not nulls_en_tete:
+                    suivant |= Q(**{f'{champ}__isnull': True})
+            condition = suivant | (egal & condition)
+        return condition
@@ -1,6 +1,9 @@
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from .base_de_donnees import configuration_base
+
 
 # chemin de base du projet
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -37,6 +40,8 @@ INSTALLED_APPS = [
 
 # Middleware (Sécurité et communication)
 MIDDLEWARE = [
+    # en premier pour mesurer toute la requête (Server-Timing, /api/metrics)
+    'gestion_taches.metriques.MetriquesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,12 +73,9 @@ TEMPLATES = [
 ROOT_URLCONF = 'gestion_taches.urls'
 WSGI_APPLICATION = 'gestion_taches.wsgi.application'
 
-# Base de données (Simple et efficace)
+# Base de données : profil choisi par DB_PROFIL (voir gestion_taches/base_de_donnees.py)
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': configuration_base(BASE_DIR),
 }
 
 # Sécurité des mots de passe
@@ -101,10 +103,78 @@ CORS_ALLOWED_ORIGINS = [
 # Authentification avec JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication avec un cache des utilisateurs (voir utilisateurs/authentication.py)
+        'utilisateurs.authentication.JWTAuthenticationCache',
+    ),
+    # JSONRenderer qui mesure le rendu pour Server-Timing (voir gestion_taches/metriques.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'gestion_taches.metriques.JSONRendererMesure',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
+# Cache des utilisateurs authentifiés par JWT
+# CACHE_PARTAGE : alias d'un cache de CACHES pour partager les entrées entre workers ;
+# sans lui, une révocation (compte désactivé, mot de passe changé) n'atteint les
+# autres workers qu'à l'expiration de l'entrée (TTL)
+JWT_CACHE_UTILISATEURS = {
+    'TAILLE_MAX': 1024,
+    'TTL': 300,
+    'CACHE_PARTAGE': None,
+}
+
+# Cache des réponses de /api/projets/ et /api/taches/ (voir gestion_taches/cache_reponses.py)
+# BACKEND : CacheMemoire (par processus) ou CacheSQLite (partagé entre workers)
+CACHE_REPONSES = {
+    'ACTIF': True,
+    'BACKEND': 'gestion_taches.cache_reponses.CacheMemoire',
+    'OPTIONS': {'taille_max': 32 * 1024 * 1024},
+}
+
+# Imports CSV (voir gestion_taches/importation.py)
+# PROCESSUS : processus de hachage des mots de passe (None : un par cœur)
+IMPORT_CSV = {
+    'TAILLE_LOT': 500,
+    'PROCESSUS': None,
+    'ERREURS_MAX': 1000,
+}
+
+# Pool de threads des vues qui hachent les mots de passe (connexion, inscription, profil)
+HACHAGE_ASYNC = {
+    'ACTIF': True,
+    'WORKERS': 4,
+    'FILE_MAX': 64,
+}
+
+# Courtier des événements temps réel (/api/evenements/)
+# BrokerLocal relaie les événements entre les workers d'une même machine
+EVENEMENTS = {
+    'BACKEND': 'gestion_taches.evenements.BrokerMemoire',
+    'OPTIONS': {'taille_file': 100},
+    'KEEPALIVE': 15,
+    'REVERIFICATION': 60,
+    # secondes de validité d'un ticket de POST /api/evenements/ticket/
+    'TICKET_TTL': 30,
+}
+
+# Instrumentation des requêtes (Server-Timing, /api/metrics)
+# JETON : si défini, /api/metrics exige Authorization: Bearer <jeton> ; sinon accès local uniquement
+METRIQUES = {
+    'ACTIF': True,
+    'N_PLUS_UN_SEUIL': 10,
+    'JETON': os.environ.get('METRIQUES_JETON'),
+}
+
+# Planificateur des échéances (manage.py run_scheduler) : retards et rappels
+ECHEANCES = {
+    'RAPPELS_JOURS': (1,),
+    'HORIZON_JOURS': 7,
+    'ACTUALISATION': 60,
+}
+
+# Durée de conservation des suppressions pour /api/sync/ (au-delà, resynchronisation complète)
+SYNC_RETENTION_JOURS = 30
+
 # Configuration des tokens JWT
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
@@ -120,3 +190,7 @@ AUTH_USER_MODEL = 'utilisateurs.Utilisateur'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+
+# Miniatures WebP des avatars (générées en arrière-plan)
+AVATAR_TAILLES_MINIATURES = (64, 128, 256)
+AVATAR_MINIATURES_WORKERS = 2
@@ -3,10 +3,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from utilisateurs.views import UtilisateurViewSet, CustomTokenObtainPairView, InscriptionView
 from projets.views import ProjetViewSet
-from taches.views import TacheViewSet
+from taches.views import (TacheViewSet, ImportCSVView, StatistiquesView, RechercheView, SynchronisationView,
+                          TableauDeBordView, TicketEvenementsView, flux_evenements)
 from rest_framework_simplejwt.views import TokenRefreshView
 from django.conf import settings
 from django.conf.urls.static import static
+from gestion_taches.cache_reponses import StatistiquesCacheView
+from gestion_taches.metriques import exposition_metriques
+from utilisateurs.hachage import vue_async
 
 # on met en place du routeur
 router = DefaultRouter()
@@ -16,18 +20,47 @@ router.register(r'taches', TacheViewSet, basename='tache')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+
+    # Vues qui hachent des mots de passe : version asynchrone (pool borné, voir utilisateurs/hachage.py)
+    # déclarée avant le routeur pour passer devant l'action update_profile du viewset
+    path('api/utilisateurs/update_profile/',
+         vue_async(UtilisateurViewSet.as_view({'put': 'update_profile'})), name='update-profile'),
+
     path('api/', include(router.urls)),
-    path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/token/', vue_async(CustomTokenObtainPairView.as_view()), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     #  Route d'inscription
-    path('api/inscription/', InscriptionView.as_view(), name='inscription'),
+    path('api/inscription/', vue_async(InscriptionView.as_view()), name='inscription'),
 
     # Route pour obtenir les détails de l'utilisateur connecté
     path('api/utilisateurs/me/', UtilisateurViewSet.as_view({'get': 'me'}), name='user-me'),
-    # Route pour mettre à jour le profil
-    path('api/utilisateurs/update_profile/', UtilisateurViewSet.as_view({'put': 'update_profile'}),
-         name='update-profile'),
+
+    # Statistiques des tableaux de bord calculées par la base
+    path('api/statistiques/', StatistiquesView.as_view(), name='statistiques'),
+
+    # Tableau de bord (étudiant et professeur) en un seul appel
+    path('api/tableau-de-bord/', TableauDeBordView.as_view(), name='tableau-de-bord'),
+
+    # Recherche plein texte dans les tâches et les projets
+    path('api/recherche/', RechercheView.as_view(), name='recherche'),
+
+    # Suivi des imports CSV mis en file (rapport une fois traités par manage.py traiter_imports)
+    path('api/imports/<int:pk>/', ImportCSVView.as_view(), name='import-csv'),
+
+    # Synchronisation incrémentale (modifications et suppressions depuis un jeton)
+    path('api/sync/', SynchronisationView.as_view(), name='sync'),
+
+    # Événements temps réel (Server-Sent Events, à servir en ASGI)
+    path('api/evenements/', flux_evenements, name='evenements'),
+    # ticket à usage unique pour ouvrir le flux depuis EventSource (?ticket=)
+    path('api/evenements/ticket/', TicketEvenementsView.as_view(), name='evenements-ticket'),
+
+    # Métriques Prometheus du processus (latences, requêtes SQL, tailles)
+    path('api/metrics', exposition_metriques, name='metrics'),
+
+    # Compteurs du cache des réponses (administrateurs)
+    path('api/cache-reponses/', StatistiquesCacheView.as_view(), name='cache-reponses'),
 ]
 
 # ajoutde la configuration pour servir les fichiers médias
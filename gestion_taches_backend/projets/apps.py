@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ProjetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projets'
+
+    def ready(self):
+        # branche les signaux de version (ETag)
+        from . import signals  # noqa: F401
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0006_projet_date_limite_projet_statut'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projet',
+            index=models.Index(fields=['utilisateur', 'statut'], name='projet_utilisateur_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projet',
+            index=models.Index(fields=['date_creation', 'id'], name='projet_creation_id_idx'),
+        ),
+    ]
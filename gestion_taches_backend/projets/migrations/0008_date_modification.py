@@ -0,0 +1,88 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+# Triggers FTS tels que créés par taches 0006 (accès : propriétaire du projet et
+# assignee), copie figée : ne pas la modifier, une évolution va dans une nouvelle migration.
+ACCES_TACHE = (
+    "'u' || (SELECT utilisateur_id FROM projets_projet WHERE id = {t}.projet_id)"
+    " || COALESCE(' u' || {t}.assignee_id, '')"
+)
+INSERTION_TACHE = (
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_TACHE.format(t='new') + ");"
+)
+INSERTION_PROJET = (
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), 'u' || new.utilisateur_id);"
+)
+
+TRIGGERS = [
+    f"""CREATE TRIGGER taches_tache_fts_insert AFTER INSERT ON taches_tache BEGIN
+        {INSERTION_TACHE}
+    END""",
+    f"""CREATE TRIGGER taches_tache_fts_update
+    AFTER UPDATE OF nom, description, projet_id, assignee_id ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+        {INSERTION_TACHE}
+    END""",
+    """CREATE TRIGGER taches_tache_fts_delete AFTER DELETE ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER projets_projet_fts_insert AFTER INSERT ON projets_projet BEGIN
+        {INSERTION_PROJET}
+    END""",
+    f"""CREATE TRIGGER projets_projet_fts_update
+    AFTER UPDATE OF nom, description, utilisateur_id ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+        {INSERTION_PROJET}
+        UPDATE recherche_taches_fts SET acces = (
+            SELECT {ACCES_TACHE.format(t='taches_tache')} FROM taches_tache
+            WHERE taches_tache.id = recherche_taches_fts.rowid
+        ) WHERE new.utilisateur_id != old.utilisateur_id
+          AND rowid IN (SELECT id FROM taches_tache WHERE projet_id = new.id);
+    END""",
+    """CREATE TRIGGER projets_projet_fts_delete AFTER DELETE ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+    END""",
+]
+
+SUPPRESSION = [
+    f"DROP TRIGGER IF EXISTS {table}_fts_{evenement}"
+    for table in ('taches_tache', 'projets_projet')
+    for evenement in ('insert', 'update', 'delete')
+]
+
+
+def executer(requetes):
+    def operation(apps, schema_editor):
+        # FTS5 n'existe que sous SQLite
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for requete in requetes:
+            schema_editor.execute(requete)
+    return operation
+
+
+creer_triggers = executer(TRIGGERS)
+supprimer_triggers = executer(SUPPRESSION)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0007_index_filtres'),
+        ('taches', '0006_recherche_fts'),
+    ]
+
+    operations = [
+        # SQLite reconstruit la table : les triggers FTS sont retirés puis recréés
+        migrations.RunPython(supprimer_triggers, creer_triggers),
+        migrations.AddField(
+            model_name='projet',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(creer_triggers, supprimer_triggers),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# une ligne PROPRIETAIRE par projet existant
+def creer_proprietaires(apps, schema_editor):
+    Projet = apps.get_model('projets', 'Projet')
+    Membre = apps.get_model('projets', 'Membre')
+    base = schema_editor.connection.alias
+    Membre.objects.using(base).bulk_create(
+        (Membre(projet_id=projet_id, utilisateur_id=utilisateur_id, role='PROPRIETAIRE')
+         for projet_id, utilisateur_id in Projet.objects.using(base).values_list('id', 'utilisateur_id').iterator()),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0008_date_modification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Membre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('PROPRIETAIRE', 'Propriétaire'), ('EDITEUR', 'Éditeur'), ('LECTEUR', 'Lecteur')], default='LECTEUR', max_length=20)),
+                ('date_ajout', models.DateTimeField(auto_now_add=True)),
+                ('projet', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='membres', to='projets.projet')),
+                ('utilisateur', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='adhesions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['utilisateur', 'projet', 'role'], name='membre_acces_idx'), models.Index(fields=['projet', 'utilisateur'], name='membre_projet_idx')],
+                'constraints': [models.UniqueConstraint(fields=('utilisateur', 'projet'), name='membre_utilisateur_projet_unique')],
+            },
+        ),
+        migrations.RunPython(creer_proprietaires, migrations.RunPython.noop),
+    ]
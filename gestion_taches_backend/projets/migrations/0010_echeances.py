@@ -0,0 +1,24 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0009_membre'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projet',
+            name='date_retard',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='projet',
+            index=models.Index(condition=models.Q(('date_retard__isnull', True), models.Q(('statut', 'Terminé'), _negated=True)), fields=['date_limite'], name='projet_echeance_idx'),
+        ),
+    ]
@@ -0,0 +1,134 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Triggers FTS en place à cette migration (taches 0008_acces_membres), copie figée :
+# SQLite reconstruit projets_projet et refuse de le faire tant que des triggers y
+# font référence. Ne pas modifier, une évolution va dans une nouvelle migration.
+ACCES_MEMBRES = "COALESCE((SELECT group_concat('u' || utilisateur_id, ' ') FROM projets_membre WHERE projet_id = {p}), '')"
+ACCES_TACHE = ACCES_MEMBRES.format(p='{t}.projet_id') + " || COALESCE(' u' || {t}.assignee_id, '')"
+ACCES_PROJET = ACCES_MEMBRES.format(p='{p}.id')
+
+INSERTION_TACHE = (
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_TACHE.format(t='new') + ");"
+)
+INSERTION_PROJET = (
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_PROJET.format(p='new') + ");"
+)
+MISE_A_JOUR_ACCES = (
+    "UPDATE recherche_projets_fts SET acces = " + ACCES_MEMBRES.format(p='{m}.projet_id')
+    + " WHERE rowid = {m}.projet_id;"
+    " UPDATE recherche_taches_fts SET acces = ("
+    "SELECT " + ACCES_TACHE.format(t='taches_tache') + " FROM taches_tache"
+    " WHERE taches_tache.id = recherche_taches_fts.rowid"
+    ") WHERE rowid IN (SELECT id FROM taches_tache WHERE projet_id = {m}.projet_id);"
+)
+
+TRIGGERS = [
+    f"""CREATE TRIGGER taches_tache_fts_insert AFTER INSERT ON taches_tache BEGIN
+        {INSERTION_TACHE}
+    END""",
+    f"""CREATE TRIGGER taches_tache_fts_update
+    AFTER UPDATE OF nom, description, projet_id, assignee_id ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+        {INSERTION_TACHE}
+    END""",
+    """CREATE TRIGGER taches_tache_fts_delete AFTER DELETE ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER projets_projet_fts_insert AFTER INSERT ON projets_projet BEGIN
+        {INSERTION_PROJET}
+    END""",
+    f"""CREATE TRIGGER projets_projet_fts_update AFTER UPDATE OF nom, description ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+        {INSERTION_PROJET}
+    END""",
+    """CREATE TRIGGER projets_projet_fts_delete AFTER DELETE ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER projets_membre_fts_insert AFTER INSERT ON projets_membre BEGIN
+        {MISE_A_JOUR_ACCES.format(m='new')}
+    END""",
+    f"""CREATE TRIGGER projets_membre_fts_update AFTER UPDATE OF utilisateur_id, projet_id ON projets_membre BEGIN
+        {MISE_A_JOUR_ACCES.format(m='old')}
+        {MISE_A_JOUR_ACCES.format(m='new')}
+    END""",
+    f"""CREATE TRIGGER projets_membre_fts_delete AFTER DELETE ON projets_membre BEGIN
+        {MISE_A_JOUR_ACCES.format(m='old')}
+    END""",
+]
+
+SUPPRESSION_TRIGGERS = [
+    f"DROP TRIGGER IF EXISTS {table}_fts_{evenement}"
+    for table in ('taches_tache', 'projets_projet', 'projets_membre')
+    for evenement in ('insert', 'update', 'delete')
+]
+
+
+def executer(requetes):
+    def operation(apps, schema_editor):
+        # FTS5 n'existe que sous SQLite
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for requete in requetes:
+            schema_editor.execute(requete)
+    return operation
+
+
+creer_triggers = executer(TRIGGERS)
+supprimer_triggers = executer(SUPPRESSION_TRIGGERS)
+
+COMPTEURS = {'À faire': 'nb_a_faire', 'En cours': 'nb_en_cours', 'Terminé': 'nb_terminees'}
+
+
+def remplir_compteurs(apps, schema_editor):
+    Projet = apps.get_model('projets', 'Projet')
+    Tache = apps.get_model('taches', 'Tache')
+    Projet.objects.update(**{
+        champ: Coalesce(Subquery(
+            Tache.objects.filter(projet=OuterRef('pk'), statut=statut).order_by()
+            .values('projet').annotate(n=Count('pk')).values('n')
+        ), 0)
+        for statut, champ in COMPTEURS.items()
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0010_echeances'),
+        ('taches', '0009_echeances'),
+    ]
+
+    operations = [
+        # SQLite reconstruit la table : les triggers FTS sont retirés puis recréés
+        migrations.RunPython(supprimer_triggers, creer_triggers),
+        migrations.AddField(
+            model_name='projet',
+            name='nb_a_faire',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projet',
+            name='nb_en_cours',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projet',
+            name='nb_terminees',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='projet',
+            name='statut_auto',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(creer_triggers, supprimer_triggers),
+        migrations.RunPython(remplir_compteurs, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,104 @@
+from collections import defaultdict
+
 from django.db import models
 from django.conf import settings
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+
+# rôles d'un membre de projet : le propriétaire est Projet.utilisateur
+PROPRIETAIRE, EDITEUR, LECTEUR = 'PROPRIETAIRE', 'EDITEUR', 'LECTEUR'
+# rôles qui peuvent modifier le projet et ses tâches
+ROLES_EDITION = (PROPRIETAIRE, EDITEUR)
+
+
+# compteur de Projet pour chaque statut de tâche
+COMPTEURS = {'À faire': 'nb_a_faire', 'En cours': 'nb_en_cours', 'Terminé': 'nb_terminees'}
+
+
+def statut_derive(a_faire, en_cours, terminees):
+    # rien de commencé (ou aucune tâche) : à faire ; tout terminé : terminé ; sinon en cours
+    if not en_cours and not terminees:
+        return 'À faire'
+    if not a_faire and not en_cours:
+        return 'Terminé'
+    return 'En cours'
+
+
+def peut_editer(user, role):
+    return user.is_superuser or role in ROLES_EDITION
+
+
+def projets_de(user):
+    # ids des projets dont l'utilisateur est membre : lecture de l'index (utilisateur, projet) seul
+    return Membre.objects.filter(utilisateur=user).values('projet_id')
+
+
+class ProjetQuerySet(models.QuerySet):
+    # les projets visibles par un utilisateur (mêmes règles que ProjetViewSet)
+    def visibles_par(self, user):
+        if user.is_superuser:
+            return self.all()
+        return self.filter(pk__in=projets_de(user))
+
+    # rôle de l'utilisateur sur chaque projet (role_acces), lu avec le projet
+    def avec_role(self, user):
+        return self.annotate(role_acces=role_sur(user, models.OuterRef('pk')))
+
+    def ajuster_compteurs(self, deltas):
+        """Applique {(projet_id, statut): +/- n} aux compteurs, une requête UPDATE ... F() par projet."""
+        par_projet = defaultdict(dict)
+        for (projet_id, statut), delta in deltas.items():
+            if delta:
+                champ = COMPTEURS[statut]
+                par_projet[projet_id][champ] = par_projet[projet_id].get(champ, 0) + delta
+        maintenant = timezone.now()
+        for projet_id, ajouts in par_projet.items():
+            nouveaux = {champ: models.F(champ) + ajouts.get(champ, 0) for champ in COMPTEURS.values()}
+            self.filter(pk=projet_id).update(
+                **{champ: nouveaux[champ] for champ in ajouts},
+                statut=self._statut_derive(**nouveaux),
+                # les compteurs font partie du projet renvoyé par /api/sync/
+                date_modification=maintenant,
+            )
+
+    # statut_derive() en SQL, sur les valeurs après l'UPDATE (le SET lit les anciennes)
+    @staticmethod
+    def _statut_derive(nb_a_faire, nb_en_cours, nb_terminees):
+        return models.Case(
+            models.When(statut_auto=False, then=models.F('statut')),
+            models.When(Exact(nb_en_cours + nb_terminees, 0), then=models.Value('À faire')),
+            models.When(Exact(nb_a_faire + nb_en_cours, 0), then=models.Value('Terminé')),
+            default=models.Value('En cours'),
+        )
+
+    def recompter(self):
+        """Recalcule les compteurs (et le statut automatique) des projets qui ont dérivé ; renvoie leur nombre."""
+        # import local : taches dépend de projets
+        from taches.models import Tache
+
+        reels = {
+            f'reel_{champ}': Coalesce(models.Subquery(
+                Tache.objects.filter(projet=models.OuterRef('pk'), statut=statut).order_by()
+                .values('projet').annotate(n=models.Count('pk')).values('n')
+            ), 0)
+            for statut, champ in COMPTEURS.items()
+        }
+        ecarts = models.Q()
+        for champ in COMPTEURS.values():
+            ecarts |= ~models.Q(**{champ: models.F(f'reel_{champ}')})
+        a_corriger = self.annotate(**reels).filter(
+            ecarts | (models.Q(statut_auto=True) & ~models.Q(statut=self._statut_derive(
+                *(models.F(f'reel_{champ}') for champ in COMPTEURS.values()))))
+        )
+        ids = list(a_corriger.values_list('pk', flat=True))
+        if ids:
+            nouveaux = {champ: reels[f'reel_{champ}'] for champ in COMPTEURS.values()}
+            self.filter(pk__in=ids).update(**nouveaux, statut=self._statut_derive(*nouveaux.values()),
+                                           date_modification=timezone.now())
+        return len(ids)
+
 
 class Projet(models.Model):
     STATUT_CHOIX = [
@@ -11,6 +110,8 @@ class Projet(models.Model):
     nom = models.CharField(max_length=255)
     description = models.TextField(default="Aucune description")
     date_creation = models.DateTimeField(auto_now_add=True)
+    # mise à jour à chaque écriture, sert à la synchronisation incrémentale (/api/sync/)
+    date_modification = models.DateTimeField(auto_now=True, db_index=True)
     date_limite = models.DateField(null=True, blank=True)
     statut = models.CharField(
         max_length=20,
@@ -22,6 +123,104 @@ class Projet(models.Model):
         on_delete=models.CASCADE,
         related_name='projets'
     )
+    # posée par le planificateur (manage.py run_scheduler) quand la date limite est dépassée
+    date_retard = models.DateTimeField(null=True, blank=True)
+    # tâches par statut, tenus à jour par F() (Projet.objects.ajuster_compteurs) ;
+    # manage.py recompter_projets corrige une dérive
+    nb_a_faire = models.IntegerField(default=0)
+    nb_en_cours = models.IntegerField(default=0)
+    nb_terminees = models.IntegerField(default=0)
+    # statut déduit des compteurs plutôt que saisi
+    statut_auto = models.BooleanField(default=False)
+
+    objects = ProjetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['utilisateur', 'statut'], name='projet_utilisateur_statut_idx'),
+            models.Index(fields=['date_creation', 'id'], name='projet_creation_id_idx'),
+            # échéances à surveiller : seuls les projets non terminés et pas encore en retard
+            models.Index(fields=['date_limite'], name='projet_echeance_idx',
+                         condition=models.Q(date_retard__isnull=True) & ~models.Q(statut='Terminé')),
+        ]
+
+    def __str__(self):
+        return self.nom
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('update_fields') is not None or kwargs.get('force_insert'):
+            if self.statut_auto:
+                self.statut = statut_derive(self.nb_a_faire, self.nb_en_cours, self.nb_terminees)
+            return super().save(*args, **kwargs)
+
+        # les compteurs ne s'écrivent que par F() : une sauvegarde avec les valeurs lues
+        # au début de la requête effacerait les tâches créées entre-temps. Le statut
+        # automatique en découle : il est recalculé en SQL, sur les compteurs en base.
+        exclus = {*COMPTEURS.values(), *(('statut',) if self.statut_auto else ())}
+        kwargs['update_fields'] = [champ.name for champ in self._meta.concrete_fields
+                                   if not champ.primary_key and champ.name not in exclus]
+        super().save(*args, **kwargs)
+        if self.statut_auto:
+            Projet.objects.using(self._state.db).filter(pk=self.pk).update(
+                statut=ProjetQuerySet._statut_derive(*(models.F(champ) for champ in COMPTEURS.values())))
+            self.refresh_from_db(fields=['statut', *COMPTEURS.values()])
+
+
+def role_sur(user, projet):
+    return models.Subquery(Membre.objects.filter(utilisateur=user, projet=projet).values('role')[:1])
+
+
+class MembreQuerySet(models.QuerySet):
+    def role_de(self, user, projet_id):
+        return self.filter(utilisateur=user, projet_id=projet_id).values_list('role', flat=True).first()
+
+    # lignes propriétaires des projets créés par bulk_create (pas de post_save), par lots
+    def completer_proprietaires(self, taille_lot=5000):
+        sans_proprietaire = (Projet.objects.using(self.db).exclude(membres__role=PROPRIETAIRE)
+                             .order_by('pk').values_list('pk', 'utilisateur_id'))
+        dernier, nombre = 0, 0
+        while lot := list(sans_proprietaire.filter(pk__gt=dernier)[:taille_lot]):
+            self.bulk_create([Membre(projet_id=projet_id, utilisateur_id=utilisateur_id, role=PROPRIETAIRE)
+                              for projet_id, utilisateur_id in lot])
+            dernier, nombre = lot[-1][0], nombre + len(lot)
+        return nombre
+
+    # {projet_id: {utilisateur_id: rôle}} en une requête
+    def par_projet(self, projet_ids):
+        membres = {projet_id: {} for projet_id in projet_ids}
+        for projet_id, utilisateur_id, role in self.filter(projet_id__in=membres).values_list(
+                'projet_id', 'utilisateur_id', 'role'):
+            membres[projet_id][utilisateur_id] = role
+        return membres
+
+
+# table d'accès : une ligne par utilisateur qui voit le projet, propriétaire compris
+# (ligne tenue à jour depuis Projet.utilisateur par projets/signals.py).
+# Visibilité et droits se lisent dans l'index (utilisateur, projet, role), sans jointure.
+class Membre(models.Model):
+    ROLE_CHOIX = [
+        (PROPRIETAIRE, 'Propriétaire'),
+        (EDITEUR, 'Éditeur'),
+        (LECTEUR, 'Lecteur'),
+    ]
+
+    projet = models.ForeignKey(Projet, on_delete=models.CASCADE, related_name='membres', db_index=False)
+    utilisateur = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                    related_name='adhesions', db_index=False)
+    role = models.CharField(max_length=20, choices=ROLE_CHOIX, default=LECTEUR)
+    # sert à /api/sync/ : un nouveau membre reçoit le projet et ses tâches
+    date_ajout = models.DateTimeField(auto_now_add=True)
+
+    objects = MembreQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['utilisateur', 'projet'], name='membre_utilisateur_projet_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['utilisateur', 'projet', 'role'], name='membre_acces_idx'),
+            models.Index(fields=['projet', 'utilisateur'], name='membre_projet_idx'),
+        ]
 
     def __str__(self):
-        return self.nom
\ No newline at end of file
+        return f"{self.utilisateur_id} {self.role} {self.projet_id}"
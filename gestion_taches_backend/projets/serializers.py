@@ -1,11 +1,35 @@
 from rest_framework import serializers
-from .models import Projet
+from gestion_taches.champs import ChampsDynamiquesMixin, Expansion
+from utilisateurs.models import Utilisateur
+from .models import PROPRIETAIRE, Membre, Projet
 
-class ProjetSerializer(serializers.ModelSerializer):
+class ProjetSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     # mets le champ utilisateur en lecture seule
     utilisateur = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Projet
         fields = '__all__'
-        read_only_fields = ['date_creation']
\ No newline at end of file
+        # compteurs de tâches tenus par le serveur ; avec statut_auto, statut en découle
+        read_only_fields = ['date_creation', 'date_retard', 'nb_a_faire', 'nb_en_cours', 'nb_terminees']
+        # relations incluses avec ?expand=
+        expansions = {
+            'utilisateur': Expansion('utilisateurs.serializers.UtilisateurResumeSerializer'),
+            'taches': Expansion('taches.serializers.TacheSerializer'),
+        }
+
+
+# membre d'un projet (/api/projets/<id>/membres/) ; le propriétaire vient de Projet.utilisateur
+class MembreSerializer(serializers.ModelSerializer):
+    utilisateur = serializers.PrimaryKeyRelatedField(queryset=Utilisateur.objects.filter(is_active=True))
+    username = serializers.CharField(source='utilisateur.username', read_only=True)
+
+    class Meta:
+        model = Membre
+        fields = ['utilisateur', 'username', 'role', 'date_ajout']
+        read_only_fields = ['date_ajout']
+
+    def validate_role(self, role):
+        if role == PROPRIETAIRE:
+            raise serializers.ValidationError("Le propriétaire d'un projet est son utilisateur.")
+        return role
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from gestion_taches.evenements import broker, publier
+from utilisateurs.versions import incrementer_versions
+from .models import EDITEUR, PROPRIETAIRE, Membre, Projet
+from .serializers import ProjetSerializer
+
+
+def membres_de(projet_id, using):
+    return dict(Membre.objects.using(using).filter(projet_id=projet_id).values_list('utilisateur_id', 'role'))
+
+
+def assignees_de(projet_id, using):
+    # les assignees non membres voient le projet inclus dans leurs tâches (tableau de bord, ?expand=projet)
+    # import local : taches dépend de projets
+    from taches.models import Tache
+
+    return set(Tache.objects.using(using).filter(projet_id=projet_id, assignee__isnull=False)
+               .values_list('assignee_id', flat=True).distinct())
+
+
+# un projet est visible par ses membres (et les superusers) : on les retient avant
+# l'écriture, la suppression en cascade efface leurs lignes avant post_delete
+@receiver(pre_save, sender=Projet)
+def memoriser_membres(sender, instance, using, **kwargs):
+    instance._membres = membres_de(instance.pk, using) if instance.pk else {}
+
+
+# les tâches (et leurs assignees) partent aussi avant post_delete
+@receiver(pre_delete, sender=Projet)
+def memoriser_concernes_projet(sender, instance, using, **kwargs):
+    instance._membres = membres_de(instance.pk, using)
+    instance._assignees = assignees_de(instance.pk, using)
+
+
+@receiver(post_save, sender=Projet)
+def incrementer_version_projet(sender, instance, created, using, **kwargs):
+    membres = getattr(instance, '_membres', {})
+    # la table d'accès suit Projet.utilisateur
+    if created:
+        Membre.objects.using(using).create(projet=instance, utilisateur_id=instance.utilisateur_id, role=PROPRIETAIRE)
+    elif membres.get(instance.utilisateur_id) != PROPRIETAIRE:
+        # changement de propriétaire : l'ancien reste éditeur
+        Membre.objects.using(using).filter(projet=instance, role=PROPRIETAIRE).update(role=EDITEUR)
+        Membre.objects.using(using).update_or_create(projet=instance, utilisateur_id=instance.utilisateur_id,
+                                                     defaults={'role': PROPRIETAIRE})
+    concernes = set(membres) | {instance.utilisateur_id}
+    assignees = set() if created else assignees_de(instance.pk, using)
+    incrementer_versions(*concernes, *assignees, using=using)
+    if broker.actif():
+        publier('projet', 'create' if created else 'update', instance.pk, ProjetSerializer(instance).data,
+                concernes, using=using)
+
+
+@receiver(post_delete, sender=Projet)
+def supprimer_projet(sender, instance, using, **kwargs):
+    # import local : taches dépend de projets
+    from taches.synchro import enregistrer_suppressions
+
+    concernes = set(getattr(instance, '_membres', {})) | {instance.utilisateur_id}
+    incrementer_versions(*concernes, *getattr(instance, '_assignees', ()), using=using)
+    enregistrer_suppressions('projet', instance.pk, concernes, using=using)
+    publier('projet', 'delete', instance.pk, None, concernes, using=using)
+
+
+# ajout, retrait ou changement de rôle : ce que voit le membre change
+@receiver(post_save, sender=Membre)
+@receiver(post_delete, sender=Membre)
+def incrementer_version_membre(sender, instance, using, **kwargs):
+    incrementer_versions(instance.utilisateur_id, using=using)
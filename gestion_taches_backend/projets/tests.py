@@ -1,3 +1,155 @@
+from datetime import date
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from taches.models import Tache
+from utilisateurs.models import Utilisateur
+
+from .models import EDITEUR, LECTEUR, PROPRIETAIRE, Membre, Projet
+
+
+class CompteursTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur, statut_auto=True)
+
+    def creer_tache(self, statut='À faire', projet=None):
+        return Tache.objects.create(nom='Tâche', statut=statut, date_limite=date.today(),
+                                    projet=projet or self.projet)
+
+    def compteurs(self, projet=None):
+        projet = Projet.objects.get(pk=(projet or self.projet).pk)
+        return projet.nb_a_faire, projet.nb_en_cours, projet.nb_terminees, projet.statut
+
+    def test_creation_statut_suppression(self):
+        premiere, seconde = self.creer_tache(), self.creer_tache()
+        self.assertEqual(self.compteurs(), (2, 0, 0, 'À faire'))
+
+        premiere.statut = 'Terminé'
+        premiere.save()
+        self.assertEqual(self.compteurs(), (1, 0, 1, 'En cours'))
+
+        seconde.delete()
+        self.assertEqual(self.compteurs(), (0, 0, 1, 'Terminé'))
+
+    def test_changement_de_projet(self):
+        autre = Projet.objects.create(nom='Autre', utilisateur=self.professeur)
+        tache = self.creer_tache('En cours')
+        tache.projet = autre
+        tache.save()
+        self.assertEqual(self.compteurs(), (0, 0, 0, 'À faire'))
+        # sans statut_auto, le statut saisi est conservé
+        self.assertEqual(self.compteurs(autre), (0, 1, 0, 'À faire'))
+
+    def test_sauvegarde_ne_remet_pas_les_compteurs(self):
+        projet = Projet.objects.get(pk=self.projet.pk)
+        self.creer_tache()
+        projet.nom = 'Renommé'
+        projet.save()
+        self.assertEqual(self.compteurs()[0], 1)
+
+    def test_sauvegarde_ne_remet_pas_le_statut(self):
+        tache = self.creer_tache()
+        projet = Projet.objects.get(pk=self.projet.pk)
+        tache.statut = 'Terminé'
+        tache.save()
+        # instance lue avant le changement de la tâche : compteurs (1, 0, 0) en mémoire
+        projet.nom = 'Renommé'
+        projet.save()
+        self.assertEqual(self.compteurs(), (0, 0, 1, 'Terminé'))
+        self.assertEqual(projet.statut, 'Terminé')
+
+    def test_recompter(self):
+        self.creer_tache()
+        Projet.objects.filter(pk=self.projet.pk).update(nb_a_faire=5, nb_terminees=2, statut='En cours')
+        self.assertEqual(Projet.objects.recompter(), 1)
+        self.assertEqual(self.compteurs(), (1, 0, 0, 'À faire'))
+        self.assertEqual(Projet.objects.recompter(), 0)
+
+
+class MembresTests(TestCase):
+    def setUp(self):
+        self.proprietaire = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.editeur = Utilisateur.objects.create_user('editeur', password='x')
+        self.lecteur = Utilisateur.objects.create_user('lecteur', password='x')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.proprietaire)
+        Membre.objects.create(projet=self.projet, utilisateur=self.editeur, role=EDITEUR)
+        Membre.objects.create(projet=self.projet, utilisateur=self.lecteur, role=LECTEUR)
+        self.tache = Tache.objects.create(nom='Tâche', projet=self.projet, date_limite=date.today())
+        self.client = APIClient()
+
+    def en_tant_que(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def test_lecteur_ne_modifie_pas_les_taches(self):
+        client = self.en_tant_que(self.lecteur)
+        url = f'/api/taches/{self.tache.pk}/'
+        self.assertEqual(client.get(url).status_code, 200)
+        self.assertEqual(client.patch(url, {'nom': 'Modifiée'}, format='json').status_code, 403)
+        self.assertEqual(client.delete(url).status_code, 403)
+        self.assertEqual(client.post('/api/taches/', {'nom': 'Nouvelle', 'projet': self.projet.pk,
+                                                      'date_limite': str(date.today())},
+                                     format='json').status_code, 400)
+        self.assertEqual(Tache.objects.get(pk=self.tache.pk).nom, 'Tâche')
+
+    def test_editeur_cree_et_deplace(self):
+        client = self.en_tant_que(self.editeur)
+        reponse = client.post('/api/taches/', {'nom': 'Nouvelle', 'projet': self.projet.pk,
+                                               'date_limite': str(date.today())}, format='json')
+        self.assertEqual(reponse.status_code, 201)
+        tache_id = reponse.json()['id']
+
+        # vers un projet où il est éditeur : accepté ; où il n'est que lecteur : refusé
+        autre = Projet.objects.create(nom='Autre', utilisateur=self.proprietaire)
+        Membre.objects.create(projet=autre, utilisateur=self.editeur, role=EDITEUR)
+        lecture = Projet.objects.create(nom='Lecture', utilisateur=self.proprietaire)
+        Membre.objects.create(projet=lecture, utilisateur=self.editeur, role=LECTEUR)
+        url = f'/api/taches/{tache_id}/'
+        self.assertEqual(client.patch(url, {'projet': autre.pk}, format='json').status_code, 200)
+        self.assertEqual(client.patch(url, {'projet': lecture.pk}, format='json').status_code, 400)
+        self.assertEqual(Tache.objects.get(pk=tache_id).projet_id, autre.pk)
+        self.assertEqual(client.delete(url).status_code, 204)
+
+    def test_seul_le_proprietaire_gere_les_membres(self):
+        nouveau = Utilisateur.objects.create_user('nouveau', password='x')
+        url = f'/api/projets/{self.projet.pk}/membres/'
+        for user in (self.editeur, self.lecteur):
+            client = self.en_tant_que(user)
+            self.assertEqual(client.get(url).status_code, 200)
+            self.assertEqual(client.post(url, {'utilisateur': nouveau.pk, 'role': LECTEUR},
+                                         format='json').status_code, 403)
+            self.assertEqual(client.patch(f'{url}{self.lecteur.pk}/', {'role': EDITEUR},
+                                          format='json').status_code, 403)
+            self.assertEqual(client.delete(f'{url}{self.lecteur.pk}/').status_code, 403)
+        self.assertEqual(Membre.objects.role_de(self.lecteur, self.projet.pk), LECTEUR)
+
+        client = self.en_tant_que(self.proprietaire)
+        self.assertEqual(client.post(url, {'utilisateur': nouveau.pk, 'role': LECTEUR},
+                                     format='json').status_code, 201)
+        self.assertEqual(client.patch(f'{url}{nouveau.pk}/', {'role': EDITEUR}, format='json').status_code, 200)
+        self.assertEqual(Membre.objects.role_de(nouveau, self.projet.pk), EDITEUR)
+
+    def test_ligne_proprietaire_protegee(self):
+        client = self.en_tant_que(self.proprietaire)
+        url = f'/api/projets/{self.projet.pk}/membres/{self.proprietaire.pk}/'
+        self.assertEqual(client.patch(url, {'role': LECTEUR}, format='json').status_code, 400)
+        self.assertEqual(client.delete(url).status_code, 400)
+        self.assertEqual(Membre.objects.role_de(self.proprietaire, self.projet.pk), PROPRIETAIRE)
+        # et personne ne devient propriétaire par le rôle
+        reponse = client.patch(f'/api/projets/{self.projet.pk}/membres/{self.lecteur.pk}/',
+                               {'role': PROPRIETAIRE}, format='json')
+        self.assertEqual(reponse.status_code, 400)
+
+    def test_membre_retire_ne_voit_plus_les_taches(self):
+        client = self.en_tant_que(self.lecteur)
+        self.assertEqual([tache['id'] for tache in client.get('/api/taches/').json()], [self.tache.pk])
 
-# Create your tests here.
+        reponse = self.en_tant_que(self.proprietaire).delete(
+            f'/api/projets/{self.projet.pk}/membres/{self.lecteur.pk}/')
+        self.assertEqual(reponse.status_code, 204)
+        client = self.en_tant_que(self.lecteur)
+        self.assertEqual(client.get('/api/taches/').json(), [])
+        self.assertEqual(client.get(f'/api/taches/{self.tache.pk}/').status_code, 404)
+        self.assertEqual(client.get(f'/api/projets/{self.projet.pk}/').status_code, 404)
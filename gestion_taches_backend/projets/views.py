@@ -1,22 +1,121 @@
-from rest_framework import viewsets
+from django.db import transaction
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Projet
-from .serializers import ProjetSerializer
+from gestion_taches.cache_reponses import CacheListeMixin
+from gestion_taches.champs import ChampsDynamiquesVueMixin
+from gestion_taches.export import ExportMixin
+from gestion_taches.lecture_rapide import LectureRapideMixin
+from gestion_taches.metriques import SerialisationMesureeMixin
+from gestion_taches.filtres import Filtre, FiltresRequete, booleen, en_retard, instant, jour
+from gestion_taches.pagination import PaginationCurseur
+from rest_framework.filters import OrderingFilter
+from utilisateurs.versions import GetConditionnelMixin
+from gestion_taches.evenements import publier
+from taches.synchro import enregistrer_retrait
+from .models import PROPRIETAIRE, Projet, peut_editer
+from .serializers import MembreSerializer, ProjetSerializer
 
 
-class ProjetViewSet(viewsets.ModelViewSet):
+class ProjetViewSet(SerialisationMesureeMixin, ChampsDynamiquesVueMixin, GetConditionnelMixin, CacheListeMixin,
+                    LectureRapideMixin, ExportMixin, viewsets.ModelViewSet):
     serializer_class = ProjetSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginationCurseur
     queryset = Projet.objects.none()
 
+    # filtres et tris exécutés en SQL, alignés sur les index de Projet
+    filter_backends = [FiltresRequete, OrderingFilter]
+    filtres = {
+        'statut': Filtre('statut', multiple=True, choix=[statut for statut, _ in Projet.STATUT_CHOIX]),
+        'date_limite_apres': Filtre('date_limite__gte', jour),
+        'date_limite_avant': Filtre('date_limite__lte', jour),
+        'date_creation_apres': Filtre('date_creation__gte', instant),
+        'date_creation_avant': Filtre('date_creation__lte', instant),
+        'en_retard': Filtre(None, booleen, condition=en_retard),
+    }
+    ordering_fields = ['date_limite', 'date_creation', 'statut', 'nom', 'id']
+
     # filtre les projets en fonction de l'utilisateur connecté
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            return Projet.objects.all()
-        # j'utilise le `related_name` pour filtrer
-        return user.projets.all()
+        # le superuser voit tous les projets, les autres ceux dont ils sont membres
+        queryset = Projet.objects.visibles_par(self.request.user)
+        if self.action in ('update', 'partial_update', 'destroy', 'membres', 'membre'):
+            # le rôle est lu avec le projet : pas de requête de plus pour les droits
+            queryset = queryset.avec_role(self.request.user)
+        return queryset
+
+    def get_object(self):
+        # update() et destroy() lisent l'objet avant la méthode parente : une seule requête
+        if not hasattr(self, '_objet'):
+            self._objet = super().get_object()
+        return self._objet
 
     #  lier  le projet à l'utilisateur connecté
     def perform_create(self, serializer):
         serializer.save(utilisateur=self.request.user)
+
+    # propriétaires et éditeurs modifient le projet
+    def update(self, request, *args, **kwargs):
+        if not peut_editer(request.user, self.get_object().role_acces):
+            return Response({"detail": "Vous n'avez pas la permission de modifier ce projet."},
+                            status=status.HTTP_403_FORBIDDEN)
+        return super().update(request, *args, **kwargs)
+
+    # seul le propriétaire le supprime
+    def destroy(self, request, *args, **kwargs):
+        if not self.est_proprietaire(self.get_object()):
+            return Response({"detail": "Vous n'avez pas la permission de supprimer ce projet."},
+                            status=status.HTTP_403_FORBIDDEN)
+        return super().destroy(request, *args, **kwargs)
+
+    def est_proprietaire(self, projet):
+        return self.request.user.is_superuser or projet.role_acces == PROPRIETAIRE
+
+    # membres du projet : lecture pour tous les membres, ajout par le propriétaire
+    @action(detail=True, methods=['GET', 'POST'], url_path='membres')
+    def membres(self, request, pk=None):
+        projet = self.get_object()
+        if request.method == 'GET':
+            membres = projet.membres.select_related('utilisateur').order_by('date_ajout', 'id')
+            return Response(MembreSerializer(membres, many=True).data)
+
+        if not self.est_proprietaire(projet):
+            return Response({"detail": "Seul le propriétaire gère les membres du projet."},
+                            status=status.HTTP_403_FORBIDDEN)
+        serializer = MembreSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        utilisateur = serializer.validated_data['utilisateur']
+        if projet.membres.filter(utilisateur=utilisateur).exists():
+            return Response({'utilisateur': ["Cet utilisateur est déjà membre du projet."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(projet=projet)
+        publier('projet', 'create', projet.pk, ProjetSerializer(projet).data, [utilisateur.pk], superusers=False)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    # changement de rôle ou retrait d'un membre (propriétaire du projet)
+    @action(detail=True, methods=['PATCH', 'DELETE'], url_path=r'membres/(?P<utilisateur_id>[0-9]+)')
+    def membre(self, request, pk=None, utilisateur_id=None):
+        projet = self.get_object()
+        if not self.est_proprietaire(projet):
+            return Response({"detail": "Seul le propriétaire gère les membres du projet."},
+                            status=status.HTTP_403_FORBIDDEN)
+        membre = projet.membres.select_related('utilisateur').filter(utilisateur_id=utilisateur_id).first()
+        if membre is None:
+            return Response({"detail": "Pas trouvé."}, status=status.HTTP_404_NOT_FOUND)
+        if membre.role == PROPRIETAIRE:
+            return Response({"detail": "Le propriétaire ne peut être ni modifié ni retiré."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'PATCH':
+            serializer = MembreSerializer(membre, data={'role': request.data.get('role')}, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return Response(serializer.data)
+
+        with transaction.atomic():
+            membre.delete()
+            # le projet et ses tâches disparaissent chez l'ancien membre (sauf ses assignations)
+            enregistrer_retrait(projet.pk, membre.utilisateur_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
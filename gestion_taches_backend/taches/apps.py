@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TachesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'taches'
+
+    def ready(self):
+        # branche les signaux de version (ETag)
+        from . import signals  # noqa: F401
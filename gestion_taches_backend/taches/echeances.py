@@ -0,0 +1,260 @@
+"""Échéances des tâches et des projets : retards et rappels (manage.py run_scheduler).
+
+Le planificateur garde en mémoire un tas des prochaines échéances, trié par
+instant : passage en retard au début du jour qui suit la date limite, rappels
+``RAPPELS_JOURS`` jours avant. Il dort jusqu'à la plus proche et ne relit la
+base que par parcours d'intervalles indexés :
+
+- les échéances des ``HORIZON_JOURS`` prochains jours, lues sur les index
+  partiels ``*_echeance_idx`` (date_limite des lignes non terminées et pas
+  encore en retard), fenêtre par fenêtre ;
+- toutes les ``ACTUALISATION`` secondes, les lignes modifiées depuis la lecture
+  précédente (index sur date_modification, comme /api/sync/) : nouvelles
+  échéances, dates repoussées, tâches terminées.
+
+Une entrée du tas peut être périmée (date limite changée depuis) : chaque lot
+dû est revérifié en base avant d'être appliqué. Marquer en retard pose
+date_retard (et date_modification, pour /api/sync/), invalide les ETags et
+publie l'événement de mise à jour ; retards et rappels sont ajoutés à la boîte
+d'envoi (Rappel), sans doublon grâce à sa contrainte d'unicité.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, time as heure, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from gestion_taches.evenements import broker, publier
+from projets.models import Membre, Projet
+from projets.serializers import ProjetSerializer
+from utilisateurs.versions import incrementer_versions
+from .models import Rappel, Tache
+from .serializers import TacheSerializer
+from .synchro import MARGE
+
+CONFIG = {
+    # rappels envoyés N jours avant la date limite
+    'RAPPELS_JOURS': (1,),
+    # jours d'échéances chargés dans le tas à chaque lecture
+    'HORIZON_JOURS': 7,
+    # secondes entre deux lectures des lignes modifiées
+    'ACTUALISATION': 60,
+    'TAILLE_LOT': 1000,
+    **getattr(settings, 'ECHEANCES', {}),
+}
+
+RETARD, ECHEANCE = 'retard', 'echeance'
+MODELES = {'tache': Tache, 'projet': Projet}
+
+logger = logging.getLogger(__name__)
+
+
+def debut_du_jour(jour):
+    return timezone.make_aware(datetime.combine(jour, heure.min))
+
+
+def en_attente(modele):
+    # mêmes conditions que les index partiels *_echeance_idx
+    return modele.objects.filter(date_retard__isnull=True).exclude(statut='Terminé')
+
+
+def par_lots(elements, taille):
+    for debut in range(0, len(elements), taille):
+        yield elements[debut:debut + taille]
+
+
+class Planificateur:
+    def __init__(self, horloge=timezone.now, sortie=None):
+        self.horloge = horloge
+        self.sortie = sortie
+        self.rappels_jours = sorted(set(CONFIG['RAPPELS_JOURS']))
+        self.horizon = timedelta(days=CONFIG['HORIZON_JOURS'])
+        self.actualisation = timedelta(seconds=CONFIG['ACTUALISATION'])
+        self.arret = threading.Event()
+        # (instant, modèle, id, type, date limite), et les mêmes en ensemble pour ne rien empiler deux fois
+        self.tas = []
+        self.prevus = set()
+        self.charge_jusqua = None
+        self.lu_depuis = None
+        self.prochaine_actualisation = None
+
+    # --- instants des échéances
+
+    def evenements(self, modele, objet_id, date_limite, aujourd_hui, jusqua):
+        """Échéances d'une ligne en attente, jusqu'au jour ``jusqua`` exclu."""
+        if date_limite + timedelta(days=1) < jusqua:
+            yield debut_du_jour(date_limite + timedelta(days=1)), modele, objet_id, RETARD, date_limite
+        # un rappel reste utile jusqu'à la date limite, même si son jour est passé
+        if date_limite >= aujourd_hui:
+            for jours in self.rappels_jours:
+                if date_limite - timedelta(days=jours) < jusqua:
+                    yield debut_du_jour(date_limite - timedelta(days=jours)), modele, objet_id, ECHEANCE, date_limite
+
+    def empiler(self, evenement):
+        if evenement not in self.prevus:
+            self.prevus.add(evenement)
+            heapq.heappush(self.tas, evenement)
+
+    # --- lectures en base
+
+    def charger(self, jusqua):
+        """Empile les échéances dont le jour est avant ``jusqua`` (première fois : y compris celles en souffrance)."""
+        aujourd_hui = timezone.localdate(self.horloge())
+        depuis = self.charge_jusqua
+        plus_loin = max(self.rappels_jours, default=0)
+        for nom, modele in MODELES.items():
+            lignes = en_attente(modele).filter(date_limite__lt=jusqua + timedelta(days=plus_loin))
+            if depuis is not None:
+                # seules les lignes dont une échéance tombe dans [depuis, jusqua)
+                lignes = lignes.filter(date_limite__gte=depuis - timedelta(days=1))
+            for objet_id, date_limite in lignes.values_list('id', 'date_limite').iterator(CONFIG['TAILLE_LOT']):
+                for evenement in self.evenements(nom, objet_id, date_limite, aujourd_hui, jusqua):
+                    if depuis is None or evenement[0] >= debut_du_jour(depuis):
+                        self.empiler(evenement)
+        self.charge_jusqua = jusqua
+
+    def actualiser(self):
+        """Lignes modifiées depuis la dernière lecture : nouvelles échéances et retards levés."""
+        maintenant = self.horloge()
+        aujourd_hui = timezone.localdate(maintenant)
+        for nom, modele in MODELES.items():
+            lignes = (modele.objects.filter(date_modification__gte=self.lu_depuis - MARGE)
+                      .values_list('id', 'date_limite', 'statut', 'date_retard'))
+            leves = []
+            for objet_id, date_limite, statut, date_retard in lignes.iterator(CONFIG['TAILLE_LOT']):
+                if date_retard is not None:
+                    if statut != 'Terminé' and date_limite is not None and date_limite < aujourd_hui:
+                        continue
+                    leves.append(objet_id)
+                # en attente (ou de nouveau, retard levé) : ses échéances dans la fenêtre chargée
+                if statut != 'Terminé' and date_limite is not None:
+                    for evenement in self.evenements(nom, objet_id, date_limite, aujourd_hui, self.charge_jusqua):
+                        self.empiler(evenement)
+            for lot in par_lots(leves, CONFIG['TAILLE_LOT']):
+                self.lever_retards(nom, lot, maintenant)
+        self.lu_depuis = maintenant
+        self.prochaine_actualisation = maintenant + self.actualisation
+
+    # --- application
+
+    def traiter(self, dus):
+        groupes = {}
+        for _, nom, objet_id, type_rappel, date_limite in dus:
+            groupes.setdefault((nom, type_rappel), {})[objet_id] = date_limite
+        for (nom, type_rappel), attendus in groupes.items():
+            for lot in par_lots(list(attendus), CONFIG['TAILLE_LOT']):
+                if type_rappel == RETARD:
+                    self.marquer_retards(nom, lot)
+                else:
+                    self.rappeler(nom, {objet_id: attendus[objet_id] for objet_id in lot})
+
+    def marquer_retards(self, nom, ids):
+        modele = MODELES[nom]
+        maintenant = self.horloge()
+        with transaction.atomic():
+            # revérifié en base : la date limite a pu être repoussée, la ligne terminée
+            ids = list(en_attente(modele).filter(pk__in=ids, date_limite__lt=timezone.localdate(maintenant))
+                       .values_list('id', flat=True))
+            if not ids:
+                return
+            modele.objects.filter(pk__in=ids).update(date_retard=maintenant, date_modification=maintenant)
+            objets = list(modele.objects.filter(pk__in=ids))
+            self.ajouter_rappels(nom, objets, RETARD)
+            self.notifier(nom, objets)
+        self.journal(f"{len(objets)} {modele._meta.verbose_name_plural} en retard")
+
+    def lever_retards(self, nom, ids, maintenant):
+        # terminée ou date limite repoussée : plus en retard
+        modele = MODELES[nom]
+        with transaction.atomic():
+            modele.objects.filter(pk__in=ids).update(date_retard=None, date_modification=maintenant)
+            self.notifier(nom, list(modele.objects.filter(pk__in=ids)))
+
+    def rappeler(self, nom, attendus):
+        modele = MODELES[nom]
+        aujourd_hui = timezone.localdate(self.horloge())
+        objets = [objet for objet in en_attente(modele).filter(pk__in=attendus, date_limite__gte=aujourd_hui)
+                  if objet.date_limite == attendus[objet.pk]]
+        if objets:
+            self.ajouter_rappels(nom, objets, ECHEANCE)
+
+    def ajouter_rappels(self, nom, objets, type_rappel):
+        # le propriétaire du projet, et l'assignee pour une tâche
+        if nom == 'tache':
+            proprietaires = dict(Projet.objects.filter(pk__in={tache.projet_id for tache in objets})
+                                 .values_list('id', 'utilisateur_id'))
+            destinataires = [(tache, {proprietaires[tache.projet_id], tache.assignee_id}) for tache in objets]
+        else:
+            destinataires = [(projet, {projet.utilisateur_id}) for projet in objets]
+        # déjà dans la boîte d'envoi (redémarrage, ligne revue à l'actualisation)
+        deja = set(Rappel.objects.filter(modele=nom, type=type_rappel, objet_id__in=[objet.pk for objet in objets])
+                   .values_list('objet_id', 'date_limite', 'destinataire_id'))
+        rappels = [Rappel(modele=nom, objet_id=objet.pk, destinataire_id=user_id, type=type_rappel,
+                          date_limite=objet.date_limite)
+                   for objet, user_ids in destinataires for user_id in user_ids
+                   if user_id and (objet.pk, objet.date_limite, user_id) not in deja]
+        # ignore_conflicts : un second planificateur lancé par erreur n'ajoute pas de doublons
+        Rappel.objects.bulk_create(rappels, ignore_conflicts=True)
+        if rappels:
+            self.journal(f"{len(rappels)} rappel(s) « {type_rappel} » ajouté(s)")
+
+    def notifier(self, nom, objets):
+        # bulk update : ni signaux ni ETags, on fait comme la vue bulk
+        if not objets:
+            return
+        if nom == 'tache':
+            membres = Membre.objects.par_projet({tache.projet_id for tache in objets})
+            visible_par = {tache.pk: {*membres[tache.projet_id], tache.assignee_id} for tache in objets}
+        else:
+            membres = Membre.objects.par_projet([projet.pk for projet in objets])
+            visible_par = {projet.pk: set(membres[projet.pk]) for projet in objets}
+        incrementer_versions(*set().union(*visible_par.values()))
+        if broker.actif():
+            serializer = TacheSerializer if nom == 'tache' else ProjetSerializer
+            for objet in objets:
+                publier(nom, 'update', objet.pk, serializer(objet).data, visible_par[objet.pk])
+
+    def journal(self, message):
+        logger.info(message)
+        if self.sortie is not None:
+            self.sortie.write(f"{timezone.localtime(self.horloge()):%Y-%m-%d %H:%M:%S}  {message}")
+
+    # --- boucle
+
+    def executer_une_fois(self):
+        """Charge, actualise et applique tout ce qui est dû ; renvoie l'instant du prochain réveil."""
+        maintenant = self.horloge()
+        aujourd_hui = timezone.localdate(maintenant)
+        if self.charge_jusqua is None:
+            # démarrage : les modifications antérieures sont couvertes par la lecture complète
+            self.lu_depuis = maintenant
+            self.prochaine_actualisation = maintenant + self.actualisation
+            self.charger(aujourd_hui + self.horizon)
+        elif aujourd_hui >= self.charge_jusqua:
+            self.charger(aujourd_hui + self.horizon)
+        if maintenant >= self.prochaine_actualisation:
+            self.actualiser()
+
+        dus = []
+        while self.tas and self.tas[0][0] <= maintenant:
+            evenement = heapq.heappop(self.tas)
+            self.prevus.discard(evenement)
+            dus.append(evenement)
+        if dus:
+            self.traiter(dus)
+
+        reveils = [self.prochaine_actualisation, debut_du_jour(self.charge_jusqua)]
+        if self.tas:
+            reveils.append(self.tas[0][0])
+        return min(reveils)
+
+    def executer(self):
+        while not self.arret.is_set():
+            reveil = self.executer_une_fois()
+            self.arret.wait(max((reveil - self.horloge()).total_seconds(), 0))
+
+    def arreter(self):
+        self.arret.set()
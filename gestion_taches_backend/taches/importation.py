@@ -0,0 +1,95 @@
+import logging
+from collections import Counter
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from gestion_taches.importation import Importeur
+from projets.models import Membre, Projet, peut_editer
+from utilisateurs.importation import ImportUtilisateurs
+from utilisateurs.models import Utilisateur
+from utilisateurs.versions import incrementer_versions
+from .models import ImportCSV, Tache
+from .serializers import TacheBulkSerializer
+from .signals import publier_tache
+
+
+class ImportTaches(Importeur):
+    """Tâches créées avec les règles de TacheViewSet.perform_create.
+
+    Colonnes : nom, description, date_limite, statut, projet (id), assignee
+    (id). Projets et assignees sont chargés en une requête par lot.
+    """
+
+    # projet et assignee en ids, résolus par lot
+    serializer_class = TacheBulkSerializer
+
+    def preparer_lot(self, lot, rapport):
+        projets = Projet.objects.in_bulk({data['projet'] for _, data in lot})
+        self.membres = Membre.objects.par_projet(projets)
+        assignees = Utilisateur.objects.in_bulk({data['assignee'] for _, data in lot if data.get('assignee')})
+        message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+
+        taches = []
+        for numero, data in lot:
+            erreurs = {}
+            for champ, objets in (('projet', projets), ('assignee', assignees)):
+                pk = data.get(champ)
+                if pk is not None and pk not in objets:
+                    erreurs[champ] = [message.format(pk_value=pk)]
+            if erreurs:
+                rapport.erreur(numero, erreurs)
+                continue
+            projet = projets[data['projet']]
+            assignee = assignees.get(data.get('assignee'))
+            if self.user is not None and not peut_editer(self.user, self.membres[projet.pk].get(self.user.id)):
+                rapport.erreur(numero, ["Ce projet n'appartient pas à l'utilisateur connecté."])
+            elif assignee is not None and not assignee.is_active:
+                rapport.erreur(numero, ["L'utilisateur assigné doit être actif."])
+            else:
+                taches.append(Tache(**{**data, 'projet': projet, 'assignee': assignee}))
+        return taches
+
+    def enregistrer(self, objets):
+        Tache.objects.bulk_create(objets)
+        # bulk_create n'envoie pas de signaux
+        Projet.objects.ajuster_compteurs(Counter((tache.projet_id, tache.statut) for tache in objets))
+        visible_par = {tache.pk: {*self.membres[tache.projet_id], tache.assignee_id} for tache in objets}
+        incrementer_versions(*set().union(*visible_par.values()))
+        for tache in objets:
+            publier_tache(tache, 'create', visible_par[tache.pk])
+
+
+IMPORTEURS = {'utilisateurs': ImportUtilisateurs, 'taches': ImportTaches}
+
+logger = logging.getLogger(__name__)
+
+
+def mettre_en_attente(type_import, user, fichier):
+    """Enregistre le fichier envoyé à l'API ; manage.py traiter_imports fera l'import."""
+    return ImportCSV.objects.create(type=type_import, demandeur=user, fichier=fichier)
+
+
+def prendre_import():
+    """Réserve le plus ancien import en attente (ou None) ; sûr avec plusieurs traiteurs."""
+    for pk in ImportCSV.objects.filter(statut='en_attente').order_by('id').values_list('pk', flat=True)[:10]:
+        if ImportCSV.objects.filter(pk=pk, statut='en_attente').update(statut='en_cours', date_debut=timezone.now()):
+            return ImportCSV.objects.select_related('demandeur').get(pk=pk)
+    return None
+
+
+def traiter_import(import_csv):
+    # droits du demandeur, comme si l'import avait été fait pendant la requête
+    importeur = IMPORTEURS[import_csv.type](import_csv.demandeur)
+    try:
+        with import_csv.fichier.open('rb') as fichier:
+            import_csv.rapport = importeur.importer(fichier)
+        import_csv.statut = 'termine'
+    except Exception:
+        logger.exception("échec de l'import %s", import_csv.pk)
+        import_csv.statut = 'echec'
+        import_csv.rapport = {'detail': "L'import a échoué, les lots déjà écrits sont conservés."}
+    import_csv.date_fin = timezone.now()
+    import_csv.fichier.delete(save=False)
+    import_csv.save()
+    return import_csv
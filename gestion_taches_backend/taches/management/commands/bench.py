@@ -0,0 +1,206 @@
+import asyncio
+import json
+import platform
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projets.models import Projet
+from taches.management.commands.seed import Generateur
+from utilisateurs.management.commands.bench_connexion import centile
+from utilisateurs.models import Utilisateur
+
+MOT_DE_PASSE = 'motdepasse-bench'
+
+# nombre de requêtes SQL lu dans l'en-tête Server-Timing (gestion_taches/metriques.py)
+REQUETES_SQL = re.compile(r'desc="(\d+) requetes SQL"')
+
+
+class Command(BaseCommand):
+    help = ("Banc de charge : crée un jeu de données, rejoue les routes de l'API avec des clients "
+            "concurrents et enregistre latences, débit et requêtes SQL en JSON")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--etudiants', type=int, default=50)
+        parser.add_argument('--professeurs', type=int, default=10)
+        parser.add_argument('--projets-par-professeur', type=int, default=20)
+        parser.add_argument('--taches-par-projet', type=int, default=25)
+        parser.add_argument('--clients', type=int, default=8, help="clients concurrents")
+        parser.add_argument('--iterations', type=int, default=20, help="requêtes par client et par route")
+        parser.add_argument('--connexions', type=int, default=2,
+                            help="connexions et inscriptions par client (hachage coûteux)")
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--sortie', help="fichier JSON des résultats (défaut : bench_resultats/<date>.json)")
+        parser.add_argument('--comparer', help="fichier JSON d'une exécution précédente")
+
+    def handle(self, *args, **options):
+        precedent = None
+        if options['comparer']:
+            try:
+                precedent = json.loads(Path(options['comparer']).read_text())
+            except (OSError, ValueError) as erreur:
+                raise CommandError(f"Impossible de lire {options['comparer']} : {erreur}")
+
+        # base de test dans un fichier : les vues synchrones tournent dans un autre thread
+        dossier = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = str(Path(dossier) / 'bench.sqlite3')
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            comptes = self.remplir(options)
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                resultats = asyncio.run(self.scenario(comptes, options))
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+
+        rapport = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'commit': self.commit(),
+            'options': {cle: options[cle] for cle in (
+                'etudiants', 'professeurs', 'projets_par_professeur', 'taches_par_projet',
+                'clients', 'iterations', 'connexions', 'graine')},
+            'environnement': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base': connection.vendor,
+            },
+            'resultats': resultats,
+        }
+        self.afficher(resultats, precedent and precedent.get('resultats'))
+
+        sortie = Path(options['sortie'] or settings.BASE_DIR / 'bench_resultats'
+                      / f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+        sortie.parent.mkdir(parents=True, exist_ok=True)
+        sortie.write_text(json.dumps(rapport, indent=2, ensure_ascii=False))
+        self.stdout.write(f"\nRésultats enregistrés dans {sortie}")
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def remplir(self, options):
+        professeurs = options['professeurs']
+        Generateur(graine=options['graine'], mot_de_passe=MOT_DE_PASSE).generer(
+            options['etudiants'], professeurs, professeurs * options['projets_par_professeur'],
+            professeurs * options['projets_par_professeur'] * options['taches_par_projet'])
+        etudiants = list(Utilisateur.objects.filter(role='ETUDIANT').order_by('pk')[:options['clients']])
+        professeurs = list(Utilisateur.objects.filter(role='PROFESSEUR').order_by('pk')[:options['clients']])
+        if not etudiants and not professeurs:
+            raise CommandError("Il faut au moins un professeur ou un étudiant.")
+        # les clients alternent professeurs et étudiants
+        comptes = []
+        for i in range(options['clients']):
+            groupe = professeurs if (i % 2 == 0 and professeurs) or not etudiants else etudiants
+            user = groupe[(i // 2) % len(groupe)]
+            comptes.append({'user': user, 'jeton': str(AccessToken.for_user(user)),
+                            'projets': list(Projet.objects.filter(utilisateur=user).values_list('pk', flat=True))})
+        return comptes
+
+    async def scenario(self, comptes, options):
+        mesures = defaultdict(list)  # route -> [(latence, statut, requêtes SQL)]
+        durees = {}
+
+        async def appeler(route, attendu, methode, client, url, compte=None, **kwargs):
+            if compte is not None:
+                kwargs['headers'] = {'Authorization': f"Bearer {compte['jeton']}"}
+            t0 = time.perf_counter()
+            reponse = await getattr(client, methode)(url, **kwargs)
+            latence = time.perf_counter() - t0
+            requetes = REQUETES_SQL.search(reponse.get('Server-Timing', ''))
+            mesures[route].append((latence, reponse.status_code == attendu, requetes and int(requetes[1])))
+            return reponse
+
+        async def phase(nom, fonction):
+            debut = time.perf_counter()
+            await asyncio.gather(*(fonction(index, compte) for index, compte in enumerate(comptes)))
+            durees[nom] = time.perf_counter() - debut
+
+        async def connexions(index, compte):
+            client = AsyncClient()
+            for _ in range(options['connexions']):
+                await appeler('token', 200, 'post', client, '/api/token/',
+                              data={'username': compte['user'].username, 'password': MOT_DE_PASSE})
+
+        async def inscriptions(index, compte):
+            client = AsyncClient()
+            for i in range(options['connexions']):
+                await appeler('inscription', 201, 'post', client, '/api/inscription/', data={
+                    'username': f'nouveau{index}-{i}', 'password': MOT_DE_PASSE, 'email': f'n{index}-{i}@exemple.fr',
+                })
+
+        async def lectures(index, compte):
+            client = AsyncClient()
+            for _ in range(options['iterations']):
+                await appeler('me', 200, 'get', client, '/api/utilisateurs/me/', compte)
+                await appeler('projets', 200, 'get', client, '/api/projets/', compte)
+                await appeler('taches', 200, 'get', client, '/api/taches/', compte)
+
+        async def crud(index, compte):
+            # seuls les propriétaires de projets créent des tâches
+            if not compte['projets']:
+                return
+            client = AsyncClient()
+            for i in range(options['iterations']):
+                reponse = await appeler('taches_creation', 201, 'post', client, '/api/taches/', compte, data={
+                    'nom': f'Bench {index}.{i}', 'date_limite': '2030-01-01',
+                    'projet': compte['projets'][i % len(compte['projets'])],
+                }, content_type='application/json')
+                if reponse.status_code != 201:
+                    continue
+                url = f"/api/taches/{reponse.json()['id']}/"
+                await appeler('taches_lecture', 200, 'get', client, url, compte)
+                await appeler('taches_modification', 200, 'patch', client, url, compte,
+                              data={'statut': 'En cours'}, content_type='application/json')
+                await appeler('taches_suppression', 204, 'delete', client, url, compte)
+
+        for nom, fonction in (('connexion', connexions), ('inscription', inscriptions),
+                              ('lecture', lectures), ('crud', crud)):
+            await phase(nom, fonction)
+
+        phases = {'token': 'connexion', 'inscription': 'inscription', 'me': 'lecture', 'projets': 'lecture',
+                  'taches': 'lecture', 'taches_creation': 'crud', 'taches_lecture': 'crud',
+                  'taches_modification': 'crud', 'taches_suppression': 'crud'}
+        resultats = {}
+        for route, valeurs in mesures.items():
+            latences = [latence for latence, _, _ in valeurs]
+            requetes = [nombre for _, _, nombre in valeurs if nombre is not None]
+            resultats[route] = {
+                'requetes': len(valeurs),
+                'erreurs': sum(1 for _, ok, _ in valeurs if not ok),
+                'p50_ms': round(statistics.median(latences) * 1000, 2),
+                'p95_ms': round(centile(latences, 95) * 1000, 2),
+                'p99_ms': round(centile(latences, 99) * 1000, 2),
+                'debit_par_s': round(len(valeurs) / durees[phases[route]], 1),
+                'sql_moyenne': round(statistics.mean(requetes), 1) if requetes else None,
+                'sql_max': max(requetes) if requetes else None,
+            }
+        return resultats
+
+    def afficher(self, resultats, precedent):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{'route':22}{'req.':>6}{'err.':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'SQL moy.':>10}"))
+        for route, stats in resultats.items():
+            sql = '-' if stats['sql_moyenne'] is None else f"{stats['sql_moyenne']:.1f}"
+            ligne = (f"{route:22}{stats['requetes']:>6}{stats['erreurs']:>6}{stats['p50_ms']:>9.1f}"
+                     f"{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['debit_par_s']:>9.1f}{sql:>10}")
+            ancien = (precedent or {}).get(route)
+            if ancien:
+                ecart = (stats['p95_ms'] - ancien['p95_ms']) / ancien['p95_ms'] * 100 if ancien['p95_ms'] else 0
+                ligne += f"   p95 {ecart:+.0f} % (avant {ancien['p95_ms']:.1f})"
+            self.stdout.write(ligne)
@@ -0,0 +1,105 @@
+import copy
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+from gestion_taches.base_de_donnees import configuration_base
+from projets.models import Membre, Projet
+from taches.models import Tache
+from utilisateurs.models import Utilisateur
+
+
+class Command(BaseCommand):
+    help = "Compare les profils SQLite (simple vs WAL + connexion persistante) sous lectures/écritures concurrentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requetes', type=int, default=300, help="requêtes par thread")
+        parser.add_argument('--ecritures', type=float, default=0.2, help="part des requêtes qui écrivent")
+        parser.add_argument('--taches', type=int, default=20_000)
+
+    def handle(self, *args, **options):
+        dossier = Path(tempfile.mkdtemp())
+        for profil in ('sqlite-simple', 'sqlite'):
+            alias = f'bench_{profil}'
+            config = copy.deepcopy(connections['default'].settings_dict)
+            config.update(configuration_base(dossier, {'DB_PROFIL': profil, 'DB_NOM': str(dossier / f'{profil}.sqlite3')}))
+            config.setdefault('OPTIONS', {})
+            connections.settings[alias] = config
+            call_command('migrate', database=alias, verbosity=0)
+            self.remplir(alias, options['taches'])
+            self.mesurer(alias, profil, options)
+            connections[alias].close()
+
+    def remplir(self, alias, nb_taches):
+        rng = random.Random(1)
+        users = Utilisateur.objects.using(alias).bulk_create(
+            [Utilisateur(username=f'bench{i}', password='!') for i in range(50)]
+        )
+        projets = Projet.objects.using(alias).bulk_create(
+            [Projet(nom=f'projet {i}', utilisateur=rng.choice(users)) for i in range(500)]
+        )
+        Membre.objects.db_manager(alias).completer_proprietaires()
+        Tache.objects.using(alias).bulk_create(
+            [Tache(nom=f'tâche {i}', date_limite=date.today() + timedelta(days=rng.randrange(-60, 60)),
+                   projet=rng.choice(projets), assignee=rng.choice(users)) for i in range(nb_taches)],
+            batch_size=2_000,
+        )
+
+    def mesurer(self, alias, profil, options):
+        persistante = connections.settings[alias]['CONN_MAX_AGE'] != 0
+        user_ids = list(Utilisateur.objects.using(alias).values_list('id', flat=True))
+        tache_ids = list(Tache.objects.using(alias).values_list('id', flat=True))
+        statuts = [statut for statut, _ in Tache.STATUT_CHOIX]
+        latences, erreurs = [], []
+        verrou = threading.Lock()
+
+        def client(graine):
+            rng = random.Random(graine)
+            locales, echecs = [], 0
+            for _ in range(options['requetes']):
+                t0 = time.perf_counter()
+                try:
+                    if rng.random() < options['ecritures']:
+                        with transaction.atomic(using=alias):
+                            tache = Tache.objects.using(alias).get(pk=rng.choice(tache_ids))
+                            tache.statut = rng.choice(statuts)
+                            tache.save(using=alias, update_fields=['statut'])
+                    else:
+                        user = Utilisateur.objects.using(alias).get(pk=rng.choice(user_ids))
+                        list(Tache.objects.using(alias).visibles_par(user).order_by('date_creation', 'id')[:50])
+                except OperationalError:
+                    echecs += 1
+                finally:
+                    # sans connexion persistante, chaque « requête » HTTP rouvre la base
+                    if not persistante:
+                        connections[alias].close()
+                locales.append(time.perf_counter() - t0)
+            connections[alias].close()
+            with verrou:
+                latences.extend(locales)
+                erreurs.append(echecs)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(options['threads'])]
+        debut = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duree = time.perf_counter() - debut
+
+        latences.sort()
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== profil {profil}"))
+        self.stdout.write(f"requêtes        {len(latences)} en {duree:.2f} s -> {len(latences) / duree:.0f} /s")
+        self.stdout.write(f"latence         p50 {statistics.median(latences) * 1000:.1f} ms   "
+                          f"p95 {latences[int(len(latences) * 0.95)] * 1000:.1f} ms   "
+                          f"p99 {latences[int(len(latences) * 0.99)] * 1000:.1f} ms")
+        self.stdout.write(f"erreurs verrou  {sum(erreurs)}")
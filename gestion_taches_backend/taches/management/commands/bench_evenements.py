@@ -0,0 +1,166 @@
+import asyncio
+import gc
+import resource
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from gestion_taches.evenements import broker
+from projets.models import Membre, Projet
+from taches.models import Tache
+from utilisateurs.management.commands.bench_connexion import centile
+from utilisateurs.models import Utilisateur
+
+
+def memoire_residente():
+    # RSS courante en octets (Linux), sinon le pic
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Connexion:
+    """Client SSE branché directement sur l'application ASGI, sans réseau."""
+
+    def __init__(self, application, jeton):
+        self.application = application
+        self.jeton = jeton
+        self.fin = asyncio.Event()
+        self.pret = asyncio.Event()
+        self.evenements = []  # (instant de réception, morceau reçu)
+        self.statut = None
+        self.corps_lu = False
+
+    async def recevoir(self):
+        # le corps (vide) de la requête, puis la déconnexion quand fin est levé
+        if not self.corps_lu:
+            self.corps_lu = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.fin.wait()
+        return {'type': 'http.disconnect'}
+
+    async def envoyer(self, message):
+        if message['type'] == 'http.response.start':
+            self.statut = message['status']
+        elif message.get('body'):
+            if message['body'].startswith(b'event: pret'):
+                self.pret.set()
+            else:
+                self.evenements.append((time.perf_counter(), message['body']))
+
+    async def ouvrir(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': '/api/evenements/', 'raw_path': b'/api/evenements/',
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream'),
+                        (b'authorization', f'Bearer {self.jeton}'.encode())],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        await self.application(scope, self.recevoir, self.envoyer)
+
+
+class Command(BaseCommand):
+    help = "Ouvre des milliers de connexions SSE inactives et mesure mémoire, ouverture et diffusion des événements"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connexions', type=int, default=5_000)
+        parser.add_argument('--utilisateurs', type=int, default=500)
+        parser.add_argument('--evenements', type=int, default=50)
+        parser.add_argument('--attente', type=float, default=2.0, help="secondes d'inactivité mesurées")
+
+    def handle(self, *args, **options):
+        # base de test dans un fichier : les vues synchrones tournent dans un autre thread
+        dossier = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = str(Path(dossier) / 'bench.sqlite3')
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            users = self.preparer(options['utilisateurs'])
+            asyncio.run(self.scenario(users, options['connexions'], options['evenements'], options['attente']))
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+
+    def preparer(self, nb_utilisateurs):
+        mot_de_passe = make_password('bench')
+        users = Utilisateur.objects.bulk_create(
+            Utilisateur(username=f'sse{i}', password=mot_de_passe) for i in range(nb_utilisateurs)
+        )
+        projets = Projet.objects.bulk_create(Projet(nom=f'P{user.pk}', utilisateur=user) for user in users)
+        Membre.objects.completer_proprietaires()
+        Tache.objects.bulk_create(
+            Tache(nom=f'T{projet.pk}', date_limite='2030-01-01', projet=projet) for projet in projets
+        )
+        return users
+
+    async def scenario(self, users, nb_connexions, nb_evenements, attente):
+        application = get_asgi_application()
+        jetons = {user.pk: str(AccessToken.for_user(user)) for user in users}
+        gc.collect()
+        memoire_avant = memoire_residente()
+
+        # 1) ouverture des connexions, réparties sur les utilisateurs
+        connexions = [Connexion(application, jetons[users[i % len(users)].pk]) for i in range(nb_connexions)]
+        debut = time.perf_counter()
+        taches_asgi = [asyncio.create_task(connexion.ouvrir()) for connexion in connexions]
+        await asyncio.gather(*(connexion.pret.wait() for connexion in connexions))
+        duree_ouverture = time.perf_counter() - debut
+        assert all(connexion.statut == 200 for connexion in connexions)
+        gc.collect()
+        par_connexion = (memoire_residente() - memoire_avant) / nb_connexions
+
+        # 2) connexions inactives : aucun octet ne doit partir avant le keepalive
+        await asyncio.sleep(attente)
+        bruit = sum(len(connexion.evenements) for connexion in connexions)
+
+        # 3) modifications de tâches : chaque événement ne va qu'aux connexions du propriétaire
+        par_user = {}
+        for connexion, user in zip(connexions, (users[i % len(users)] for i in range(nb_connexions))):
+            par_user.setdefault(user.pk, []).append(connexion)
+        cibles = [users[i * len(users) // nb_evenements] for i in range(nb_evenements)]
+        latences, attendus = [], 0
+
+        @sync_to_async
+        def modifier(user):
+            tache = Tache.objects.filter(projet__utilisateur=user).first()
+            tache.statut = 'En cours' if tache.statut != 'En cours' else 'À faire'
+            t0 = time.perf_counter()
+            tache.save()
+            return t0
+
+        for user in cibles:
+            avant = {id(connexion): len(connexion.evenements) for connexion in par_user[user.pk]}
+            t0 = await modifier(user)
+            attendus += len(par_user[user.pk])
+            for connexion in par_user[user.pk]:
+                while len(connexion.evenements) == avant[id(connexion)]:
+                    await asyncio.sleep(0)
+                latences.append(connexion.evenements[-1][0] - t0)
+        recus = sum(len(connexion.evenements) for connexion in connexions)
+
+        # 4) déconnexion : tous les abonnements doivent être libérés
+        abonnes = broker.nombre_abonnes()
+        for connexion in connexions:
+            connexion.fin.set()
+        await asyncio.gather(*taches_asgi)
+        restants = broker.nombre_abonnes()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {nb_connexions} connexions SSE, {len(users)} utilisateurs"))
+        self.stdout.write(f"ouverture        {duree_ouverture:.2f} s -> {nb_connexions / duree_ouverture:.0f} connexions/s")
+        self.stdout.write(f"mémoire          {par_connexion / 1024:.1f} Kio par connexion (RSS)")
+        self.stdout.write(f"inactivité       {bruit} message(s) en {attente:.1f} s")
+        self.stdout.write(f"diffusion        {nb_evenements} modifications -> {recus - bruit} livraisons "
+                          f"({attendus} attendues)")
+        self.stdout.write(f"latence          p50 {statistics.median(latences) * 1000:.2f} ms   "
+                          f"p99 {centile(latences, 99) * 1000:.2f} ms (save() -> réception)")
+        self.stdout.write(f"abonnements      {abonnes} ouverts, {restants} après déconnexion")
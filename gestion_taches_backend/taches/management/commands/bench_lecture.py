@@ -0,0 +1,101 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+
+from gestion_taches.lecture_rapide import LecteurRapide
+from projets.models import Membre, Projet
+from projets.serializers import ProjetSerializer
+from taches.models import Tache
+from taches.serializers import TacheSerializer
+from utilisateurs.models import Utilisateur
+
+
+def chronometrer(fonction, repetitions):
+    # meilleur temps sur plusieurs passages
+    meilleur, resultat = None, None
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction()
+        duree = time.perf_counter() - t0
+        meilleur = duree if meilleur is None else min(meilleur, duree)
+    return meilleur, resultat
+
+
+class Command(BaseCommand):
+    help = "Compare ModelSerializer et la lecture rapide (values_list) sur des listes de 10k et 100k lignes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 100_000])
+        parser.add_argument('--repetitions', type=int, default=3)
+        parser.add_argument('--graine', type=int, default=42)
+
+    def handle(self, *args, **options):
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            random.seed(options['graine'])
+            self.remplir(max(options['tailles']))
+            for taille in options['tailles']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {taille} lignes"))
+                taches = Tache.objects.order_by('id')[:taille]
+                projets = Projet.objects.order_by('id')[:taille]
+                for libelle, queryset, serializer in (('taches', taches, TacheSerializer),
+                                                      ('projets', projets, ProjetSerializer)):
+                    self.comparer(libelle, queryset, serializer, options['repetitions'])
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+
+    def remplir(self, nombre):
+        user = Utilisateur.objects.create(username='bench', password=make_password('bench'))
+        aujourd_hui = date.today()
+        statuts = [statut for statut, _ in Tache.STATUT_CHOIX]
+        Projet.objects.bulk_create(
+            (Projet(nom=f'Projet {i}', description='Description ' * random.randint(0, 20), utilisateur=user,
+                    date_limite=aujourd_hui + timedelta(days=i % 90) if i % 3 else None)
+             for i in range(nombre)),
+            batch_size=5000,
+        )
+        Membre.objects.completer_proprietaires()
+        projet_ids = list(Projet.objects.values_list('id', flat=True))
+        Tache.objects.bulk_create(
+            (Tache(nom=f'Tâche {i}', description='Détail ' * random.randint(0, 20) or None,
+                   date_limite=aujourd_hui + timedelta(days=i % 90), statut=random.choice(statuts),
+                   projet_id=random.choice(projet_ids), assignee=user if i % 2 else None)
+             for i in range(nombre)),
+            batch_size=5000,
+        )
+
+    def comparer(self, libelle, queryset, serializer_classe, repetitions):
+        rendu = JSONRenderer()
+        lecteur = LecteurRapide(serializer_classe())
+
+        # requête + conversion + rendu JSON, comme dans la vue (all() : pas de cache du queryset)
+        duree_serializer, attendu = chronometrer(
+            lambda: rendu.render(serializer_classe(queryset.all(), many=True).data), repetitions)
+        duree_rapide, obtenu = chronometrer(
+            lambda: rendu.render(lecteur.convertir(lecteur.preparer(queryset).iterator(chunk_size=2000))),
+            repetitions)
+        if obtenu != attendu:
+            raise CommandError(f"{libelle} : la lecture rapide ne produit pas le même JSON")
+
+        # conversion seule, lignes déjà chargées
+        instances = list(queryset)
+        lignes = list(lecteur.preparer(queryset))
+        conversion_serializer, _ = chronometrer(lambda: serializer_classe(instances, many=True).data, repetitions)
+        conversion_rapide, _ = chronometrer(lambda: lecteur.convertir(lignes), repetitions)
+
+        nombre = len(instances)
+        self.stdout.write(
+            f"{libelle:8} complet     serializer {nombre / duree_serializer:9,.0f} lignes/s   "
+            f"rapide {nombre / duree_rapide:9,.0f} lignes/s   x{duree_serializer / duree_rapide:.1f}   "
+            f"(JSON identique, {len(attendu):,} octets)"
+        )
+        self.stdout.write(
+            f"{libelle:8} conversion  serializer {nombre / conversion_serializer:9,.0f} lignes/s   "
+            f"rapide {nombre / conversion_rapide:9,.0f} lignes/s   x{conversion_serializer / conversion_rapide:.1f}"
+        )
@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from projets.models import Membre, Projet
+from taches.models import Tache
+from taches.recherche import rechercher_taches
+from utilisateurs.models import Utilisateur
+
+
+# ancienne requête de visibilité (OR à travers une jointure), gardée pour comparaison
+def ancienne_visibilite(user):
+    return Tache.objects.filter(projet__utilisateur=user) | Tache.objects.filter(assignee=user)
+
+
+class Command(BaseCommand):
+    help = "Compare les plans et la latence de la requête de visibilité des tâches sur une base de test"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taches', type=int, default=1_000_000)
+        parser.add_argument('--utilisateurs', type=int, default=2_000)
+        parser.add_argument('--projets', type=int, default=20_000)
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--graine', type=int, default=42)
+
+    def handle(self, *args, **options):
+        # tout se passe dans une base de test jetable, jamais dans db.sqlite3
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.remplir(options)
+            self.mesurer(options['repetitions'])
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+
+    def remplir(self, options):
+        rng = random.Random(options['graine'])
+        mot_de_passe = make_password('bench')
+        Utilisateur.objects.bulk_create(
+            (Utilisateur(username=f'bench{i}', password=mot_de_passe,
+                         role='PROFESSEUR' if i % 10 == 0 else 'ETUDIANT')
+             for i in range(options['utilisateurs'])),
+            batch_size=2_000,
+        )
+        user_ids = list(Utilisateur.objects.values_list('id', flat=True))
+        Projet.objects.bulk_create(
+            (Projet(nom=f'projet {i}', utilisateur_id=rng.choice(user_ids))
+             for i in range(options['projets'])),
+            batch_size=5_000,
+        )
+        Membre.objects.completer_proprietaires()
+        projet_ids = list(Projet.objects.values_list('id', flat=True))
+
+        statuts = [statut for statut, _ in Tache.STATUT_CHOIX]
+        debut = date.today() - timedelta(days=180)
+        restantes = options['taches']
+        while restantes:
+            lot = min(restantes, 10_000)
+            Tache.objects.bulk_create([
+                Tache(
+                    nom=f'tâche {restantes - i}',
+                    date_limite=debut + timedelta(days=rng.randrange(365)),
+                    statut=rng.choice(statuts),
+                    projet_id=rng.choice(projet_ids),
+                    assignee_id=rng.choice(user_ids) if rng.random() < 0.7 else None,
+                )
+                for i in range(lot)
+            ])
+            restantes -= lot
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f"{Tache.objects.count()} tâches, {len(projet_ids)} projets, {len(user_ids)} utilisateurs")
+
+    def mesurer(self, repetitions):
+        user = Utilisateur.objects.get(username='bench1')
+        aujourd_hui = date.today()
+        scenarios = {
+            'première page': lambda qs: list(qs.order_by('date_creation', 'id').values_list('id', flat=True)[:50]),
+            'comptage': lambda qs: qs.count(),
+            'filtre statut': lambda qs: qs.filter(statut='En cours').count(),
+            'en retard': lambda qs: qs.filter(date_limite__lt=aujourd_hui).exclude(statut='Terminé').count(),
+        }
+        for libelle, requete in (('ancienne', ancienne_visibilite), ('nouvelle', Tache.objects.visibles_par)):
+            qs = requete(user)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== requête {libelle}"))
+            self.stdout.write(qs.explain())
+            for nom, scenario in scenarios.items():
+                durees = []
+                for _ in range(repetitions):
+                    t0 = time.perf_counter()
+                    scenario(requete(user))
+                    durees.append((time.perf_counter() - t0) * 1000)
+                self.stdout.write(f"{nom:<15} médiane {statistics.median(durees):8.2f} ms   max {max(durees):8.2f} ms")
+
+        # recherche plein texte (index FTS5) avec les mêmes règles de visibilité
+        self.stdout.write(self.style.MIGRATE_HEADING("\n== recherche plein texte"))
+        for texte in ('4242', 'tache 99', 'tâche'):
+            durees = []
+            for _ in range(repetitions):
+                t0 = time.perf_counter()
+                list(rechercher_taches(user, texte))
+                durees.append((time.perf_counter() - t0) * 1000)
+            self.stdout.write(f"{texte!r:<15} médiane {statistics.median(durees):8.2f} ms   max {max(durees):8.2f} ms")
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from taches.importation import IMPORTEURS
+from utilisateurs.models import Utilisateur
+
+
+class Command(BaseCommand):
+    help = "Importe des comptes ou des tâches depuis un fichier CSV (lu en flux, écrit par lots)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('type', choices=sorted(IMPORTEURS))
+        parser.add_argument('fichier')
+        parser.add_argument('--en-tant-que', help="applique les droits de cet utilisateur (défaut : aucun contrôle)")
+        parser.add_argument('--lot', type=int, help="lignes par lot et par transaction")
+        parser.add_argument('--processus', type=int, help="processus de hachage des mots de passe")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['en_tant_que']:
+            user = Utilisateur.objects.filter(username=options['en_tant_que']).first()
+            if user is None:
+                raise CommandError(f"Utilisateur inconnu : {options['en_tant_que']}")
+        kwargs = {'processus': options['processus']} if options['type'] == 'utilisateurs' else {}
+        importeur = IMPORTEURS[options['type']](user, taille_lot=options['lot'], **kwargs)
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                rapport = importeur.importer(fichier)
+        except OSError as erreur:
+            raise CommandError(f"Impossible de lire {options['fichier']} : {erreur}")
+
+        for erreur in rapport['erreurs']:
+            self.stderr.write(f"ligne {erreur['ligne']} : {erreur['erreurs']}")
+        if rapport['erreurs_omises']:
+            self.stderr.write(f"... et {rapport['erreurs_omises']} autre(s) erreur(s)")
+        self.stdout.write(f"{rapport['lignes']} ligne(s) lue(s), {rapport['creees']} créée(s), "
+                          f"{rapport['refusees']} refusée(s)")
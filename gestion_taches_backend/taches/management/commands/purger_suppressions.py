@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from taches.synchro import RETENTION, purger_suppressions
+
+
+class Command(BaseCommand):
+    help = "Supprime les tombstones de /api/sync/ plus vieux que SYNC_RETENTION_JOURS"
+
+    def handle(self, *args, **options):
+        nombre = purger_suppressions()
+        self.stdout.write(f"{nombre} suppression(s) purgée(s) (rétention : {RETENTION.days} jours)")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from projets.models import Projet
+
+
+class Command(BaseCommand):
+    help = ("Recalcule les compteurs de tâches des projets (nb_a_faire, nb_en_cours, nb_terminees) "
+            "et leur statut automatique, seulement pour les projets qui ont dérivé")
+
+    def handle(self, *args, **options):
+        nombre = Projet.objects.recompter()
+        self.stdout.write(f"{nombre} projet(s) corrigé(s)")
@@ -0,0 +1,31 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from taches.echeances import CONFIG, Planificateur
+
+
+class Command(BaseCommand):
+    help = ("Planificateur des échéances : marque les tâches et projets en retard et ajoute "
+            "les rappels à la boîte d'envoi (taches.Rappel), réveillé à la prochaine échéance")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--une-fois', action='store_true',
+                            help="applique ce qui est dû puis s'arrête (pour cron)")
+        parser.add_argument('--actualisation', type=int, default=CONFIG['ACTUALISATION'],
+                            help="secondes entre deux lectures des lignes modifiées")
+
+    def handle(self, *args, **options):
+        CONFIG['ACTUALISATION'] = options['actualisation']
+        planificateur = Planificateur(sortie=self.stdout)
+        if options['une_fois']:
+            planificateur.executer_une_fois()
+            return
+
+        # arrêt propre sur SIGTERM / Ctrl-C : le lot en cours est terminé
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: planificateur.arreter())
+        self.stdout.write(f"Planificateur démarré (rappels {CONFIG['RAPPELS_JOURS']} jour(s) avant, "
+                          f"actualisation toutes les {CONFIG['ACTUALISATION']} s)")
+        planificateur.executer()
+        self.stdout.write("Planificateur arrêté")
@@ -0,0 +1,172 @@
+import random
+import time
+from bisect import bisect_right
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from projets.models import Membre, Projet
+from taches.models import Tache
+from utilisateurs.models import Utilisateur
+from utilisateurs.versions import incrementer_versions
+
+PRENOMS = ['Awa', 'Lucas', 'Fatou', 'Hugo', 'Inès', 'Moussa', 'Chloé', 'Yann', 'Aminata', 'Léa',
+           'Karim', 'Manon', 'Ibrahim', 'Sarah', 'Théo', 'Mariam', 'Nathan', 'Aïcha', 'Louis', 'Emma']
+NOMS = ['Diallo', 'Martin', 'Ndiaye', 'Bernard', 'Traoré', 'Dubois', 'Koné', 'Moreau', 'Mbaye', 'Laurent',
+        'Camara', 'Simon', 'Sow', 'Michel', 'Ouédraogo', 'Lefebvre', 'Fall', 'Garcia', 'Cissé', 'Roux']
+SUJETS = ['Base de données', 'Réseaux', 'Algorithmique', 'Compilation', 'Systèmes', 'Génie logiciel',
+          'Sécurité', 'Web', 'Mobile', 'Apprentissage automatique', 'Statistiques', 'Cloud']
+ACTIONS = ['Rédiger', 'Relire', 'Tester', 'Corriger', 'Documenter', 'Présenter', 'Analyser', 'Implémenter']
+OBJETS = ['le rapport', 'le schéma', 'les tests', 'la maquette', 'le module', "l'API", 'la démo', 'le cahier des charges']
+
+
+class Plages:
+    """Ids insérés, gardés en intervalles contigus : mémoire constante quel que soit le nombre de lignes."""
+
+    def __init__(self):
+        self.debuts = []
+        self.cumuls = []  # nombre d'ids avant chaque intervalle
+        self.total = 0
+
+    def ajouter(self, ids):
+        for pk in ids:
+            if not self.debuts or pk != self.debuts[-1] + self.total - self.cumuls[-1]:
+                self.debuts.append(pk)
+                self.cumuls.append(self.total)
+            self.total += 1
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        i = bisect_right(self.cumuls, index) - 1
+        return self.debuts[i] + index - self.cumuls[i]
+
+    def tirer(self, alea, biais=1.0):
+        # biais > 1 : les premiers ids sont tirés plus souvent (gros projets, étudiants très chargés)
+        return self[int(len(self) * alea.random() ** biais)]
+
+
+def par_lots(objets, taille):
+    objets = iter(objets)
+    while lot := list(islice(objets, taille)):
+        yield lot
+
+
+class Generateur:
+    """Crée utilisateurs, projets et tâches par lots de bulk_create, sans garder les lignes en mémoire."""
+
+    def __init__(self, graine=42, taille_lot=5000, using=DEFAULT_DB_ALIAS, mot_de_passe='motdepasse',
+                 prefixe='seed', sortie=None):
+        self.alea = random.Random(graine)
+        self.taille_lot = taille_lot
+        self.using = using
+        self.mot_de_passe = mot_de_passe
+        self.prefixe = prefixe
+        self.sortie = sortie
+        self.aujourd_hui = date.today()
+        self.etudiants, self.professeurs, self.projets = Plages(), Plages(), Plages()
+
+    def generer(self, etudiants, professeurs, projets, taches):
+        if Utilisateur.objects.using(self.using).filter(username__startswith=f'{self.prefixe}-').exists():
+            raise CommandError(f"Des comptes « {self.prefixe}-… » existent déjà : choisissez un autre --prefixe.")
+        if (projets and not professeurs) or (taches and not projets):
+            raise CommandError("Il faut des professeurs pour les projets et des projets pour les tâches.")
+        self.inserer(Utilisateur, self.utilisateurs('ETUDIANT', etudiants), self.etudiants)
+        self.inserer(Utilisateur, self.utilisateurs('PROFESSEUR', professeurs), self.professeurs)
+        self.inserer(Projet, self.liste_projets(projets), self.projets)
+        # bulk_create n'envoie pas post_save : lignes propriétaires de la table d'accès
+        Membre.objects.db_manager(self.using).completer_proprietaires(self.taille_lot)
+        self.inserer(Tache, self.liste_taches(taches))
+        # compteurs de tâches des projets (bulk_create ne les tient pas à jour)
+        Projet.objects.using(self.using).recompter()
+        # les nouvelles lignes sont visibles par les superusers
+        incrementer_versions(using=self.using)
+
+    def inserer(self, modele, objets, plages=None):
+        connexion = connections[self.using]
+        debut, nombre = time.perf_counter(), 0
+        for lot in par_lots(objets, self.taille_lot):
+            with transaction.atomic(using=self.using):
+                avant = None
+                if plages is not None and not connexion.features.can_return_rows_from_bulk_insert:
+                    avant = modele.objects.using(self.using).aggregate(m=Max('pk'))['m'] or 0
+                modele.objects.using(self.using).bulk_create(lot)
+                if plages is not None:
+                    if avant is None:
+                        plages.ajouter(objet.pk for objet in lot)
+                    else:
+                        plages.ajouter(modele.objects.using(self.using).filter(pk__gt=avant)
+                                       .order_by('pk').values_list('pk', flat=True))
+            # avec DEBUG, Django garde le texte des requêtes (plusieurs Mo par lot)
+            connexion.queries_log.clear()
+            nombre += len(lot)
+        if self.sortie is not None and nombre:
+            duree = time.perf_counter() - debut
+            self.sortie.write(f"{modele._meta.verbose_name_plural:15} {nombre:>10,} lignes  "
+                              f"{duree:7.1f} s  {nombre / duree:>9,.0f} lignes/s")
+
+    def utilisateurs(self, role, nombre):
+        # un seul hachage par rôle : PBKDF2 coûte des dizaines de ms par appel
+        mot_de_passe = make_password(self.mot_de_passe)
+        alea, suffixe = self.alea, 'etu' if role == 'ETUDIANT' else 'prof'
+        for i in range(nombre):
+            username = f'{self.prefixe}-{suffixe}-{i}'
+            naissance = None
+            if role == 'ETUDIANT':
+                naissance = self.aujourd_hui - timedelta(days=alea.randint(18 * 365, 28 * 365))
+            yield Utilisateur(username=username, email=f'{username}@exemple.fr', password=mot_de_passe, role=role,
+                              first_name=alea.choice(PRENOMS), last_name=alea.choice(NOMS),
+                              date_naissance=naissance)
+
+    def liste_projets(self, nombre):
+        alea = self.alea
+        statuts, poids = [statut for statut, _ in Projet.STATUT_CHOIX], [30, 50, 20]
+        for i in range(nombre):
+            sujet = alea.choice(SUJETS)
+            limite = None if alea.random() < 0.1 else self.aujourd_hui + timedelta(days=alea.randint(-60, 180))
+            yield Projet(nom=f'{sujet} — projet {i}', description=f"Projet de {sujet.lower()}.",
+                         utilisateur_id=self.professeurs.tirer(alea, 1.5), date_limite=limite,
+                         statut=alea.choices(statuts, poids)[0])
+
+    def liste_taches(self, nombre):
+        alea = self.alea
+        statuts = [statut for statut, _ in Tache.STATUT_CHOIX]
+        for i in range(nombre):
+            # échéances concentrées sur les deux semaines à venir, quelques-unes dépassées
+            limite = self.aujourd_hui + timedelta(days=round(alea.triangular(-90, 120, 14)))
+            # une échéance passée est le plus souvent terminée
+            poids = [15, 15, 70] if limite < self.aujourd_hui else [45, 35, 20]
+            assignee = self.etudiants.tirer(alea, 1.3) if self.etudiants and alea.random() < 0.75 else None
+            yield Tache(nom=f'{alea.choice(ACTIONS)} {alea.choice(OBJETS)} ({i})',
+                        description=None if alea.random() < 0.4 else "Voir le sujet du projet.",
+                        date_limite=limite, statut=alea.choices(statuts, poids)[0],
+                        projet_id=self.projets.tirer(alea, 1.5), assignee_id=assignee)
+
+
+class Command(BaseCommand):
+    help = ("Génère des utilisateurs, projets et tâches synthétiques par lots (bulk_create), "
+            "à mémoire constante et reproductibles avec --graine")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--etudiants', type=int, default=1000)
+        parser.add_argument('--professeurs', type=int, default=50)
+        parser.add_argument('--projets', type=int, default=2000)
+        parser.add_argument('--taches', type=int, default=50_000)
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--lot', type=int, default=5000, help="lignes par bulk_create et par transaction")
+        parser.add_argument('--mot-de-passe', default='motdepasse', help="mot de passe de tous les comptes créés")
+        parser.add_argument('--prefixe', default='seed', help="préfixe des noms d'utilisateur")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        Generateur(graine=options['graine'], taille_lot=options['lot'], using=options['database'],
+                   mot_de_passe=options['mot_de_passe'], prefixe=options['prefixe'],
+                   sortie=self.stdout).generer(options['etudiants'], options['professeurs'],
+                                               options['projets'], options['taches'])
+        self.stdout.write(self.style.SUCCESS(f"Terminé en {time.perf_counter() - debut:.1f} s"))
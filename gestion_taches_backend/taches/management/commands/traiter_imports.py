@@ -0,0 +1,40 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from taches.importation import prendre_import, traiter_import
+
+
+class Command(BaseCommand):
+    help = ("Traite la file des imports CSV envoyés par l'API (taches.ImportCSV) : hors des workers "
+            "web, avec les processus de hachage des mots de passe")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--une-fois', action='store_true',
+                            help="traite les imports en attente puis s'arrête (pour cron)")
+        parser.add_argument('--attente', type=float, default=5.0,
+                            help="secondes entre deux lectures de la file quand elle est vide")
+
+    def handle(self, *args, **options):
+        arret = threading.Event()
+        if not options['une_fois']:
+            # arrêt propre sur SIGTERM / Ctrl-C : l'import en cours est terminé
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, lambda *_: arret.set())
+            self.stdout.write("Traitement des imports démarré")
+
+        while not arret.is_set():
+            import_csv = prendre_import()
+            if import_csv is None:
+                if options['une_fois']:
+                    break
+                arret.wait(options['attente'])
+                continue
+            traiter_import(import_csv)
+            rapport = import_csv.rapport
+            if import_csv.statut == 'termine':
+                self.stdout.write(f"import {import_csv.pk} ({import_csv.type}) : {rapport['creees']} créée(s), "
+                                  f"{rapport['refusees']} refusée(s)")
+            else:
+                self.stderr.write(f"import {import_csv.pk} ({import_csv.type}) : échec")
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0007_index_filtres'),
+        ('taches', '0004_rename_titre_tache_nom_alter_tache_projet_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tache',
+            index=models.Index(fields=['projet', 'statut'], name='tache_projet_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tache',
+            index=models.Index(fields=['assignee', 'statut'], name='tache_assignee_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tache',
+            index=models.Index(fields=['statut', 'date_limite'], name='tache_statut_limite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tache',
+            index=models.Index(fields=['date_limite'], name='tache_date_limite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tache',
+            index=models.Index(fields=['date_creation', 'id'], name='tache_creation_id_idx'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# index plein texte SQLite FTS5 des tâches et des projets (rowid = id de la ligne).
+# unicode61 + remove_diacritics : « mémoire » et « memoire » donnent le même terme.
+# La colonne acces contient les utilisateurs qui voient la ligne (« u<id> ») :
+# la visibilité est un simple ET dans l'index, sans jointure.
+OPTIONS_FTS = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3', detail = column"
+
+ACCES_TACHE = (
+    "'u' || (SELECT utilisateur_id FROM projets_projet WHERE id = {t}.projet_id)"
+    " || COALESCE(' u' || {t}.assignee_id, '')"
+)
+INSERTION_TACHE = (
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_TACHE.format(t='new') + ");"
+)
+INSERTION_PROJET = (
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), 'u' || new.utilisateur_id);"
+)
+
+CREATION = [
+    f"CREATE VIRTUAL TABLE recherche_taches_fts USING fts5(nom, description, acces, {OPTIONS_FTS})",
+    f"CREATE VIRTUAL TABLE recherche_projets_fts USING fts5(nom, description, acces, {OPTIONS_FTS})",
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "SELECT id, nom, COALESCE(description, ''), " + ACCES_TACHE.format(t='taches_tache') + " FROM taches_tache",
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "SELECT id, nom, COALESCE(description, ''), 'u' || utilisateur_id FROM projets_projet",
+
+    f"""CREATE TRIGGER taches_tache_fts_insert AFTER INSERT ON taches_tache BEGIN
+        {INSERTION_TACHE}
+    END""",
+    f"""CREATE TRIGGER taches_tache_fts_update
+    AFTER UPDATE OF nom, description, projet_id, assignee_id ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+        {INSERTION_TACHE}
+    END""",
+    """CREATE TRIGGER taches_tache_fts_delete AFTER DELETE ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER projets_projet_fts_insert AFTER INSERT ON projets_projet BEGIN
+        {INSERTION_PROJET}
+    END""",
+    f"""CREATE TRIGGER projets_projet_fts_update
+    AFTER UPDATE OF nom, description, utilisateur_id ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+        {INSERTION_PROJET}
+        UPDATE recherche_taches_fts SET acces = (
+            SELECT {ACCES_TACHE.format(t='taches_tache')} FROM taches_tache
+            WHERE taches_tache.id = recherche_taches_fts.rowid
+        ) WHERE new.utilisateur_id != old.utilisateur_id
+          AND rowid IN (SELECT id FROM taches_tache WHERE projet_id = new.id);
+    END""",
+    """CREATE TRIGGER projets_projet_fts_delete AFTER DELETE ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+    END""",
+]
+
+SUPPRESSION = [
+    f"DROP TRIGGER IF EXISTS {table}_fts_{evenement}"
+    for table in ('taches_tache', 'projets_projet')
+    for evenement in ('insert', 'update', 'delete')
+] + [
+    "DROP TABLE IF EXISTS recherche_taches_fts",
+    "DROP TABLE IF EXISTS recherche_projets_fts",
+]
+
+
+def executer(requetes):
+    def operation(apps, schema_editor):
+        # FTS5 n'existe que sous SQLite ; ailleurs la recherche passe par icontains
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for requete in requetes:
+            schema_editor.execute(requete)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0007_index_filtres'),
+        ('taches', '0005_index_filtres'),
+    ]
+
+    operations = [
+        migrations.RunPython(executer(CREATION), executer(SUPPRESSION)),
+    ]
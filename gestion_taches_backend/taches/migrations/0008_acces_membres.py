@@ -0,0 +1,154 @@
+from django.db import migrations
+
+# Colonne acces de l'index FTS construite depuis la table d'accès projets_membre.
+# Copie figée du SQL de cette migration : ne pas la modifier, une évolution va
+# dans une nouvelle migration.
+ACCES_MEMBRES = "COALESCE((SELECT group_concat('u' || utilisateur_id, ' ') FROM projets_membre WHERE projet_id = {p}), '')"
+ACCES_TACHE = ACCES_MEMBRES.format(p='{t}.projet_id') + " || COALESCE(' u' || {t}.assignee_id, '')"
+ACCES_PROJET = ACCES_MEMBRES.format(p='{p}.id')
+
+INSERTION_TACHE = (
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_TACHE.format(t='new') + ");"
+)
+INSERTION_PROJET = (
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_PROJET.format(p='new') + ");"
+)
+# un membre ajouté ou retiré change l'accès du projet et de toutes ses tâches
+MISE_A_JOUR_ACCES = (
+    "UPDATE recherche_projets_fts SET acces = " + ACCES_MEMBRES.format(p='{m}.projet_id')
+    + " WHERE rowid = {m}.projet_id;"
+    " UPDATE recherche_taches_fts SET acces = ("
+    "SELECT " + ACCES_TACHE.format(t='taches_tache') + " FROM taches_tache"
+    " WHERE taches_tache.id = recherche_taches_fts.rowid"
+    ") WHERE rowid IN (SELECT id FROM taches_tache WHERE projet_id = {m}.projet_id);"
+)
+
+REMPLISSAGE = [
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "SELECT id, nom, COALESCE(description, ''), " + ACCES_TACHE.format(t='taches_tache') + " FROM taches_tache",
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "SELECT id, nom, COALESCE(description, ''), " + ACCES_PROJET.format(p='projets_projet') + " FROM projets_projet",
+]
+
+TRIGGERS = [
+    f"""CREATE TRIGGER taches_tache_fts_insert AFTER INSERT ON taches_tache BEGIN
+        {INSERTION_TACHE}
+    END""",
+    f"""CREATE TRIGGER taches_tache_fts_update
+    AFTER UPDATE OF nom, description, projet_id, assignee_id ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+        {INSERTION_TACHE}
+    END""",
+    """CREATE TRIGGER taches_tache_fts_delete AFTER DELETE ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER projets_projet_fts_insert AFTER INSERT ON projets_projet BEGIN
+        {INSERTION_PROJET}
+    END""",
+    f"""CREATE TRIGGER projets_projet_fts_update AFTER UPDATE OF nom, description ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+        {INSERTION_PROJET}
+    END""",
+    """CREATE TRIGGER projets_projet_fts_delete AFTER DELETE ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER projets_membre_fts_insert AFTER INSERT ON projets_membre BEGIN
+        {MISE_A_JOUR_ACCES.format(m='new')}
+    END""",
+    f"""CREATE TRIGGER projets_membre_fts_update AFTER UPDATE OF utilisateur_id, projet_id ON projets_membre BEGIN
+        {MISE_A_JOUR_ACCES.format(m='old')}
+        {MISE_A_JOUR_ACCES.format(m='new')}
+    END""",
+    f"""CREATE TRIGGER projets_membre_fts_delete AFTER DELETE ON projets_membre BEGIN
+        {MISE_A_JOUR_ACCES.format(m='old')}
+    END""",
+]
+
+# retour arrière : accès du propriétaire du projet et de l'assignee, comme taches 0006
+ACCES_TACHE_PRECEDENT = (
+    "'u' || (SELECT utilisateur_id FROM projets_projet WHERE id = {t}.projet_id)"
+    " || COALESCE(' u' || {t}.assignee_id, '')"
+)
+INSERTION_TACHE_PRECEDENTE = (
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), " + ACCES_TACHE_PRECEDENT.format(t='new') + ");"
+)
+INSERTION_PROJET_PRECEDENTE = (
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "VALUES (new.id, new.nom, COALESCE(new.description, ''), 'u' || new.utilisateur_id);"
+)
+
+REMPLISSAGE_PRECEDENT = [
+    "INSERT INTO recherche_taches_fts (rowid, nom, description, acces) "
+    "SELECT id, nom, COALESCE(description, ''), " + ACCES_TACHE_PRECEDENT.format(t='taches_tache')
+    + " FROM taches_tache",
+    "INSERT INTO recherche_projets_fts (rowid, nom, description, acces) "
+    "SELECT id, nom, COALESCE(description, ''), 'u' || utilisateur_id FROM projets_projet",
+]
+
+TRIGGERS_PRECEDENTS = [
+    f"""CREATE TRIGGER taches_tache_fts_insert AFTER INSERT ON taches_tache BEGIN
+        {INSERTION_TACHE_PRECEDENTE}
+    END""",
+    f"""CREATE TRIGGER taches_tache_fts_update
+    AFTER UPDATE OF nom, description, projet_id, assignee_id ON taches_tache BEGIN
+        DELETE FROM recherche_taches_fts WHERE rowid = old.id;
+        {INSERTION_TACHE_PRECEDENTE}
+    END""",
+    TRIGGERS[2],
+    f"""CREATE TRIGGER projets_projet_fts_insert AFTER INSERT ON projets_projet BEGIN
+        {INSERTION_PROJET_PRECEDENTE}
+    END""",
+    f"""CREATE TRIGGER projets_projet_fts_update
+    AFTER UPDATE OF nom, description, utilisateur_id ON projets_projet BEGIN
+        DELETE FROM recherche_projets_fts WHERE rowid = old.id;
+        {INSERTION_PROJET_PRECEDENTE}
+        UPDATE recherche_taches_fts SET acces = (
+            SELECT {ACCES_TACHE_PRECEDENT.format(t='taches_tache')} FROM taches_tache
+            WHERE taches_tache.id = recherche_taches_fts.rowid
+        ) WHERE new.utilisateur_id != old.utilisateur_id
+          AND rowid IN (SELECT id FROM taches_tache WHERE projet_id = new.id);
+    END""",
+    TRIGGERS[5],
+]
+
+SUPPRESSION_TRIGGERS = [
+    f"DROP TRIGGER IF EXISTS {table}_fts_{evenement}"
+    for table in ('taches_tache', 'projets_projet', 'projets_membre')
+    for evenement in ('insert', 'update', 'delete')
+]
+
+VIDAGE = [
+    "DELETE FROM recherche_taches_fts",
+    "DELETE FROM recherche_projets_fts",
+]
+
+
+def executer(*requetes):
+    def operation(apps, schema_editor):
+        # FTS5 n'existe que sous SQLite
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for requete in requetes:
+            schema_editor.execute(requete)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0009_membre'),
+        ('taches', '0007_date_modification'),
+    ]
+
+    operations = [
+        # colonne acces de l'index FTS : membres du projet (projets_membre) et assignee
+        migrations.RunPython(
+            executer(*SUPPRESSION_TRIGGERS, *VIDAGE, *REMPLISSAGE, *TRIGGERS),
+            executer(*SUPPRESSION_TRIGGERS, *VIDAGE, *REMPLISSAGE_PRECEDENT, *TRIGGERS_PRECEDENTS),
+        ),
+    ]
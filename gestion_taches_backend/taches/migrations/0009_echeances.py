@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-18 14:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projets', '0010_echeances'),
+        ('taches', '0008_acces_membres'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rappel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(choices=[('projet', 'Projet'), ('tache', 'Tâche')], max_length=10)),
+                ('objet_id', models.BigIntegerField()),
+                ('type', models.CharField(choices=[('echeance', 'Échéance proche'), ('retard', 'En retard')], max_length=10)),
+                ('date_limite', models.DateField()),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_envoi', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tache',
+            name='date_retard',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='tache',
+            index=models.Index(condition=models.Q(('date_retard__isnull', True), models.Q(('statut', 'Terminé'), _negated=True)), fields=['date_limite'], name='tache_echeance_idx'),
+        ),
+        migrations.AddField(
+            model_name='rappel',
+            name='destinataire',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rappels', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='rappel',
+            index=models.Index(condition=models.Q(('date_envoi__isnull', True)), fields=['id'], name='rappel_a_envoyer_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rappel',
+            constraint=models.UniqueConstraint(fields=('modele', 'objet_id', 'type', 'date_limite', 'destinataire'), name='rappel_unique'),
+        ),
+    ]
@@ -1,6 +1,23 @@
 from django.db import models
+from django.db.models import Q
 from utilisateurs.models import Utilisateur
-from projets.models import Projet
+from projets.models import Projet, projets_de, role_sur
+
+
+class TacheQuerySet(models.QuerySet):
+    # les tâches visibles par un utilisateur (mêmes règles que TacheViewSet)
+    def visibles_par(self, user):
+        if user.is_superuser:
+            return self.all()
+        # le user voit les tâches des projets dont il est membre et celles qui lui sont assignées.
+        # pas de jointure : chaque branche du OR passe par son propre index
+        # (projet_id IN (...) d'un côté, assignee_id = ... de l'autre)
+        return self.filter(Q(projet__in=projets_de(user)) | Q(assignee=user))
+
+    # rôle de l'utilisateur sur le projet de chaque tâche (role_acces), lu avec la tâche
+    def avec_role(self, user):
+        return self.annotate(role_acces=role_sur(user, models.OuterRef('projet_id')))
+
 
 class Tache(models.Model):
     STATUT_CHOIX = [
@@ -13,9 +30,133 @@ class Tache(models.Model):
     description = models.TextField(blank=True, null=True)
     date_limite = models.DateField()
     date_creation = models.DateTimeField(auto_now_add=True)
+    # mise à jour à chaque écriture, sert à la synchronisation incrémentale (/api/sync/)
+    date_modification = models.DateTimeField(auto_now=True, db_index=True)
     statut = models.CharField(max_length=20, choices=STATUT_CHOIX, default='À faire')
     projet = models.ForeignKey(Projet, on_delete=models.CASCADE, related_name='taches')
     assignee = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, null=True, blank=True)
+    # posée par le planificateur (manage.py run_scheduler) quand la date limite est dépassée
+    date_retard = models.DateTimeField(null=True, blank=True)
+
+    objects = TacheQuerySet.as_manager()
+
+    class Meta:
+        # index pour les filtres utilisés par le frontend
+        indexes = [
+            models.Index(fields=['projet', 'statut'], name='tache_projet_statut_idx'),
+            models.Index(fields=['assignee', 'statut'], name='tache_assignee_statut_idx'),
+            models.Index(fields=['statut', 'date_limite'], name='tache_statut_limite_idx'),
+            models.Index(fields=['date_limite'], name='tache_date_limite_idx'),
+            models.Index(fields=['date_creation', 'id'], name='tache_creation_id_idx'),
+            # échéances à surveiller : seules les tâches non terminées et pas encore en retard
+            models.Index(fields=['date_limite'], name='tache_echeance_idx',
+                         condition=Q(date_retard__isnull=True) & ~Q(statut='Terminé')),
+        ]
+
+    def __str__(self):
+        return self.nom
+
+
+# journal des suppressions (tombstones) pour /api/sync/ : une ligne par
+# utilisateur qui voyait l'objet, destinataire vide pour la vue des superusers.
+# destinataire n'est pas une clé étrangère : le journal doit survivre à la
+# suppression de l'utilisateur (elle supprime aussi ses tâches en cascade).
+class Suppression(models.Model):
+    MODELE_CHOIX = [
+        ('projet', 'Projet'),
+        ('tache', 'Tâche'),
+    ]
+
+    modele = models.CharField(max_length=10, choices=MODELE_CHOIX)
+    objet_id = models.BigIntegerField()
+    destinataire = models.BigIntegerField(null=True, blank=True)
+    date_suppression = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['destinataire', 'date_suppression'], name='suppression_dest_date_idx'),
+            models.Index(fields=['date_suppression'], name='suppression_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modele} {self.objet_id}"
+
+
+# boîte d'envoi des rappels d'échéance, remplie par le planificateur (taches/echeances.py).
+# une ligne par destinataire ; l'envoi (mail, push...) la marque avec date_envoi.
+# date_limite fait partie de la clé : une échéance repoussée donne de nouveaux rappels.
+class Rappel(models.Model):
+    MODELE_CHOIX = Suppression.MODELE_CHOIX
+    TYPE_CHOIX = [
+        ('echeance', 'Échéance proche'),
+        ('retard', 'En retard'),
+    ]
+
+    modele = models.CharField(max_length=10, choices=MODELE_CHOIX)
+    objet_id = models.BigIntegerField()
+    destinataire = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='rappels')
+    type = models.CharField(max_length=10, choices=TYPE_CHOIX)
+    date_limite = models.DateField()
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_envoi = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['modele', 'objet_id', 'type', 'date_limite', 'destinataire'],
+                                    name='rappel_unique'),
+        ]
+        indexes = [
+            # rappels à envoyer, dans l'ordre
+            models.Index(fields=['id'], condition=Q(date_envoi__isnull=True), name='rappel_a_envoyer_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.modele} {self.objet_id}"
+
+
+# file d'attente des imports CSV envoyés par l'API (POST .../import/) : le fichier est
+# traité hors des workers web par manage.py traiter_imports, le rapport se lit sur
+# /api/imports/<id>/. Le fichier (mots de passe en clair) est supprimé après traitement.
+class ImportCSV(models.Model):
+    TYPE_CHOIX = [
+        ('utilisateurs', 'Comptes'),
+        ('taches', 'Tâches'),
+    ]
+    STATUT_CHOIX = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    ]
+
+    type = models.CharField(max_length=20, choices=TYPE_CHOIX)
+    demandeur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='imports')
+    fichier = models.FileField(upload_to='imports/', blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOIX, default='en_attente')
+    rapport = models.JSONField(null=True, blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # imports à traiter, dans l'ordre
+            models.Index(fields=['id'], condition=Q(statut='en_attente'), name='import_en_attente_idx'),
+        ]
+
+    def __str__(self):
+        return f"import {self.type} {self.pk}"
+
+
+# ticket de connexion au flux d'événements (/api/evenements/?ticket=), à usage unique :
+# EventSource n'envoie pas d'en-tête et le jeton d'accès ne doit pas passer dans l'URL
+class TicketEvenements(models.Model):
+    # empreinte SHA-256 du ticket : la base ne garde pas de quoi ouvrir un flux
+    empreinte = models.CharField(max_length=64, unique=True)
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='+')
+    expiration = models.DateTimeField(db_index=True)
+    # expiration du jeton d'accès qui l'a demandé : le flux se ferme à cet instant
+    fin_acces = models.DateTimeField()
 
     def __str__(self):
-        return self.nom
\ No newline at end of file
+        return f"ticket {self.utilisateur_id} {self.expiration:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,58 @@
+"""Recherche plein texte dans les tâches et les projets.
+
+Sous SQLite, les requêtes passent par les tables FTS5 ``recherche_taches_fts``
+et ``recherche_projets_fts`` (migration taches 0006), tenues à jour par des
+triggers : classement bm25, préfixe sur le dernier mot, accents ignorés.
+La visibilité est portée par la colonne ``acces`` de l'index. Sur les autres
+bases on se rabat sur un filtre icontains.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from projets.models import Projet
+from .models import Tache
+
+_MOTS = re.compile(r'\w+', re.UNICODE)
+
+
+def requete_fts(texte):
+    # « rédiger mém » -> {nom description} : ("rédiger" "mém"*)
+    # seul le dernier mot est un préfixe (saisie en cours)
+    mots = [f'"{mot}"' for mot in _MOTS.findall(texte)[:10]]
+    if not mots:
+        return ''
+    mots[-1] += '*'
+    return f"{{nom description}} : ({' '.join(mots)})"
+
+
+def _rechercher(queryset, table_fts, texte, user, limite):
+    if connection.vendor != 'sqlite':
+        return list(queryset.filter(Q(nom__icontains=texte) | Q(description__icontains=texte))[:limite])
+
+    expression = requete_fts(texte)
+    if not expression:
+        return []
+    if not user.is_superuser:
+        expression = f'acces : "u{user.pk}" AND {expression}'
+    with connection.cursor() as cursor:
+        # bm25 : le nom pèse plus que la description, acces ne compte pas
+        cursor.execute(
+            f"SELECT rowid FROM {table_fts} WHERE {table_fts} MATCH %s "
+            f"ORDER BY bm25({table_fts}, 10.0, 1.0, 0.0) LIMIT %s",
+            [expression, limite],
+        )
+        ids = [ligne[0] for ligne in cursor.fetchall()]
+
+    # les règles de visibilité des viewsets s'appliquent aussi aux résultats
+    objets = queryset.in_bulk(ids)
+    return [objets[pk] for pk in ids if pk in objets]
+
+
+def rechercher_taches(user, texte, limite=20):
+    return _rechercher(Tache.objects.visibles_par(user), 'recherche_taches_fts', texte, user, limite)
+
+
+def rechercher_projets(user, texte, limite=20):
+    return _rechercher(Projet.objects.visibles_par(user), 'recherche_projets_fts', texte, user, limite)
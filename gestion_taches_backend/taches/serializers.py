@@ -1,9 +1,10 @@
 from rest_framework import serializers
-from .models import Tache
+from gestion_taches.champs import ChampsDynamiquesMixin, Expansion
+from .models import ImportCSV, Tache
 from utilisateurs.models import Utilisateur
 from projets.models import Projet
 
-class TacheSerializer(serializers.ModelSerializer):
+class TacheSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     # permettre de choisir l'utilisateur assigné dans la requête
     assignee = serializers.PrimaryKeyRelatedField(queryset=Utilisateur.objects.all(), required=False)
     projet = serializers.PrimaryKeyRelatedField(queryset=Projet.objects.all())
@@ -11,4 +12,23 @@ class TacheSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tache
         fields = '__all__'
-        read_only_fields = ['date_creation']
\ No newline at end of file
+        read_only_fields = ['date_creation', 'date_retard']
+        # relations incluses avec ?expand=
+        expansions = {
+            'projet': Expansion('projets.serializers.ProjetSerializer'),
+            'assignee': Expansion('utilisateurs.serializers.UtilisateurResumeSerializer'),
+        }
+
+# variante pour les opérations en lot : projet et assignee restent des ids,
+# la vue les résout ensuite en une seule requête pour tout le lot
+class TacheBulkSerializer(TacheSerializer):
+    assignee = serializers.IntegerField(required=False, allow_null=True)
+    projet = serializers.IntegerField()
+
+
+# suivi d'un import CSV mis en file par l'API (le fichier n'est pas exposé)
+class ImportCSVSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImportCSV
+        fields = ['id', 'type', 'statut', 'rapport', 'date_creation', 'date_debut', 'date_fin']
+        read_only_fields = fields
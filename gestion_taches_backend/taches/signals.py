@@ -0,0 +1,73 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from gestion_taches.evenements import broker, publier
+from projets.models import Membre, Projet
+from utilisateurs.versions import incrementer_versions
+from .models import Tache
+from .serializers import TacheSerializer
+from .synchro import enregistrer_suppressions
+
+
+def utilisateurs_concernes(projet_id, assignee_id, using):
+    # une tâche est visible par les membres de son projet et par son assignee
+    membres = Membre.objects.using(using).filter(projet_id=projet_id).values_list('utilisateur_id', flat=True)
+    return {*membres, assignee_id}
+
+
+# avant une modification, on retient qui voyait la tâche (réassignation, changement de projet)
+@receiver(pre_save, sender=Tache)
+def memoriser_anciens_utilisateurs(sender, instance, using, **kwargs):
+    instance._anciens_utilisateurs = set()
+    instance._ancien_compteur = None
+    if instance.pk:
+        ancienne = (Tache.objects.using(using).filter(pk=instance.pk)
+                    .values_list('projet_id', 'assignee_id', 'statut').first())
+        if ancienne:
+            projet_id, assignee_id, statut = ancienne
+            instance._anciens_utilisateurs = utilisateurs_concernes(projet_id, assignee_id, using)
+            instance._ancien_compteur = (projet_id, statut)
+
+
+def publier_tache(tache, action, concernes, retires=(), using=None):
+    # événements temps réel : la tâche pour ceux qui la voient, sa suppression pour les autres
+    if not broker.actif():
+        return
+    publier('tache', action, tache.pk, TacheSerializer(tache).data, concernes, using=using)
+    publier('tache', 'delete', tache.pk, None, retires, superusers=False, using=using)
+
+
+@receiver(post_save, sender=Tache)
+def incrementer_version_tache(sender, instance, created, using, **kwargs):
+    # compteurs du projet : changement de statut ou de projet
+    ancien, nouveau = getattr(instance, '_ancien_compteur', None), (instance.projet_id, instance.statut)
+    if ancien != nouveau:
+        deltas = Counter({nouveau: 1})
+        if ancien is not None:
+            deltas[ancien] -= 1
+        Projet.objects.using(using).ajuster_compteurs(deltas)
+    concernes = utilisateurs_concernes(instance.projet_id, instance.assignee_id, using)
+    anciens = getattr(instance, '_anciens_utilisateurs', set())
+    incrementer_versions(*(concernes | anciens), using=using)
+    # ceux qui ne voient plus la tâche (réassignation) reçoivent un tombstone
+    enregistrer_suppressions('tache', instance.pk, anciens - concernes, superusers=False, using=using)
+    publier_tache(instance, 'create' if created else 'update', concernes, anciens - concernes, using)
+
+
+# lu avant la suppression : avec celle d'un projet, les membres disparaissent aussi
+@receiver(pre_delete, sender=Tache)
+def memoriser_concernes(sender, instance, using, **kwargs):
+    instance._concernes = utilisateurs_concernes(instance.projet_id, instance.assignee_id, using)
+
+
+@receiver(post_delete, sender=Tache)
+def supprimer_tache(sender, instance, using, origin=None, **kwargs):
+    # inutile quand la tâche part avec son projet (origin : le projet ou un queryset de projets)
+    if not (isinstance(origin, Projet) or getattr(origin, 'model', None) is Projet):
+        Projet.objects.using(using).ajuster_compteurs({(instance.projet_id, instance.statut): -1})
+    concernes = instance._concernes
+    incrementer_versions(*concernes, using=using)
+    enregistrer_suppressions('tache', instance.pk, concernes, using=using)
+    publier('tache', 'delete', instance.pk, None, concernes, using=using)
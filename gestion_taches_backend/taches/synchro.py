@@ -0,0 +1,73 @@
+"""Synchronisation incrémentale (/api/sync/) : jetons et journal des suppressions."""
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from gestion_taches.evenements import publier
+from .models import Suppression, Tache
+
+# les lignes modifiées un peu avant le jeton sont renvoyées une seconde fois :
+# une transaction commencée avant le jeton peut être validée juste après
+MARGE = timedelta(seconds=2)
+
+# au-delà, le journal des suppressions est purgé et le client doit tout recharger
+RETENTION = timedelta(days=getattr(settings, 'SYNC_RETENTION_JOURS', 30))
+
+
+def encoder_jeton(instant):
+    return base64.urlsafe_b64encode(instant.isoformat().encode()).decode().rstrip('=')
+
+
+def decoder_jeton(jeton):
+    """Renvoie l'instant du jeton, ou None s'il est invalide."""
+    try:
+        texte = base64.urlsafe_b64decode(jeton + '=' * (-len(jeton) % 4)).decode()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    instant = parse_datetime(texte)
+    return instant if instant and timezone.is_aware(instant) else None
+
+
+def enregistrer_suppressions(modele, objet_id, destinataires, superusers=True, using=DEFAULT_DB_ALIAS):
+    """Ajoute un tombstone pour chaque utilisateur qui ne voit plus l'objet."""
+    lignes = [Suppression(modele=modele, objet_id=objet_id, destinataire=user_id)
+              for user_id in destinataires if user_id]
+    if superusers:
+        lignes.append(Suppression(modele=modele, objet_id=objet_id, destinataire=None))
+    if lignes:
+        Suppression.objects.using(using).bulk_create(lignes)
+
+
+def enregistrer_retrait(projet_id, user_id, using=DEFAULT_DB_ALIAS):
+    """Membre retiré d'un projet : tombstones et événements du projet et de ses tâches, sauf ses assignations."""
+    taches = list(Tache.objects.using(using).filter(projet_id=projet_id).exclude(assignee_id=user_id)
+                  .values_list('id', flat=True))
+    Suppression.objects.using(using).bulk_create(
+        [Suppression(modele='projet', objet_id=projet_id, destinataire=user_id)]
+        + [Suppression(modele='tache', objet_id=tache_id, destinataire=user_id) for tache_id in taches],
+        batch_size=1000,
+    )
+    publier('projet', 'delete', projet_id, None, [user_id], superusers=False, using=using)
+    for tache_id in taches:
+        publier('tache', 'delete', tache_id, None, [user_id], superusers=False, using=using)
+
+
+def suppressions_pour(user, depuis):
+    lignes = Suppression.objects.filter(date_suppression__gte=depuis)
+    if user.is_superuser:
+        lignes = lignes.filter(destinataire__isnull=True)
+    else:
+        lignes = lignes.filter(destinataire=user.pk)
+    ids = {'projet': set(), 'tache': set()}
+    for modele, objet_id in lignes.values_list('modele', 'objet_id'):
+        ids[modele].add(objet_id)
+    return ids
+
+
+def purger_suppressions(maintenant=None):
+    limite = (maintenant or timezone.now()) - RETENTION
+    return Suppression.objects.filter(date_suppression__lt=limite).delete()[0]
@@ -1,3 +1,728 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer, ListSerializer, Serializer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from gestion_taches.evenements import CONFIG as CONFIG_EVENEMENTS, BrokerLocal
+from gestion_taches.lecture_rapide import LecteurRapide
+from projets.models import LECTEUR, Membre, Projet
+from projets.serializers import ProjetSerializer
+from taches.echeances import CONFIG as CONFIG_ECHEANCES, Planificateur, debut_du_jour
+from taches.models import ImportCSV, Rappel, Tache, TicketEvenements
+from taches.serializers import TacheSerializer
+from taches.synchro import RETENTION, encoder_jeton
+from taches.views import TacheViewSet, _authentifier, _flux
+from utilisateurs.models import Utilisateur
+
+
+class TableauDeBordTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        self.client = APIClient()
+
+    def creer_projets(self, nombre, taches_par_projet):
+        hier = date.today() - timedelta(days=1)
+        for i in range(nombre):
+            projet = Projet.objects.create(nom=f'Projet {i}', utilisateur=self.professeur, date_limite=hier)
+            for j in range(taches_par_projet):
+                Tache.objects.create(nom=f'Tâche {i}.{j}', date_limite=hier, projet=projet,
+                                     assignee=self.etudiant if j % 2 else None)
+
+    def test_nombre_de_requetes_constant(self):
+        # version (ETag), projets, tâches des projets, tâches assignées, agrégat
+        self.client.force_authenticate(self.professeur)
+        for nombre in (1, 10):
+            self.creer_projets(nombre, 4)
+            with self.assertNumQueries(5):
+                reponse = self.client.get('/api/tableau-de-bord/')
+            self.assertEqual(reponse.status_code, 200)
+
+    def test_contenu(self):
+        self.creer_projets(2, 4)
+        self.client.force_authenticate(self.etudiant)
+        reponse = self.client.get('/api/tableau-de-bord/').json()
+        self.assertEqual(reponse['utilisateur']['username'], 'etudiant')
+        self.assertEqual(reponse['projets'], [])
+        self.assertEqual(len(reponse['taches_assignees']), 4)
+        self.assertEqual(reponse['taches_assignees'][0]['projet']['nom'], 'Projet 0')
+        self.assertEqual(reponse['compteurs']['taches']['assignees'], 4)
+        self.assertEqual(reponse['compteurs']['taches']['en_retard'], 4)
+
+        self.client.force_authenticate(self.professeur)
+        reponse = self.client.get('/api/tableau-de-bord/').json()
+        self.assertEqual([len(projet['taches']) for projet in reponse['projets']], [4, 4])
+        self.assertEqual(reponse['compteurs']['projets'], {
+            'total': 2, 'par_statut': {'À faire': 2, 'En cours': 0, 'Terminé': 0}, 'en_retard': 2,
+        })
+
+    def test_get_conditionnel(self):
+        self.creer_projets(1, 2)
+        self.client.force_authenticate(self.professeur)
+        etag = self.client.get('/api/tableau-de-bord/')['ETag']
+        with self.assertNumQueries(1):
+            reponse = self.client.get('/api/tableau-de-bord/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 304)
+
+    def test_projet_renomme_invalide_les_assignees(self):
+        # l'étudiant n'est pas membre : il voit le projet dans ses tâches assignées
+        self.creer_projets(1, 2)
+        projet = Projet.objects.get()
+        self.client.force_authenticate(self.etudiant)
+        etag = self.client.get('/api/tableau-de-bord/')['ETag']
+        projet.nom = 'Renommé'
+        projet.save()
+        reponse = self.client.get('/api/tableau-de-bord/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.json()['taches_assignees'][0]['projet']['nom'], 'Renommé')
+
+
+class CacheExpansionTests(TestCase):
+    # les réponses ?expand= en cache doivent suivre les objets inclus
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        Tache.objects.create(nom='Tâche', date_limite=date.today(), projet=self.projet, assignee=self.etudiant)
+        self.client = APIClient()
+
+    def lire(self, user, url):
+        self.client.force_authenticate(user)
+        return self.client.get(url)
+
+    def test_projet_renomme(self):
+        for user in (self.professeur, self.etudiant):
+            for nom in ('Premier', 'Second'):
+                self.lire(user, '/api/taches/?expand=projet')
+                self.projet.nom = nom
+                self.projet.save()
+                reponse = self.lire(user, '/api/taches/?expand=projet')
+                self.assertEqual(reponse['X-Cache'], 'MISS')
+                self.assertEqual(reponse.json()[0]['projet']['nom'], nom)
+
+    def test_assignee_renomme(self):
+        self.lire(self.professeur, '/api/taches/?expand=assignee')
+        self.etudiant.username = 'etudiant2'
+        self.etudiant.save()
+        reponse = self.lire(self.professeur, '/api/taches/?expand=assignee')
+        self.assertEqual(reponse['X-Cache'], 'MISS')
+        self.assertEqual(reponse.json()[0]['assignee']['username'], 'etudiant2')
+
+    def test_proprietaire_renomme(self):
+        autre = Projet.objects.create(nom='Autre', utilisateur=self.etudiant)
+        Membre.objects.create(projet=autre, utilisateur=self.professeur, role=LECTEUR)
+        Tache.objects.filter(assignee=self.etudiant).update(assignee=None)
+        self.lire(self.professeur, '/api/projets/?expand=utilisateur')
+        self.etudiant.first_name = 'Awa'
+        self.etudiant.save()
+        reponse = self.lire(self.professeur, '/api/projets/?expand=utilisateur')
+        self.assertEqual(reponse['X-Cache'], 'MISS')
+        self.assertEqual([projet['utilisateur']['first_name'] for projet in reponse.json()], ['', 'Awa'])
+
+
+class SynchronisationTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        self.tache = Tache.objects.create(nom='Tâche', projet=self.projet, assignee=self.etudiant,
+                                         date_limite=date.today())
+        self.client = APIClient()
+
+    def synchroniser(self, user, jeton=None):
+        self.client.force_authenticate(user)
+        reponse = self.client.get('/api/sync/', {'since': jeton} if jeton else {})
+        self.assertEqual(reponse.status_code, 200)
+        return reponse.json()
+
+    def vieillir(self):
+        # hors de la marge de sécurité : plus renvoyées au prochain jeton
+        il_y_a_une_heure = timezone.now() - timedelta(hours=1)
+        Projet.objects.update(date_modification=il_y_a_une_heure)
+        Tache.objects.update(date_modification=il_y_a_une_heure)
+        Membre.objects.update(date_ajout=il_y_a_une_heure)
+
+    def test_complet_puis_delta(self):
+        donnees = self.synchroniser(self.professeur)
+        self.assertTrue(donnees['complet'])
+        self.assertEqual([tache['id'] for tache in donnees['taches']], [self.tache.pk])
+
+        self.vieillir()
+        autre = Tache.objects.create(nom='Nouvelle', projet=self.projet, date_limite=date.today())
+        donnees = self.synchroniser(self.professeur, donnees['jeton'])
+        self.assertFalse(donnees['complet'])
+        # le projet revient aussi : ses compteurs de tâches ont changé
+        self.assertEqual([projet['id'] for projet in donnees['projets']], [self.projet.pk])
+        self.assertEqual([tache['id'] for tache in donnees['taches']], [autre.pk])
+
+    def test_tombstone_suppression(self):
+        jeton = self.synchroniser(self.professeur)['jeton']
+        self.vieillir()
+        tache_id = self.tache.pk
+        self.tache.delete()
+        donnees = self.synchroniser(self.professeur, jeton)
+        self.assertEqual(donnees['suppressions'], {'projets': [], 'taches': [tache_id]})
+
+    def test_tombstone_reassignation(self):
+        jeton = self.synchroniser(self.etudiant)['jeton']
+        self.vieillir()
+        self.tache.assignee = None
+        self.tache.save()
+        donnees = self.synchroniser(self.etudiant, jeton)
+        self.assertEqual(donnees['taches'], [])
+        self.assertEqual(donnees['suppressions']['taches'], [self.tache.pk])
+        # le propriétaire la voit toujours : modifiée, pas supprimée
+        donnees = self.synchroniser(self.professeur, jeton)
+        self.assertEqual([tache['id'] for tache in donnees['taches']], [self.tache.pk])
+        self.assertEqual(donnees['suppressions']['taches'], [])
+
+    def test_jeton_trop_ancien(self):
+        jeton = encoder_jeton(timezone.now() - RETENTION - timedelta(days=1))
+        self.assertTrue(self.synchroniser(self.professeur, jeton)['complet'])
+
+    def test_jeton_invalide(self):
+        self.client.force_authenticate(self.professeur)
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'pas-un-jeton'}).status_code, 400)
+
+
+class PaginationCurseurTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        for statut in ('En cours', 'À faire', 'À faire', 'Terminé', 'À faire', 'En cours', 'À faire'):
+            Tache.objects.create(nom='Tâche', statut=statut, projet=self.projet, date_limite=date.today())
+        self.client = APIClient()
+        self.client.force_authenticate(self.professeur)
+
+    def parcourir(self, tri, liste='taches', lien='next'):
+        ids, reponse = [], self.client.get(f'/api/{liste}/', {'ordering': tri, 'page_size': 2}).json()
+        if lien == 'previous':
+            # de la dernière page vers la première
+            while reponse['next']:
+                reponse = self.client.get(reponse['next']).json()
+        while True:
+            page = [ligne['id'] for ligne in reponse['results']]
+            ids = ids + page if lien == 'next' else page + ids
+            if not reponse[lien]:
+                return ids
+            reponse = self.client.get(reponse[lien]).json()
+
+    def test_ex_aequo_sur_le_champ_de_tri(self):
+        # 4 tâches « À faire » : plus que la taille d'une page
+        attendu = list(Tache.objects.order_by('-statut', 'id').values_list('id', flat=True))
+        self.assertEqual(self.parcourir('-statut'), attendu)
+        self.assertEqual(self.parcourir('-statut', lien='previous'), attendu)
+
+    def test_date_limite_nulle(self):
+        for _ in range(3):
+            Projet.objects.create(nom='Sans date', utilisateur=self.professeur)
+        Projet.objects.create(nom='Daté', utilisateur=self.professeur, date_limite=date.today())
+        for tri in ('date_limite', '-date_limite'):
+            attendu = list(Projet.objects.order_by(tri, 'id').values_list('id', flat=True))
+            self.assertEqual(self.parcourir(tri, 'projets'), attendu)
+            self.assertEqual(self.parcourir(tri, 'projets', 'previous'), attendu)
+
+    def test_curseur_invalide(self):
+        self.assertEqual(self.client.get('/api/taches/', {'cursor': 'pas-un-curseur'}).status_code, 404)
+
+
+class RechercheTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.lecteur = Utilisateur.objects.create_user('lecteur', password='x')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        self.etranger = Utilisateur.objects.create_user('etranger', password='x')
+        self.projet = Projet.objects.create(nom='Mémoire de fin d\'études', utilisateur=self.professeur)
+        Membre.objects.create(projet=self.projet, utilisateur=self.lecteur, role=LECTEUR)
+        self.assignee = Tache.objects.create(nom='Rédiger le plan', projet=self.projet, assignee=self.etudiant,
+                                             date_limite=date.today())
+        self.autre = Tache.objects.create(nom='Rédiger la conclusion', projet=self.projet,
+                                          date_limite=date.today())
+        self.client = APIClient()
+
+    def rechercher(self, user, q, **parametres):
+        self.client.force_authenticate(user)
+        return self.client.get('/api/recherche/', {'q': q, **parametres})
+
+    def ids(self, user, q):
+        donnees = self.rechercher(user, q).json()
+        return ({tache['id'] for tache in donnees['taches']}, {projet['id'] for projet in donnees['projets']})
+
+    def test_visibilite(self):
+        toutes = {self.assignee.pk, self.autre.pk}
+        self.assertEqual(self.ids(self.professeur, 'rédiger'), (toutes, set()))
+        # membre du projet : toutes ses tâches et le projet
+        self.assertEqual(self.ids(self.lecteur, 'rédiger'), (toutes, set()))
+        self.assertEqual(self.ids(self.lecteur, 'mémoire'), (set(), {self.projet.pk}))
+        # assignee non membre : sa tâche seulement, pas le projet
+        self.assertEqual(self.ids(self.etudiant, 'rédiger'), ({self.assignee.pk}, set()))
+        self.assertEqual(self.ids(self.etudiant, 'mémoire'), (set(), set()))
+        self.assertEqual(self.ids(self.etranger, 'rédiger'), (set(), set()))
+
+    def test_accents_et_prefixe(self):
+        self.assertEqual(self.ids(self.professeur, 'redige'), ({self.assignee.pk, self.autre.pk}, set()))
+        self.assertEqual(self.ids(self.professeur, 'REDIGER conclu'), ({self.autre.pk}, set()))
+        self.assertEqual(self.ids(self.professeur, 'memoire etudes'), (set(), {self.projet.pk}))
+
+    def test_syntaxe_fts_mal_formee(self):
+        # guillemets, opérateurs et parenthèses ne passent pas tels quels à MATCH
+        for q in ('"abc', 'a OR', 'NOT', '(rédiger', 'plan"*', '{nom}: x', '"', '***'):
+            reponse = self.rechercher(self.professeur, q)
+            self.assertEqual(reponse.status_code, 200, q)
+        self.assertEqual(self.ids(self.professeur, '"rédiger'), ({self.assignee.pk, self.autre.pk}, set()))
+        self.assertEqual(self.rechercher(self.professeur, 'plan', limite='abc').status_code, 400)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etranger = Utilisateur.objects.create_user('etranger', password='x')
+        self.projet = Projet.objects.create(nom='=HYPERLINK("http://exemple.test")', utilisateur=self.professeur)
+        self.terminee = Tache.objects.create(nom='-2+3', statut='Terminé', projet=self.projet,
+                                             date_limite=date.today())
+        self.a_faire = Tache.objects.create(nom='Réviser', description='@SUM(A1)', projet=self.projet,
+                                            date_limite=date.today())
+        self.client = APIClient()
+        self.client.force_authenticate(self.professeur)
+
+    def exporter(self, url, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        reponse = self.client.get(url)
+        self.assertEqual(reponse.status_code, 200)
+        return b''.join(reponse.streaming_content).decode()
+
+    def lignes_csv(self, url, user=None):
+        contenu = self.exporter(url, user)
+        self.assertTrue(contenu.startswith('\ufeff'))
+        return list(csv.DictReader(StringIO(contenu[1:])))
+
+    def test_csv(self):
+        lignes = self.lignes_csv('/api/taches/export/?ordering=id')
+        self.assertEqual([ligne['id'] for ligne in lignes], [str(self.terminee.pk), str(self.a_faire.pk)])
+        self.assertEqual(lignes[1]['nom'], 'Réviser')
+        # formules neutralisées pour le tableur
+        self.assertEqual(lignes[0]['nom'], "'-2+3")
+        self.assertEqual(lignes[1]['description'], "'@SUM(A1)")
+        projets = self.lignes_csv('/api/projets/export/')
+        self.assertEqual(projets[0]['nom'], '\'=HYPERLINK("http://exemple.test")')
+
+    def test_ndjson(self):
+        contenu = self.exporter('/api/taches/export/?format=ndjson&ordering=-id')
+        lignes = [json.loads(ligne) for ligne in contenu.splitlines()]
+        self.assertEqual([ligne['id'] for ligne in lignes], [self.a_faire.pk, self.terminee.pk])
+        # NDJSON garde les valeurs telles quelles
+        self.assertEqual(lignes[1]['nom'], '-2+3')
+
+    def test_filtres_et_champs(self):
+        lignes = self.lignes_csv('/api/taches/export/?statut=Terminé&fields=id,nom')
+        self.assertEqual(lignes, [{'id': str(self.terminee.pk), 'nom': "'-2+3"}])
+
+    def test_visibilite(self):
+        self.assertEqual(self.lignes_csv('/api/taches/export/', self.etranger), [])
+        self.assertEqual(self.lignes_csv('/api/projets/export/', self.etranger), [])
+
+
+class StatistiquesTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        hier, demain = date.today() - timedelta(days=1), date.today() + timedelta(days=1)
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur, date_limite=hier)
+        self.autre = Projet.objects.create(nom='Autre', utilisateur=self.professeur, statut='Terminé',
+                                           date_limite=hier)
+        for statut, date_limite, assignee in (('À faire', hier, self.etudiant), ('En cours', demain, None),
+                                              ('Terminé', hier, None), ('Terminé', demain, None)):
+            Tache.objects.create(nom='Tâche', statut=statut, projet=self.projet, date_limite=date_limite,
+                                 assignee=assignee)
+        Tache.objects.create(nom='Tâche', projet=self.autre, date_limite=demain)
+        self.client = APIClient()
+
+    def statistiques(self, user):
+        self.client.force_authenticate(user)
+        # nombre de requêtes fixe : trois agrégats, quel que soit le nombre de projets et de tâches
+        with self.assertNumQueries(3):
+            reponse = self.client.get('/api/statistiques/')
+        self.assertEqual(reponse.status_code, 200)
+        return reponse.json()
+
+    def test_proprietaire(self):
+        donnees = self.statistiques(self.professeur)
+        self.assertEqual(donnees['taches'], {
+            'total': 5, 'par_statut': {'À faire': 2, 'En cours': 1, 'Terminé': 2},
+            'pourcentage_terminees': 40, 'en_retard': 1,
+        })
+        # l'autre projet est terminé : pas en retard
+        self.assertEqual(donnees['projets'], {
+            'total': 2, 'par_statut': {'À faire': 1, 'En cours': 0, 'Terminé': 1}, 'en_retard': 1,
+        })
+        self.assertEqual(donnees['par_projet'], [
+            {'projet': self.projet.pk, 'nom': 'Projet', 'total': 4,
+             'par_statut': {'À faire': 1, 'En cours': 1, 'Terminé': 2}, 'pourcentage_terminees': 50,
+             'en_retard': 1},
+            {'projet': self.autre.pk, 'nom': 'Autre', 'total': 1,
+             'par_statut': {'À faire': 1, 'En cours': 0, 'Terminé': 0}, 'pourcentage_terminees': 0,
+             'en_retard': 0},
+        ])
+
+    def test_assignee_non_membre(self):
+        # sa tâche seulement ; le projet n'est visible que de ses membres
+        donnees = self.statistiques(self.etudiant)
+        self.assertEqual(donnees['taches'], {
+            'total': 1, 'par_statut': {'À faire': 1, 'En cours': 0, 'Terminé': 0},
+            'pourcentage_terminees': 0, 'en_retard': 1,
+        })
+        self.assertEqual(donnees['projets'], {
+            'total': 0, 'par_statut': {'À faire': 0, 'En cours': 0, 'Terminé': 0}, 'en_retard': 0,
+        })
+        self.assertEqual(donnees['par_projet'], [
+            {'projet': self.projet.pk, 'nom': 'Projet', 'total': 1,
+             'par_statut': {'À faire': 1, 'En cours': 0, 'Terminé': 0}, 'pourcentage_terminees': 0,
+             'en_retard': 1},
+        ])
+
+    def test_requetes_constantes(self):
+        for _ in range(5):
+            projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+            Tache.objects.create(nom='Tâche', projet=projet, date_limite=date.today())
+        self.assertEqual(self.statistiques(self.professeur)['projets']['total'], 7)
+
+
+class PlanificateurTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        self.maintenant = timezone.now()
+        self.aujourd_hui = timezone.localdate(self.maintenant)
+        self.planificateur = Planificateur(horloge=lambda: self.maintenant)
+
+    def creer_tache(self, jours, assignee=None):
+        return Tache.objects.create(nom='Tâche', projet=self.projet, assignee=assignee,
+                                    date_limite=self.aujourd_hui + timedelta(days=jours))
+
+    def rappels(self, type_rappel):
+        return set(Rappel.objects.filter(type=type_rappel).values_list('objet_id', 'destinataire_id'))
+
+    def test_retards_et_rappels(self):
+        en_retard = self.creer_tache(-1, assignee=self.etudiant)
+        demain = self.creer_tache(1)
+        self.creer_tache(5)
+        self.planificateur.executer_une_fois()
+
+        self.assertIsNotNone(Tache.objects.get(pk=en_retard.pk).date_retard)
+        self.assertEqual(Tache.objects.filter(date_retard__isnull=False).count(), 1)
+        self.assertEqual(self.rappels('retard'), {(en_retard.pk, self.professeur.pk), (en_retard.pk, self.etudiant.pk)})
+        self.assertEqual(self.rappels('echeance'), {(demain.pk, self.professeur.pk)})
+
+        # un second passage (ou un redémarrage) n'ajoute rien
+        Planificateur(horloge=lambda: self.maintenant).executer_une_fois()
+        self.assertEqual(Rappel.objects.count(), 3)
+
+    def test_date_repoussee_avant_le_retard(self):
+        tache = self.creer_tache(0)
+        self.planificateur.executer_une_fois()
+        tache.date_limite = self.aujourd_hui + timedelta(days=5)
+        tache.save()
+
+        # l'entrée du tas pour demain est périmée : revérifiée en base, elle n'a pas d'effet
+        self.maintenant = debut_du_jour(self.aujourd_hui + timedelta(days=1)) + timedelta(minutes=1)
+        self.planificateur.executer_une_fois()
+        self.assertIsNone(Tache.objects.get(pk=tache.pk).date_retard)
+        self.assertEqual(self.rappels('retard'), set())
+
+    def test_retard_leve(self):
+        tache = self.creer_tache(-1)
+        self.planificateur.executer_une_fois()
+        tache.refresh_from_db()
+        tache.statut = 'Terminé'
+        tache.save()
+
+        self.maintenant += timedelta(seconds=CONFIG_ECHEANCES['ACTUALISATION'] + 1)
+        self.planificateur.executer_une_fois()
+        self.assertIsNone(Tache.objects.get(pk=tache.pk).date_retard)
+
+    def test_commande_une_fois(self):
+        tache = self.creer_tache(-1)
+        sortie = StringIO()
+        call_command('run_scheduler', '--une-fois', stdout=sortie)
+        self.assertIsNotNone(Tache.objects.get(pk=tache.pk).date_retard)
+        self.assertIn('en retard', sortie.getvalue())
+
+
+class ImportCSVTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        self.autre = Projet.objects.create(nom='Autre', utilisateur=self.etudiant)
+        self.client = APIClient()
+
+    def envoyer(self, user, url, contenu):
+        self.client.force_authenticate(user)
+        fichier = SimpleUploadedFile('import.csv', contenu.encode(), content_type='text/csv')
+        return self.client.post(url, {'fichier': fichier}, format='multipart')
+
+    def test_taches_mises_en_file(self):
+        reponse = self.envoyer(self.professeur, '/api/taches/import/',
+                               f"nom,date_limite,projet\nA,2030-01-01,{self.projet.pk}\n"
+                               f"B,2030-01-01,{self.autre.pk}\nC,pas une date,{self.projet.pk}\n")
+        self.assertEqual(reponse.status_code, 202)
+        self.assertEqual(reponse.json()['statut'], 'en_attente')
+        # rien n'est importé pendant la requête
+        self.assertFalse(Tache.objects.exists())
+        suivi = reponse['Location']
+
+        call_command('traiter_imports', '--une-fois', stdout=StringIO())
+        donnees = self.client.get(suivi).json()
+        self.assertEqual(donnees['statut'], 'termine')
+        self.assertEqual((donnees['rapport']['creees'], donnees['rapport']['refusees']), (1, 2))
+        self.assertEqual(sorted(erreur['ligne'] for erreur in donnees['rapport']['erreurs']), [3, 4])
+        self.assertEqual(list(Tache.objects.values_list('nom', flat=True)), ['A'])
+        self.assertEqual(Projet.objects.get(pk=self.projet.pk).nb_a_faire, 1)
+        # le fichier n'est pas conservé
+        self.assertFalse(ImportCSV.objects.get().fichier)
+
+    def test_comptes(self):
+        self.assertEqual(self.envoyer(self.etudiant, '/api/utilisateurs/import/', "username\nx\n").status_code, 403)
+        reponse = self.envoyer(self.professeur, '/api/utilisateurs/import/',
+                               "username,password,role\nnouveau,Secret123!,ETUDIANT\nprof2,,PROFESSEUR\n")
+        self.assertEqual(reponse.status_code, 202)
+        call_command('traiter_imports', '--une-fois', stdout=StringIO())
+
+        nouveau = Utilisateur.objects.get(username='nouveau')
+        self.assertTrue(nouveau.check_password('Secret123!'))
+        self.assertFalse(Utilisateur.objects.filter(username='prof2').exists())
+        # le suivi n'est visible que de son auteur
+        self.client.force_authenticate(self.etudiant)
+        self.assertEqual(self.client.get(reponse['Location']).status_code, 404)
+
+    def test_commande_importer_csv(self):
+        chemin = os.path.join(self.media, 'taches.csv')
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            fichier.write(f"nom,date_limite,projet\nA,2030-01-01,{self.projet.pk}\nB,2030-01-01,999\n")
+        sortie, erreurs = StringIO(), StringIO()
+        call_command('importer_csv', 'taches', chemin, stdout=sortie, stderr=erreurs)
+        self.assertIn('1 créée(s), 1 refusée(s)', sortie.getvalue())
+        self.assertIn('ligne 3', erreurs.getvalue())
+
+
+class MetriquesTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        Tache.objects.create(nom='Tâche', projet=projet, date_limite=date.today())
+        self.client = APIClient()
+        self.client.force_authenticate(self.professeur)
+
+    def sections(self, url):
+        entete = self.client.get(url)['Server-Timing']
+        return {entree.split(';')[0] for entree in entete.split(', ')}
+
+    def test_serialisation_et_rendu(self):
+        # APIView (tableau de bord), lecture rapide (liste), vue générique (détail), puis rendu JSON
+        tache = Tache.objects.get()
+        for url in ('/api/tableau-de-bord/', '/api/taches/', f'/api/taches/{tache.pk}/'):
+            self.assertLessEqual({'db', 'serialisation', 'rendu', 'total'}, self.sections(url))
+
+    def test_drf_non_modifie(self):
+        # la mesure passe par les vues du projet : les serializers de DRF (simplejwt, admin) restent intacts
+        for classe in (BaseSerializer, Serializer, ListSerializer):
+            self.assertEqual(vars(classe)['data'].fget.__module__, 'rest_framework.serializers')
+
+
+class BulkTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        self.lecteur = Utilisateur.objects.create_user('lecteur', password='x')
+        self.projet = Projet.objects.create(nom='Projet', utilisateur=self.professeur)
+        Membre.objects.create(utilisateur=self.lecteur, projet=self.projet, role=LECTEUR)
+        self.tache = Tache.objects.create(nom='Tâche', projet=self.projet, date_limite=date.today())
+        self.client = APIClient()
+        self.client.force_authenticate(self.professeur)
+
+    def envoyer(self, *operations, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        return self.client.post('/api/taches/bulk/', {'operations': list(operations)}, format='json')
+
+    def creation(self, nom, **data):
+        return {'action': 'create', 'data': {'nom': nom, 'date_limite': '2030-01-01', 'projet': self.projet.pk, **data}}
+
+    def compteurs(self):
+        projet = Projet.objects.get(pk=self.projet.pk)
+        return projet.nb_a_faire, projet.nb_en_cours, projet.nb_terminees
+
+    def test_compteurs(self):
+        reponse = self.envoyer(self.creation('A'), self.creation('B', statut='En cours'),
+                               {'action': 'update', 'id': self.tache.pk, 'data': {'statut': 'Terminé'}})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(self.compteurs(), (1, 1, 1))
+        self.assertEqual(self.envoyer({'action': 'delete', 'id': self.tache.pk}).status_code, 200)
+        self.assertEqual(self.compteurs(), (1, 1, 0))
+
+    def test_atomique(self):
+        reponse = self.envoyer(self.creation('A'), self.creation('B', projet=999),
+                               {'action': 'delete', 'id': self.tache.pk})
+        self.assertEqual(reponse.status_code, 400)
+        self.assertEqual([resultat['status'] for resultat in reponse.json()['resultats']], [424, 400, 424])
+        self.assertEqual(list(Tache.objects.values_list('pk', flat=True)), [self.tache.pk])
+        self.assertEqual(self.compteurs(), (1, 0, 0))
+
+    def test_permissions(self):
+        autre = Utilisateur.objects.create_user('autre', password='x')
+        operations = [{'action': 'update', 'id': self.tache.pk, 'data': {'nom': 'Renommée'}},
+                      {'action': 'delete', 'id': self.tache.pk}]
+        # un lecteur voit la tâche sans pouvoir la modifier ; un non-membre ne la voit pas
+        for user, code in ((self.lecteur, 403), (autre, 404)):
+            for operation in operations:
+                reponse = self.envoyer(operation, user=user)
+                self.assertEqual(reponse.json()['resultats'][0]['status'], code)
+        reponse = self.envoyer(self.creation('A'), user=self.lecteur)
+        self.assertEqual(reponse.json()['resultats'][0]['status'], 400)
+        self.assertEqual(Tache.objects.get().nom, 'Tâche')
+
+    def test_operations_mal_formees(self):
+        # True == 1 pour Python : sans contrôle, la tâche 1 serait supprimée
+        Tache.objects.filter(pk=self.tache.pk).update(id=1)
+        reponse = self.envoyer({'action': 'delete', 'id': True})
+        self.assertEqual(reponse.json()['resultats'][0]['errors'], {'id': ["Identifiant manquant ou répété."]})
+        self.assertTrue(Tache.objects.filter(pk=1).exists())
+
+        reponse = self.envoyer({'action': 'create', 'data': ['nom']}, {'action': 'update', 'id': 1})
+        attendu = {'data': ["Un objet avec les champs de la tâche est attendu."]}
+        self.assertEqual([resultat['errors'] for resultat in reponse.json()['resultats']], [attendu, attendu])
+
+
+class FluxEvenementsTests(TestCase):
+    def setUp(self):
+        self.etudiant = Utilisateur.objects.create_user('etudiant', password='x')
+
+    def lire(self, expiration, nombre=2):
+        # async_to_sync : les requêtes de _flux restent sur le thread (et la transaction) du test
+        async def messages():
+            flux = _flux(self.etudiant, expiration)
+            try:
+                return [await anext(flux) for _ in range(nombre)]
+            finally:
+                await flux.aclose()
+        return async_to_sync(messages)()
+
+    def test_wsgi_refuse(self):
+        self.assertEqual(self.client.get('/api/evenements/').status_code, 501)
+
+    def test_jeton_expire(self):
+        pret, fin = self.lire(time.time() - 1)
+        self.assertTrue(pret.startswith(b'event: pret'))
+        self.assertTrue(fin.startswith(b'event: expire'))
+
+    def test_compte_desactive(self):
+        Utilisateur.objects.filter(pk=self.etudiant.pk).update(is_active=False)
+        with mock.patch.dict(CONFIG_EVENEMENTS, REVERIFICATION=0):
+            _, fin = self.lire(time.time() + 3600)
+        self.assertTrue(fin.startswith(b'event: expire'))
+
+    def authentifier(self, **parametres):
+        return async_to_sync(_authentifier)(RequestFactory().get('/api/evenements/', parametres))
+
+    def test_ticket_a_usage_unique(self):
+        jeton = AccessToken.for_user(self.etudiant)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {jeton}')
+        reponse = client.post('/api/evenements/ticket/')
+        self.assertEqual(reponse.status_code, 201)
+        ticket = reponse.json()['ticket']
+
+        # le flux se ferme avec le jeton d'accès qui a demandé le ticket
+        self.assertEqual(self.authentifier(ticket=ticket), (self.etudiant, jeton['exp']))
+        self.assertEqual(self.authentifier(ticket=ticket), (None, None))
+
+    def test_ticket_expire_et_jeton_en_parametre(self):
+        client = APIClient()
+        client.force_authenticate(self.etudiant)
+        ticket = client.post('/api/evenements/ticket/').json()['ticket']
+        TicketEvenements.objects.update(expiration=timezone.now())
+        self.assertEqual(self.authentifier(ticket=ticket), (None, None))
+        # le jeton d'accès n'est plus accepté dans l'URL
+        self.assertEqual(self.authentifier(token=str(AccessToken.for_user(self.etudiant))), (None, None))
+
+    def test_dossier_des_sockets(self):
+        dossier = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, dossier, ignore_errors=True)
+        BrokerLocal(dossier / 'evenements')
+        self.assertEqual(stat.S_IMODE((dossier / 'evenements').stat().st_mode), 0o700)
+        # dossier ouvert aux autres comptes : refusé
+        (dossier / 'evenements').chmod(0o733)
+        with self.assertRaises(ImproperlyConfigured):
+            BrokerLocal(dossier / 'evenements')
+
+
+class LectureRapideTests(TestCase):
+    def setUp(self):
+        self.professeur = Utilisateur.objects.create_user('professeur', password='x', role='PROFESSEUR')
+        projet = Projet.objects.create(nom='Projet « é »', utilisateur=self.professeur, date_limite=date.today())
+        Tache.objects.create(nom='accentué "q"', description='x\ny', date_limite=date.today(), projet=projet,
+                             assignee=self.professeur)
+        Tache.objects.create(nom='Sans description', date_limite=date.today(), projet=projet, statut='Terminé')
+        self.client = APIClient()
+        self.client.force_authenticate(self.professeur)
+
+    def test_identique_au_serializer(self):
+        for serializer_class, queryset in ((TacheSerializer, Tache.objects.order_by('id')),
+                                           (ProjetSerializer, Projet.objects.order_by('id'))):
+            for champs in (None, ['nom', 'date_creation', 'id']):
+                kwargs = {} if champs is None else {'champs': champs}
+                lecteur = LecteurRapide(serializer_class(**kwargs))
+                self.assertEqual(JSONRenderer().render(lecteur.convertir(lecteur.preparer(queryset))),
+                                 JSONRenderer().render(serializer_class(queryset, many=True, **kwargs).data))
+
+    def test_lecteurs_bornes(self):
+        TacheViewSet._lecteurs = OrderedDict()
+        self.addCleanup(delattr, TacheViewSet, '_lecteurs')
+        # doublons et ordre différent : un seul lecteur
+        for champs in ('id,nom', 'nom,id', 'id,id,nom,id'):
+            self.assertEqual(self.client.get(f'/api/taches/?fields={champs}').json()[0].keys(), {'id', 'nom'})
+        self.assertEqual(len(TacheViewSet._lecteurs), 1)
+
+        champs = list(TacheSerializer().fields)
+        with mock.patch.object(TacheViewSet, 'lecteurs_max', 3):
+            for nombre in range(1, len(champs) + 1):
+                self.client.get(f"/api/taches/?fields={','.join(champs[:nombre])}")
+        self.assertEqual(len(TacheViewSet._lecteurs), 3)
+
+
+class FiltresTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Utilisateur.objects.create_user('etudiant', password='x'))
+
+    def test_entier_hors_limites(self):
+        for valeur in ('99999999999999999999999', '-99999999999999999999999', 'abc'):
+            reponse = self.client.get(f'/api/taches/?projet={valeur}')
+            self.assertEqual(reponse.status_code, 400)
+            self.assertEqual(reponse.json(), {'projet': ['Valeur invalide.']})
+        self.assertEqual(self.client.get(f'/api/taches/?assignee={2 ** 63 - 1}').status_code, 200)
@@ -1,51 +1,117 @@
-from rest_framework import viewsets, status
+import asyncio
+import hashlib
+import secrets
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Count, Prefetch, Q
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import viewsets, status, serializers
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
-from .models import Tache
-from .serializers import TacheSerializer
+from rest_framework.generics import RetrieveAPIView
+from rest_framework.views import APIView
+from gestion_taches.cache_reponses import CacheListeMixin
+from gestion_taches.champs import ChampsDynamiquesVueMixin
+from gestion_taches.export import ExportMixin
+from gestion_taches.lecture_rapide import LectureRapideMixin
+from gestion_taches.metriques import SerialisationMesureeMixin, mesurer
+from gestion_taches.evenements import CONFIG as CONFIG_EVENEMENTS, broker, message_sse
+from gestion_taches.filtres import Filtre, FiltresRequete, booleen, en_retard, entier, instant, jour
+from gestion_taches.pagination import PaginationCurseur
+from rest_framework.filters import OrderingFilter
+from projets.models import Membre, Projet, peut_editer
+from projets.serializers import ProjetSerializer
+from .importation import mettre_en_attente
+from .models import ImportCSV, Tache, TicketEvenements
+from .recherche import rechercher_projets, rechercher_taches
+from .serializers import ImportCSVSerializer, TacheSerializer, TacheBulkSerializer
+from .signals import publier_tache
+from .synchro import MARGE, RETENTION, decoder_jeton, encoder_jeton, enregistrer_suppressions, suppressions_pour
 from rest_framework.response import Response
+from utilisateurs.models import Utilisateur
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from utilisateurs.authentication import JWTAuthenticationCache
+from utilisateurs.serializers import UtilisateurSerializer
+from utilisateurs.versions import GetConditionnelMixin, cle_version, get_conditionnel, incrementer_versions
 
-class TacheViewSet(viewsets.ModelViewSet):
+class TacheViewSet(SerialisationMesureeMixin, ChampsDynamiquesVueMixin, GetConditionnelMixin, CacheListeMixin,
+                   LectureRapideMixin, ExportMixin, viewsets.ModelViewSet):
     serializer_class = TacheSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginationCurseur
     queryset = Tache.objects.none()
 
+    # filtres et tris exécutés en SQL, alignés sur les index de Tache
+    filter_backends = [FiltresRequete, OrderingFilter]
+    filtres = {
+        'statut': Filtre('statut', multiple=True, choix=[statut for statut, _ in Tache.STATUT_CHOIX]),
+        'projet': Filtre('projet_id', entier, multiple=True),
+        'assignee': Filtre('assignee_id', entier, multiple=True),
+        'date_limite_apres': Filtre('date_limite__gte', jour),
+        'date_limite_avant': Filtre('date_limite__lte', jour),
+        'date_creation_apres': Filtre('date_creation__gte', instant),
+        'date_creation_avant': Filtre('date_creation__lte', instant),
+        'en_retard': Filtre(None, booleen, condition=en_retard),
+    }
+    ordering_fields = ['date_limite', 'date_creation', 'statut', 'nom', 'id']
+
     # le filtre des tâches en fonction de l'utilisateur connecté
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser:
-            #  l'uitlisateur voit toutes les tâches
-            return Tache.objects.all()
-        else:
-            # le userr voit les tâches liées à ses projets et celles qui lui sont assignées
-            return Tache.objects.filter(projet__utilisateur=user) | Tache.objects.filter(assignee=user)
+        # le superuser voit toutes les tâches, les autres celles de leurs projets et leurs assignations
+        queryset = Tache.objects.visibles_par(self.request.user)
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # le rôle sur le projet est lu avec la tâche : pas de requête de plus pour les droits
+            queryset = queryset.avec_role(self.request.user)
+        return queryset
+
+    def get_object(self):
+        # update() et destroy() lisent l'objet avant la méthode parente : une seule requête
+        if not hasattr(self, '_objet'):
+            self._objet = super().get_object()
+        return self._objet
 
     # ✅ Associer automatiquement la tâche à un projet de l'utilisateur connecté
     def perform_create(self, serializer):
         projet = serializer.validated_data['projet']
+        user = self.request.user
 
-        # ✅ Vérifie que le projet appartient à l'utilisateur ou que l'utilisateur est superuser
-        if projet.utilisateur != self.request.user and not self.request.user.is_superuser:
+        # ✅ Vérifie que l'utilisateur est propriétaire ou éditeur du projet, ou superuser
+        if not peut_editer(user, Membre.objects.role_de(user, projet.pk)):
             raise ValidationError("Ce projet n'appartient pas à l'utilisateur connecté.")
 
         # ✅ Gestion de l'assignation
         assignee = serializer.validated_data.get('assignee', None)
-        if assignee:
-            # Seul le propriétaire du projet ou le superuser peut assigner une tâche
-            if projet.utilisateur != self.request.user and not self.request.user.is_superuser:
-                raise ValidationError("Vous ne pouvez pas assigner une tâche pour ce projet.")
-            # Vérifie si l'utilisateur assigné est actif
-            if not assignee.is_active:
-                raise ValidationError("L'utilisateur assigné doit être actif.")
+        # Vérifie si l'utilisateur assigné est actif
+        if assignee and not assignee.is_active:
+            raise ValidationError("L'utilisateur assigné doit être actif.")
 
         # ✅ Crée la tâche après vérification
         serializer.save()
 
+    # ✅ Déplacer une tâche demande aussi le droit d'écrire dans le projet d'arrivée
+    def perform_update(self, serializer):
+        projet = serializer.validated_data.get('projet')
+        user = self.request.user
+        if (projet is not None and projet.pk != serializer.instance.projet_id
+                and not peut_editer(user, Membre.objects.role_de(user, projet.pk))):
+            raise ValidationError("Ce projet n'appartient pas à l'utilisateur connecté.")
+        serializer.save()
+
     # ✅ Protection sur la modification
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Vérification que l'utilisateur est bien le propriétaire du projet ou le superuser
-        if instance.projet.utilisateur != request.user and not request.user.is_superuser:
+        # Vérification que l'utilisateur est propriétaire ou éditeur du projet, ou superuser
+        if not peut_editer(request.user, instance.role_acces):
             return Response({"detail": "Vous n'avez pas la permission de modifier cette tâche."},
                             status=status.HTTP_403_FORBIDDEN)
         return super().update(request, *args, **kwargs)
@@ -53,8 +119,547 @@ class TacheViewSet(viewsets.ModelViewSet):
     # Protection sur la suppression
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        # Vérification que l'utilisateur est bien le propriétaire du projet
-        if instance.projet.utilisateur != request.user and not request.user.is_superuser:
+        # Vérification que l'utilisateur est propriétaire ou éditeur du projet, ou superuser
+        if not peut_editer(request.user, instance.role_acces):
             return Response({"detail": "Vous n'avez pas la permission de supprimer cette tâche."},
                             status=status.HTTP_403_FORBIDDEN)
-        return super().destroy(request, *args, **kwargs)
\ No newline at end of file
+        return super().destroy(request, *args, **kwargs)
+
+    # nombre maximal d'opérations acceptées par /api/taches/bulk/
+    bulk_max_operations = 1000
+
+    # ✅ Création, modification et suppression en lot dans une seule transaction
+    # corps attendu : [{"action": "create", "data": {...}},
+    #                  {"action": "update", "id": 3, "data": {...}},
+    #                  {"action": "delete", "id": 4}]
+    @action(detail=False, methods=['POST'], url_path='bulk')
+    def bulk(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        if not isinstance(operations, list) or not operations:
+            raise ValidationError("Une liste d'opérations est attendue.")
+        if len(operations) > self.bulk_max_operations:
+            raise ValidationError(f"Au plus {self.bulk_max_operations} opérations par lot.")
+
+        user = request.user
+        resultats = [None] * len(operations)
+        creations, modifications, suppressions = [], [], []
+
+        # 1) validation des champs, sans aucune requête
+        ids_vus = set()
+        for index, operation in enumerate(operations):
+            operation = operation if isinstance(operation, dict) else {}
+            action_lot = operation.get('action')
+            if action_lot not in ('create', 'update', 'delete'):
+                resultats[index] = self._erreur_lot(index, action_lot, status.HTTP_400_BAD_REQUEST,
+                                                    {"action": ["Action inconnue."]})
+                continue
+            if action_lot != 'create':
+                tache_id = operation.get('id')
+                # bool est un int pour Python : « "id": true » désignerait la tâche 1
+                if not isinstance(tache_id, int) or isinstance(tache_id, bool) or tache_id in ids_vus:
+                    resultats[index] = self._erreur_lot(index, action_lot, status.HTTP_400_BAD_REQUEST,
+                                                        {"id": ["Identifiant manquant ou répété."]})
+                    continue
+                ids_vus.add(tache_id)
+            if action_lot == 'delete':
+                suppressions.append((index, tache_id))
+                continue
+            data = operation.get('data')
+            if not isinstance(data, dict):
+                resultats[index] = self._erreur_lot(index, action_lot, status.HTTP_400_BAD_REQUEST,
+                                                    {"data": ["Un objet avec les champs de la tâche est attendu."]})
+                continue
+            serializer = TacheBulkSerializer(data=data, partial=action_lot == 'update')
+            if not serializer.is_valid():
+                resultats[index] = self._erreur_lot(index, action_lot, status.HTTP_400_BAD_REQUEST,
+                                                    serializer.errors)
+            elif action_lot == 'create':
+                creations.append((index, serializer.validated_data))
+            else:
+                modifications.append((index, tache_id, serializer.validated_data))
+
+        # 2) une requête par table pour toutes les références du lot
+        taches = self.get_queryset().in_bulk([tache_id for _, tache_id, _ in modifications]
+                                             + [tache_id for _, tache_id in suppressions])
+        projet_ids = {data['projet'] for _, data in creations}
+        projet_ids |= {data['projet'] for _, _, data in modifications if 'projet' in data}
+        projet_ids |= {tache.projet_id for tache in taches.values()}
+        projets = Projet.objects.in_bulk(projet_ids)
+        membres = Membre.objects.par_projet(projets)
+        assignee_ids = {data['assignee'] for _, data in creations if data.get('assignee')}
+        assignee_ids |= {data['assignee'] for _, _, data in modifications if data.get('assignee')}
+        assignees = Utilisateur.objects.in_bulk(assignee_ids)
+
+        def resoudre(index, action_lot, data):
+            # remplace les ids par les objets déjà chargés
+            erreurs = {}
+            for champ, objets in (('projet', projets), ('assignee', assignees)):
+                pk = data.get(champ)
+                if pk is None:
+                    continue
+                if pk not in objets:
+                    message = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+                    erreurs[champ] = [message.format(pk_value=pk)]
+                else:
+                    data[champ] = objets[pk]
+            if erreurs:
+                resultats[index] = self._erreur_lot(index, action_lot, status.HTTP_400_BAD_REQUEST, erreurs)
+                return False
+            return True
+
+        def editable(projet):
+            return peut_editer(user, membres[projet.pk].get(user.id))
+
+        def visible_par(projet_id, assignee_id):
+            return {*membres[projet_id], assignee_id}
+
+        # 3) règles de TacheViewSet appliquées à tout le lot
+        # utilisateurs dont la version (ETag) change avec ce lot
+        concernes = set()
+        # {(projet_id, statut): +/- n} pour les compteurs des projets
+        compteurs = Counter()
+        nouvelles = []
+        for index, data in creations:
+            if not resoudre(index, 'create', data):
+                continue
+            if not editable(data['projet']):
+                resultats[index] = self._erreur_lot(index, 'create', status.HTTP_400_BAD_REQUEST,
+                                                    ["Ce projet n'appartient pas à l'utilisateur connecté."])
+            elif data.get('assignee') and not data['assignee'].is_active:
+                resultats[index] = self._erreur_lot(index, 'create', status.HTTP_400_BAD_REQUEST,
+                                                    ["L'utilisateur assigné doit être actif."])
+            else:
+                tache = Tache(**data)
+                nouvelles.append((index, tache))
+                compteurs[(tache.projet_id, tache.statut)] += 1
+                concernes |= visible_par(data['projet'].pk, data.get('assignee') and data['assignee'].pk)
+
+        modifiees, champs_modifies = [], set()
+        # tache_id -> utilisateurs qui ne la voient plus après une réassignation
+        retraits = {}
+        maintenant = timezone.now()
+        for index, tache_id, data in modifications:
+            tache = taches.get(tache_id)
+            if tache is None:
+                resultats[index] = self._erreur_lot(index, 'update', status.HTTP_404_NOT_FOUND,
+                                                    {"detail": "Pas trouvé."})
+            elif not resoudre(index, 'update', data):
+                continue
+            elif not editable(projets[tache.projet_id]):
+                resultats[index] = self._erreur_lot(
+                    index, 'update', status.HTTP_403_FORBIDDEN,
+                    {"detail": "Vous n'avez pas la permission de modifier cette tâche."})
+            elif 'projet' in data and not editable(data['projet']):
+                resultats[index] = self._erreur_lot(index, 'update', status.HTTP_400_BAD_REQUEST,
+                                                    ["Ce projet n'appartient pas à l'utilisateur connecté."])
+            else:
+                avant = visible_par(tache.projet_id, tache.assignee_id)
+                compteurs[(tache.projet_id, tache.statut)] -= 1
+                for champ, valeur in data.items():
+                    setattr(tache, champ, valeur)
+                compteurs[(tache.projet_id, tache.statut)] += 1
+                # bulk_update ne remplit pas les champs auto_now
+                tache.date_modification = maintenant
+                champs_modifies.update(data, ['date_modification'])
+                modifiees.append((index, tache))
+                apres = visible_par(tache.projet_id, tache.assignee_id)
+                concernes |= avant | apres
+                if avant - apres:
+                    retraits[tache_id] = avant - apres
+
+        supprimees = []
+        for index, tache_id in suppressions:
+            tache = taches.get(tache_id)
+            if tache is None:
+                resultats[index] = self._erreur_lot(index, 'delete', status.HTTP_404_NOT_FOUND,
+                                                    {"detail": "Pas trouvé."})
+            elif not editable(projets[tache.projet_id]):
+                resultats[index] = self._erreur_lot(
+                    index, 'delete', status.HTTP_403_FORBIDDEN,
+                    {"detail": "Vous n'avez pas la permission de supprimer cette tâche."})
+            else:
+                supprimees.append((index, tache_id))
+
+        # le lot est atomique : une seule erreur et rien n'est appliqué
+        if any(resultat is not None for resultat in resultats):
+            for index, resultat in enumerate(resultats):
+                if resultat is None:
+                    resultats[index] = self._erreur_lot(
+                        index, operations[index]['action'], status.HTTP_424_FAILED_DEPENDENCY,
+                        {"detail": "Non appliquée : une autre opération du lot a échoué."})
+            return Response({'resultats': resultats}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 4) écriture en lot dans une seule transaction
+        with transaction.atomic():
+            if nouvelles:
+                Tache.objects.bulk_create([tache for _, tache in nouvelles])
+            if modifiees:
+                Tache.objects.bulk_update([tache for _, tache in modifiees], sorted(champs_modifies))
+                for tache_id, anciens in retraits.items():
+                    enregistrer_suppressions('tache', tache_id, anciens, superusers=False)
+            if nouvelles or modifiees:
+                # bulk_create/bulk_update n'envoient pas de signaux
+                Projet.objects.ajuster_compteurs(compteurs)
+                incrementer_versions(*concernes)
+                for action_lot, lot in (('create', nouvelles), ('update', modifiees)):
+                    for _, tache in lot:
+                        publier_tache(tache, action_lot, visible_par(tache.projet_id, tache.assignee_id),
+                                      retraits.get(tache.pk, ()))
+            if supprimees:
+                # delete() envoie post_delete pour chaque tâche (versions incrémentées par les signaux)
+                Tache.objects.filter(id__in=[tache_id for _, tache_id in supprimees]).delete()
+
+        for index, tache in nouvelles:
+            resultats[index] = {'index': index, 'action': 'create', 'status': status.HTTP_201_CREATED,
+                                'data': TacheSerializer(tache).data}
+        for index, tache in modifiees:
+            resultats[index] = {'index': index, 'action': 'update', 'status': status.HTTP_200_OK,
+                                'data': TacheSerializer(tache).data}
+        for index, tache_id in supprimees:
+            resultats[index] = {'index': index, 'action': 'delete', 'status': status.HTTP_204_NO_CONTENT,
+                                'id': tache_id}
+        return Response({'resultats': resultats}, status=status.HTTP_200_OK)
+
+    # ✅ Import CSV de tâches dans les projets de l'utilisateur, fichier multipart « fichier »
+    # mis en file (202) : le rapport se lit ensuite sur /api/imports/<id>/
+    @action(detail=False, methods=['POST'], url_path='import', parser_classes=[MultiPartParser])
+    def importer(self, request):
+        return accepter_import(request, 'taches')
+
+    @staticmethod
+    def _erreur_lot(index, action_lot, code, erreurs):
+        return {'index': index, 'action': action_lot, 'status': code, 'errors': erreurs}
+
+# alias SQL des statuts (les alias ne peuvent pas contenir d'espaces)
+ALIAS_STATUTS = {
+    'À faire': 'a_faire',
+    'En cours': 'en_cours',
+    'Terminé': 'termine',
+}
+
+
+# comptages par statut calculés dans une seule requête (COUNT ... FILTER)
+def _comptages_par_statut():
+    return {alias: Count('id', filter=Q(statut=statut)) for statut, alias in ALIAS_STATUTS.items()}
+
+
+def _par_statut(ligne):
+    return {statut: ligne[alias] for statut, alias in ALIAS_STATUTS.items()}
+
+
+def _pourcentage(terminees, total):
+    return round(terminees * 100 / total) if total else 0
+
+
+# statistiques des tableaux de bord calculées côté base de données
+class StatistiquesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        aujourd_hui = timezone.localdate()
+        en_retard = Q(date_limite__lt=aujourd_hui) & ~Q(statut='Terminé')
+
+        taches = Tache.objects.visibles_par(user)
+        projets = Projet.objects.visibles_par(user)
+
+        # un seul agrégat pour les tâches et un seul pour les projets
+        stats_taches = taches.aggregate(
+            total=Count('id'),
+            en_retard=Count('id', filter=en_retard),
+            **_comptages_par_statut(),
+        )
+        stats_projets = projets.aggregate(
+            total=Count('id'),
+            en_retard=Count('id', filter=en_retard),
+            **_comptages_par_statut(),
+        )
+
+        # détail par projet avec un GROUP BY sur le projet
+        par_projet = (
+            taches.order_by()
+            .values('projet', 'projet__nom')
+            .annotate(total=Count('id'), en_retard=Count('id', filter=en_retard), **_comptages_par_statut())
+            .order_by('projet')
+        )
+
+        return Response({
+            'taches': {
+                'total': stats_taches['total'],
+                'par_statut': _par_statut(stats_taches),
+                'pourcentage_terminees': _pourcentage(stats_taches['termine'], stats_taches['total']),
+                'en_retard': stats_taches['en_retard'],
+            },
+            'projets': {
+                'total': stats_projets['total'],
+                'par_statut': _par_statut(stats_projets),
+                'en_retard': stats_projets['en_retard'],
+            },
+            'par_projet': [
+                {
+                    'projet': ligne['projet'],
+                    'nom': ligne['projet__nom'],
+                    'total': ligne['total'],
+                    'par_statut': _par_statut(ligne),
+                    'pourcentage_terminees': _pourcentage(ligne['termine'], ligne['total']),
+                    'en_retard': ligne['en_retard'],
+                }
+                for ligne in par_projet
+            ],
+        })
+
+
+# import CSV envoyé à l'API : le fichier est mis en file pour manage.py traiter_imports
+# (un import de comptes hache les mots de passe pendant des minutes, pas dans la requête)
+def accepter_import(request, type_import):
+    fichier = request.FILES.get('fichier')
+    if fichier is None:
+        return Response({'fichier': ["Un fichier CSV est attendu."]}, status=status.HTTP_400_BAD_REQUEST)
+    import_csv = mettre_en_attente(type_import, request.user, fichier)
+    return Response(ImportCSVSerializer(import_csv).data, status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': reverse('import-csv', args=[import_csv.pk])})
+
+
+# suivi d'un import : /api/imports/<id>/ (son auteur ou un superuser)
+class ImportCSVView(SerialisationMesureeMixin, RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ImportCSVSerializer
+
+    def get_queryset(self):
+        if self.request.user.is_superuser:
+            return ImportCSV.objects.all()
+        return ImportCSV.objects.filter(demandeur=self.request.user)
+
+
+# recherche plein texte : /api/recherche/?q=...&limite=20
+class RechercheView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        texte = request.query_params.get('q', '').strip()
+        try:
+            limite = min(int(request.query_params.get('limite', 20)), 100)
+        except ValueError:
+            raise ValidationError({"limite": "Un entier est attendu."})
+        if not texte:
+            return Response({'taches': [], 'projets': []})
+
+        with mesurer('serialisation', hors_sql=True):
+            return Response({
+                'taches': TacheSerializer(rechercher_taches(request.user, texte, limite), many=True).data,
+                'projets': ProjetSerializer(rechercher_projets(request.user, texte, limite), many=True).data,
+            })
+
+
+# tableau de bord en un seul appel : profil, projets avec leurs tâches, tâches assignées et compteurs
+# nombre de requêtes fixe : version (ETag), projets, tâches des projets, tâches assignées, agrégat
+class TableauDeBordView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return get_conditionnel(request, self.tableau)
+
+    def tableau(self, request):
+        user = request.user
+        aujourd_hui = timezone.localdate()
+        en_retard = Q(date_limite__lt=aujourd_hui) & ~Q(statut='Terminé')
+
+        projets = list(
+            Projet.objects.visibles_par(user)
+            .order_by('date_creation', 'id')
+            .prefetch_related(Prefetch('taches', queryset=Tache.objects.order_by('date_creation', 'id')))
+        )
+        assignees = Tache.objects.filter(assignee=user).select_related('projet').order_by('date_limite', 'id')
+        stats_taches = Tache.objects.visibles_par(user).aggregate(
+            total=Count('id'),
+            en_retard=Count('id', filter=en_retard),
+            assignees=Count('id', filter=Q(assignee=user)),
+            **_comptages_par_statut(),
+        )
+
+        # les compteurs des projets se calculent sur la liste déjà chargée
+        projets_par_statut = {statut: 0 for statut in ALIAS_STATUTS}
+        projets_en_retard = 0
+        for projet in projets:
+            projets_par_statut[projet.statut] = projets_par_statut.get(projet.statut, 0) + 1
+            if projet.date_limite and projet.date_limite < aujourd_hui and projet.statut != 'Terminé':
+                projets_en_retard += 1
+
+        contexte = {'request': request}
+        with mesurer('serialisation', hors_sql=True):
+            donnees = {
+                'utilisateur': UtilisateurSerializer(user, context=contexte).data,
+                'projets': ProjetSerializer(projets, many=True, expand=('taches',), context=contexte).data,
+                'taches_assignees': TacheSerializer(assignees, many=True, expand=('projet',),
+                                                    context=contexte).data,
+            }
+        return Response({
+            **donnees,
+            'compteurs': {
+                'taches': {
+                    'total': stats_taches['total'],
+                    'par_statut': _par_statut(stats_taches),
+                    'pourcentage_terminees': _pourcentage(stats_taches['termine'], stats_taches['total']),
+                    'en_retard': stats_taches['en_retard'],
+                    'assignees': stats_taches['assignees'],
+                },
+                'projets': {
+                    'total': len(projets),
+                    'par_statut': projets_par_statut,
+                    'en_retard': projets_en_retard,
+                },
+            },
+        })
+
+
+# synchronisation incrémentale : /api/sync/?since=<jeton>
+# renvoie ce qui a changé depuis le jeton, les ids supprimés et un nouveau jeton
+class SynchronisationView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        # le jeton est pris avant les lectures : rien ne passe entre deux synchronisations
+        maintenant = timezone.now()
+        user = request.user
+        jeton = request.query_params.get('since')
+        depuis = None
+        if jeton:
+            depuis = decoder_jeton(jeton)
+            if depuis is None:
+                raise ValidationError({"since": "Jeton de synchronisation invalide."})
+
+        projets = Projet.objects.visibles_par(user).order_by('id')
+        taches = Tache.objects.visibles_par(user).order_by('id')
+        # sans jeton, ou jeton plus vieux que le journal des suppressions : tout recharger
+        complet = depuis is None or depuis < maintenant - RETENTION
+        supprimes = {'projet': set(), 'tache': set()}
+        if not complet:
+            limite = depuis - MARGE
+            # un projet rejoint depuis le jeton arrive avec toutes ses tâches
+            rejoints = Membre.objects.filter(utilisateur=user, date_ajout__gte=limite).values('projet_id')
+            projets = projets.filter(Q(date_modification__gte=limite) | Q(pk__in=rejoints))
+            taches = taches.filter(Q(date_modification__gte=limite) | Q(projet__in=rejoints))
+            supprimes = suppressions_pour(user, limite)
+
+        with mesurer('serialisation', hors_sql=True):
+            projets = ProjetSerializer(projets, many=True).data
+            taches = TacheSerializer(taches, many=True).data
+        # un objet redevenu visible après un tombstone est renvoyé, pas supprimé
+        supprimes['projet'] -= {projet['id'] for projet in projets}
+        supprimes['tache'] -= {tache['id'] for tache in taches}
+
+        return Response({
+            'jeton': encoder_jeton(maintenant),
+            'complet': complet,
+            'projets': projets,
+            'taches': taches,
+            'suppressions': {
+                'projets': sorted(supprimes['projet']),
+                'taches': sorted(supprimes['tache']),
+            },
+        })
+
+
+def _empreinte(ticket):
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+def _consommer_ticket(ticket):
+    # à usage unique : le premier worker qui le supprime ouvre le flux
+    ligne = (TicketEvenements.objects.select_related('utilisateur')
+             .filter(empreinte=_empreinte(ticket), expiration__gt=timezone.now()).first())
+    if ligne is None or not TicketEvenements.objects.filter(pk=ligne.pk).delete()[0]:
+        return None, None
+    if not ligne.utilisateur.is_active:
+        return None, None
+    return ligne.utilisateur, ligne.fin_acces.timestamp()
+
+
+async def _authentifier(request):
+    # en-tête Authorization, ou ticket de /api/evenements/ticket/ pour EventSource (sans en-tête)
+    authentification = JWTAuthenticationCache()
+    entete = authentification.get_header(request)
+    if entete is None:
+        ticket = request.GET.get('ticket')
+        return await sync_to_async(_consommer_ticket)(ticket) if ticket else (None, None)
+    brut = authentification.get_raw_token(entete)
+    if not brut:
+        return None, None
+    try:
+        jeton = authentification.get_validated_token(brut)
+        return await sync_to_async(authentification.get_user)(jeton), jeton['exp']
+    except (InvalidToken, AuthenticationFailed):
+        return None, None
+
+
+def _compte_actif(user_id):
+    # lu en base, pas dans le cache d'authentification (propre à chaque processus)
+    return Utilisateur.objects.filter(pk=user_id, is_active=True).exists()
+
+
+async def _flux(user, expiration):
+    abonnement = broker.abonner([cle_version(user)])
+    prochaine_verification = time.monotonic() + CONFIG_EVENEMENTS['REVERIFICATION']
+    try:
+        # jeton de /api/sync/ : de quoi rattraper ce qui précède l'abonnement (ou une coupure)
+        yield message_sse('pret', {'jeton': encoder_jeton(timezone.now())})
+        while True:
+            # jeton expiré ou compte désactivé : le client se reconnecte avec un nouveau jeton
+            if time.time() >= expiration:
+                yield message_sse('expire', {})
+                return
+            if time.monotonic() >= prochaine_verification:
+                if not await sync_to_async(_compte_actif)(user.pk):
+                    yield message_sse('expire', {})
+                    return
+                prochaine_verification = time.monotonic() + CONFIG_EVENEMENTS['REVERIFICATION']
+            attente = min(CONFIG_EVENEMENTS['KEEPALIVE'], max(expiration - time.time(), 0))
+            try:
+                message = await asyncio.wait_for(abonnement.file.get(), attente)
+            except asyncio.TimeoutError:
+                yield b': keepalive\n\n'
+                continue
+            if abonnement.deborde:
+                # client trop lent : il doit repasser par /api/sync/
+                yield message_sse('resync', {})
+                return
+            yield message
+    finally:
+        broker.desabonner(abonnement)
+
+
+# flux d'événements temps réel (Server-Sent Events) : /api/evenements/
+async def flux_evenements(request):
+    # sous WSGI, le flux infini serait lu en entier avant l'envoi : la requête ne finirait jamais
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "Flux disponible uniquement avec le serveur ASGI (daphne, uvicorn)."},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+    user, expiration = await _authentifier(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentification requise."}, status=status.HTTP_401_UNAUTHORIZED)
+    reponse = StreamingHttpResponse(_flux(user, expiration), content_type='text/event-stream')
+    reponse['Cache-Control'] = 'no-cache'
+    # pas de mise en tampon par un proxy nginx
+    reponse['X-Accel-Buffering'] = 'no'
+    return reponse
+
+
+# ticket d'ouverture du flux : POST /api/evenements/ticket/ puis /api/evenements/?ticket=...
+class TicketEvenementsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        maintenant = timezone.now()
+        # le flux ne survit pas au jeton d'accès qui a demandé le ticket
+        if request.auth is not None:
+            fin_acces = datetime.fromtimestamp(request.auth['exp'], tz=dt_timezone.utc)
+        else:
+            fin_acces = maintenant + api_settings.ACCESS_TOKEN_LIFETIME
+        ticket = secrets.token_urlsafe(32)
+        TicketEvenements.objects.filter(expiration__lte=maintenant).delete()
+        TicketEvenements.objects.create(
+            empreinte=_empreinte(ticket), utilisateur=request.user, fin_acces=fin_acces,
+            expiration=maintenant + timedelta(seconds=CONFIG_EVENEMENTS['TICKET_TTL']),
+        )
+        return Response({'ticket': ticket, 'expire_dans': CONFIG_EVENEMENTS['TICKET_TTL']},
+                        status=status.HTTP_201_CREATED)
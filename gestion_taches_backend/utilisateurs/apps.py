@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class UtilisateursConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'utilisateurs'
+
+    def ready(self):
+        # branche les signaux d'invalidation du cache
+        from . import signals  # noqa: F401
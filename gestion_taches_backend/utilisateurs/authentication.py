@@ -0,0 +1,152 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+CONFIG = {
+    'TAILLE_MAX': 1024,   # nombre d'utilisateurs gardés par processus
+    'TTL': 300,           # durée de vie d'une entrée, en secondes
+    'CACHE_PARTAGE': None,  # alias d'un cache Django partagé entre workers (optionnel)
+    **getattr(settings, 'JWT_CACHE_UTILISATEURS', {}),
+}
+
+
+class CacheLRU:
+    """Petit cache LRU borné avec expiration, sûr entre threads.
+
+    Chaque clé a aussi une version d'authentification, incrémentée par
+    invalider() : une entrée écrite avec une version antérieure n'est plus lue.
+    """
+
+    def __init__(self, taille_max, ttl):
+        self.taille_max = taille_max
+        self.ttl = ttl
+        self._entrees = OrderedDict()
+        self._versions = {}
+        self._verrou = threading.Lock()
+
+    def get(self, cle):
+        """Renvoie (valeur ou None, version courante de la clé)."""
+        with self._verrou:
+            version = self._versions.get(cle, 0)
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None, version
+            valeur, version_entree, expiration = entree
+            if expiration < time.monotonic() or version_entree != version:
+                del self._entrees[cle]
+                return None, version
+            self._entrees.move_to_end(cle)
+            return valeur, version
+
+    def set(self, cle, valeur, version):
+        with self._verrou:
+            self._entrees[cle] = (valeur, version, time.monotonic() + self.ttl)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+
+    def invalider(self, cle):
+        with self._verrou:
+            self._versions[cle] = self._versions.get(cle, 0) + 1
+            self._entrees.pop(cle, None)
+
+
+class CachePartage:
+    """Même interface que CacheLRU, au-dessus d'un cache Django (fichier, base, memcached...).
+
+    La version est une clé du même cache : une invalidation depuis un worker vaut
+    pour tous, et entrée et version se lisent en un seul aller-retour.
+    """
+
+    def __init__(self, alias, ttl):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    @staticmethod
+    def _cles(cle):
+        return f'jwt-utilisateur:{cle}', f'jwt-version:{cle}'
+
+    def get(self, cle):
+        cle_entree, cle_version = self._cles(cle)
+        valeurs = self.cache.get_many([cle_entree, cle_version])
+        version = valeurs.get(cle_version, 0)
+        entree = valeurs.get(cle_entree)
+        if entree is None or entree[1] != version:
+            return None, version
+        return entree[0], version
+
+    def set(self, cle, valeur, version):
+        self.cache.set(self._cles(cle)[0], (valeur, version), self.ttl)
+
+    def invalider(self, cle):
+        cle_entree, cle_version = self._cles(cle)
+        # la version n'expire pas ; add() crée la clé si incr() ne la trouve pas
+        try:
+            self.cache.incr(cle_version)
+        except ValueError:
+            if not self.cache.add(cle_version, 1, None):
+                self.cache.incr(cle_version)
+        self.cache.delete(cle_entree)
+
+
+if CONFIG['CACHE_PARTAGE']:
+    cache_utilisateurs = CachePartage(CONFIG['CACHE_PARTAGE'], CONFIG['TTL'])
+else:
+    cache_utilisateurs = CacheLRU(CONFIG['TAILLE_MAX'], CONFIG['TTL'])
+
+
+def invalider_utilisateur(user_id):
+    cache_utilisateurs.invalider(str(user_id))
+
+
+class JWTAuthenticationCache(JWTAuthentication):
+    """JWTAuthentication qui évite de recharger l'utilisateur à chaque requête.
+
+    Aucune requête SQL quand l'utilisateur est en cache : l'entrée est comparée à
+    sa version d'authentification, tenue dans le cache lui-même et incrémentée
+    par les signaux post_save / post_delete de Utilisateur seulement (les
+    écritures sur les tâches et projets ne la touchent pas). Avec CACHE_PARTAGE,
+    un compte désactivé ou un mot de passe changé vaut aussitôt pour tous les
+    workers ; avec le cache par processus, les autres workers gardent l'entrée
+    au plus TTL secondes.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user, version = cache_utilisateurs.get(str(user_id))
+        if user is None:
+            # premier passage ou utilisateur modifié : chargement et vérifications habituelles de simplejwt.
+            # La version est lue avant : une modification pendant le chargement rend l'entrée périmée.
+            user = super().get_user(validated_token)
+            cache_utilisateurs.set(str(user_id), user, version)
+        else:
+            self.verifier(user, validated_token)
+        # chaque requête reçoit sa propre copie de l'instance en cache
+        return copy.copy(user)
+
+    # mêmes contrôles que JWTAuthentication.get_user, sans requête SQL
+    @staticmethod
+    def verifier(user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
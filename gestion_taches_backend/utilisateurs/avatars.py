@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# tailles (en px) des miniatures WebP générées pour chaque avatar
+TAILLES_MINIATURES = getattr(settings, 'AVATAR_TAILLES_MINIATURES', (64, 128, 256))
+
+# pool borné : la génération des miniatures ne bloque jamais la requête
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AVATAR_MINIATURES_WORKERS', 2),
+    thread_name_prefix='miniatures',
+)
+
+
+def nom_miniature(nom, taille):
+    return f"{os.path.splitext(nom)[0]}_{taille}.webp"
+
+
+@deconstructible
+class StockageAvatars(FileSystemStorage):
+    """Stockage adressé par contenu : le nom du fichier est le SHA-256 de son contenu.
+
+    Un même fichier envoyé plusieurs fois n'est écrit qu'une seule fois, et ses
+    miniatures sont générées en arrière-plan après la première écriture.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        empreinte = hashlib.sha256()
+        for bloc in content.chunks():
+            empreinte.update(bloc)
+        dossier, nom = os.path.split(name)
+        name = os.path.join(dossier, empreinte.hexdigest() + os.path.splitext(nom)[1].lower())
+
+        # déjà présent : pas de nouvelle copie (ni de nouvelles miniatures)
+        if self.exists(name):
+            return name
+        name = super().save(name, content, max_length)
+        _executor.submit(self.generer_miniatures, name)
+        return name
+
+    def generer_miniatures(self, name):
+        try:
+            with self.open(name) as fichier:
+                image = Image.open(fichier)
+                image.load()
+            for taille in TAILLES_MINIATURES:
+                cible = nom_miniature(name, taille)
+                if self.exists(cible):
+                    continue
+                miniature = image.copy()
+                miniature.thumbnail((taille, taille))
+                tampon = BytesIO()
+                miniature.save(tampon, format='WEBP', quality=80)
+                # on passe par FileSystemStorage.save pour garder le nom de la variante
+                super().save(cible, ContentFile(tampon.getvalue()))
+            self.signaler_miniatures(name)
+        except Exception:
+            logger.exception("Échec de la génération des miniatures pour %s", name)
+
+    def signaler_miniatures(self, name):
+        # le profil (avatar_miniatures) change : nouvelle version pour les propriétaires de l'avatar.
+        # si la ligne n'est pas encore écrite, le post_save de l'utilisateur s'en charge
+        # (les miniatures existent déjà à ce moment-là)
+        # import local : utilisateurs.models importe ce module
+        from .models import Utilisateur
+        from .versions import incrementer_versions
+
+        user_ids = list(Utilisateur.objects.filter(avatar=name).values_list('pk', flat=True))
+        if user_ids:
+            incrementer_versions(*user_ids)
+
+    def urls_miniatures(self, name):
+        # seules les miniatures déjà générées sont renvoyées
+        return {
+            str(taille): self.url(nom_miniature(name, taille))
+            for taille in TAILLES_MINIATURES
+            if self.exists(nom_miniature(name, taille))
+        }
+
+
+stockage_avatars = StockageAvatars()
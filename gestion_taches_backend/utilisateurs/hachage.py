@@ -0,0 +1,134 @@
+"""Vues asynchrones pour les opérations qui hachent des mots de passe.
+
+Sous ASGI, Django exécute toutes les vues synchrones sur un même thread :
+un PBKDF2 de plusieurs dizaines de millisecondes bloque donc tout le worker.
+Ici la vue synchrone d'origine tourne dans un pool de threads borné
+(hashlib libère le GIL pendant le PBKDF2) et la boucle d'événements reste
+libre. Quand le pool et sa file d'attente sont pleins, on répond 503 au lieu
+d'accumuler les requêtes.
+"""
+import asyncio
+import atexit
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+CONFIG = {
+    'ACTIF': True,                   # False : comportement Django habituel (thread unique)
+    'WORKERS': os.cpu_count() or 2,  # hachages en parallèle
+    'FILE_MAX': 64,                  # requêtes en attente au-delà des workers
+    **getattr(settings, 'HACHAGE_ASYNC', {}),
+}
+
+_executor = ThreadPoolExecutor(max_workers=CONFIG['WORKERS'], thread_name_prefix='hachage')
+
+
+class Limiteur:
+    """Compte les requêtes en cours (exécution + attente) et refuse au-delà de la limite."""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.en_cours = 0
+        self._verrou = threading.Lock()
+
+    def acquerir(self):
+        with self._verrou:
+            if self.en_cours >= self.limite:
+                return False
+            self.en_cours += 1
+            return True
+
+    def liberer(self):
+        with self._verrou:
+            self.en_cours -= 1
+
+
+limiteur = Limiteur(CONFIG['WORKERS'] + CONFIG['FILE_MAX'])
+
+
+def _executer(vue, request, *args, **kwargs):
+    # même cycle de vie des connexions que pour une requête synchrone
+    close_old_connections()
+    try:
+        reponse = vue(request, *args, **kwargs)
+        if hasattr(reponse, 'render'):
+            reponse.render()
+        return reponse
+    finally:
+        close_old_connections()
+
+
+def vue_async(vue):
+    """Transforme une vue synchrone (APIView.as_view()) en vue asynchrone bornée."""
+
+    @csrf_exempt
+    @wraps(vue)
+    async def vue_asynchrone(request, *args, **kwargs):
+        # lu à chaque appel pour pouvoir le désactiver (override_settings dans les tests)
+        if not getattr(settings, 'HACHAGE_ASYNC', CONFIG).get('ACTIF', True):
+            return await sync_to_async(vue)(request, *args, **kwargs)
+        if not limiteur.acquerir():
+            reponse = JsonResponse({'detail': "Serveur surchargé, réessayez dans un instant."}, status=503)
+            reponse['Retry-After'] = '1'
+            return reponse
+        try:
+            boucle = asyncio.get_running_loop()
+            # le contexte suit la vue dans le pool (mesure SQL de gestion_taches/metriques.py)
+            contexte = contextvars.copy_context()
+            return await boucle.run_in_executor(
+                _executor, lambda: contexte.run(_executer, vue, request, *args, **kwargs))
+        finally:
+            limiteur.liberer()
+
+    return vue_asynchrone
+
+
+# imports en masse (manage.py importer_csv / traiter_imports) : pools de processus par
+# nombre de workers, créés au premier appel et arrêtés à la sortie du processus
+_pools_processus = {}
+_verrou_pools = threading.Lock()
+
+
+@atexit.register
+def arreter_pools_processus():
+    with _verrou_pools:
+        pools = list(_pools_processus.values())
+        _pools_processus.clear()
+    for pool in pools:
+        pool.shutdown(cancel_futures=True)
+
+
+def _initialiser_processus():
+    import django
+    django.setup()
+
+
+def hacher_mots_de_passe(mots, processus=None):
+    """Hache une liste de mots de passe (None : mot de passe inutilisable) sur plusieurs processus.
+
+    PBKDF2 coûte des centaines de millisecondes par mot de passe : pour un
+    import de plusieurs milliers de comptes, le calcul est réparti sur tous les
+    cœurs. 10 000 comptes demandent encore plusieurs minutes sur 8 cœurs, d'où
+    l'appel depuis les commandes d'import seulement, jamais pendant une requête.
+    Avec un seul processus, le hachage reste dans le processus courant.
+    """
+    processus = processus or os.cpu_count() or 1
+    if processus <= 1 or len(mots) <= 1:
+        return [make_password(mot) for mot in mots]
+    with _verrou_pools:
+        pool = _pools_processus.get(processus)
+        if pool is None:
+            # spawn : pas de fork d'un serveur multithread (verrous hérités)
+            pool = _pools_processus[processus] = ProcessPoolExecutor(
+                processus, mp_context=multiprocessing.get_context('spawn'), initializer=_initialiser_processus)
+    return list(pool.map(make_password, mots, chunksize=max(1, len(mots) // (processus * 4))))
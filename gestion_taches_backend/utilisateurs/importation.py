@@ -0,0 +1,58 @@
+from rest_framework.validators import UniqueValidator
+
+from gestion_taches.importation import CONFIG, Importeur
+from .hachage import hacher_mots_de_passe
+from .models import Utilisateur
+from .serializers import UtilisateurSerializer
+
+# champs de validation du changement de mot de passe, sans objet à l'import
+CHAMPS_IGNORES = ('confirm_password', 'current_password', 'new_password')
+
+
+class ImportUtilisateurs(Importeur):
+    """Comptes créés comme par InscriptionView : actifs, mot de passe haché.
+
+    Colonnes : username, password, first_name, last_name, email,
+    date_naissance, role. Sans mot de passe, le compte reçoit un mot de passe
+    inutilisable (à définir ensuite). Hors superuser, seuls des comptes
+    étudiants peuvent être importés.
+    """
+
+    serializer_class = UtilisateurSerializer
+
+    def __init__(self, user=None, taille_lot=None, processus=None):
+        super().__init__(user, taille_lot)
+        self.processus = processus or CONFIG['PROCESSUS']
+
+    def validateur(self):
+        validateur = super().validateur()
+        # l'unicité du nom est vérifiée une fois par lot, pas une requête par ligne
+        username = validateur.fields['username']
+        username.validators = [v for v in username.validators if not isinstance(v, UniqueValidator)]
+        validateur.fields['password'].required = False
+        return validateur
+
+    def preparer_lot(self, lot, rapport):
+        existants = set(Utilisateur.objects.filter(username__in=[data['username'] for _, data in lot])
+                        .values_list('username', flat=True))
+        valides = []
+        for numero, data in lot:
+            if data['username'] in existants:
+                rapport.erreur(numero, {'username': ["Un utilisateur avec ce nom existe déjà."]})
+            elif self.user is not None and not self.user.is_superuser and data.get('role', 'ETUDIANT') != 'ETUDIANT':
+                rapport.erreur(numero, {'role': ["Seuls des comptes étudiants peuvent être importés."]})
+            else:
+                # doublon plus bas dans le même lot
+                existants.add(data['username'])
+                valides.append(data)
+
+        mots_de_passe = hacher_mots_de_passe([data.pop('password', None) for data in valides], self.processus)
+        utilisateurs = []
+        for data, mot_de_passe in zip(valides, mots_de_passe):
+            for champ in CHAMPS_IGNORES:
+                data.pop(champ, None)
+            utilisateurs.append(Utilisateur(**data, password=mot_de_passe, is_active=True))
+        return utilisateurs
+
+    def enregistrer(self, objets):
+        Utilisateur.objects.bulk_create(objets)
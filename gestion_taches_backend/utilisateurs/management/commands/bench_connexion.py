@@ -0,0 +1,83 @@
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, override_settings
+
+from utilisateurs.hachage import CONFIG
+from utilisateurs.models import Utilisateur
+
+
+def centile(valeurs, p):
+    valeurs = sorted(valeurs)
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p / 100))]
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit de /api/token/ sous ASGI avec des clients concurrents (vue synchrone vs pool borné)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16)
+        parser.add_argument('--connexions', type=int, default=4, help="connexions par client")
+
+    def handle(self, *args, **options):
+        # base de test dans un fichier : les threads du pool doivent pouvoir l'ouvrir
+        dossier = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = str(Path(dossier) / 'bench.sqlite3')
+        ancien_nom = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            user = Utilisateur(username='bench', role='PROFESSEUR')
+            user.set_password('motdepasse-bench')
+            user.save()
+            for libelle, actif in (('vue synchrone (thread unique)', False), ('vue asynchrone (pool borné)', True)):
+                with override_settings(HACHAGE_ASYNC={**CONFIG, 'ACTIF': actif},
+                                       ALLOWED_HOSTS=['testserver']):
+                    resultats = asyncio.run(self.scenario(options['clients'], options['connexions']))
+                self.afficher(libelle, *resultats)
+        finally:
+            connection.creation.destroy_test_db(ancien_nom, verbosity=0)
+
+    async def scenario(self, nb_clients, nb_connexions):
+        client = AsyncClient()
+        jeton = (await client.post('/api/token/', {'username': 'bench', 'password': 'motdepasse-bench'})).json()
+        entetes = {'Authorization': f"Bearer {jeton['access']}"}
+        latences, latences_lecture = [], []
+        fini = asyncio.Event()
+
+        async def connecteur():
+            for _ in range(nb_connexions):
+                t0 = time.perf_counter()
+                reponse = await client.post('/api/token/', {'username': 'bench', 'password': 'motdepasse-bench'})
+                assert reponse.status_code == 200, reponse.status_code
+                latences.append(time.perf_counter() - t0)
+
+        # pendant la rafale de connexions, un client lit /api/utilisateurs/me/ en boucle
+        async def lecteur():
+            while not fini.is_set():
+                t0 = time.perf_counter()
+                await client.get('/api/utilisateurs/me/', headers=entetes)
+                latences_lecture.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.01)
+
+        tache_lecture = asyncio.create_task(lecteur())
+        debut = time.perf_counter()
+        await asyncio.gather(*(connecteur() for _ in range(nb_clients)))
+        duree = time.perf_counter() - debut
+        fini.set()
+        await tache_lecture
+        return duree, latences, latences_lecture
+
+    def afficher(self, libelle, duree, latences, latences_lecture):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {libelle}"))
+        self.stdout.write(f"connexions      {len(latences)} en {duree:.2f} s -> {len(latences) / duree:.1f} /s")
+        self.stdout.write(f"latence token   p50 {statistics.median(latences) * 1000:.0f} ms   "
+                          f"p95 {centile(latences, 95) * 1000:.0f} ms")
+        if latences_lecture:
+            self.stdout.write(f"latence /me     p50 {statistics.median(latences_lecture) * 1000:.0f} ms   "
+                              f"p95 {centile(latences_lecture, 95) * 1000:.0f} ms   "
+                              f"({len(latences_lecture)} lectures)")
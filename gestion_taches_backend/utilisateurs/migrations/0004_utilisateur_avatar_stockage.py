@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:19
+
+import utilisateurs.avatars
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilisateurs', '0003_utilisateur_date_naissance'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='utilisateur',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=utilisateurs.avatars.StockageAvatars(), upload_to='avatars/'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.5 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('utilisateurs', '0004_utilisateur_avatar_stockage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDonnees',
+            fields=[
+                ('cle', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+                ('date_modification', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from .avatars import stockage_avatars
 
 
 class Utilisateur(AbstractUser):
@@ -10,7 +11,7 @@ class Utilisateur(AbstractUser):
     )
 
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='ETUDIANT')
-    avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar = models.ImageField(upload_to='avatars/', storage=stockage_avatars, blank=True, null=True)
     date_naissance = models.DateField(null=True, blank=True)
 
     #  permissions et groupes
@@ -27,3 +28,14 @@ class Utilisateur(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+# compteur de version des données visibles par un utilisateur
+# (clé 'u:<id>' par utilisateur, 'tout' pour ce que voient les superusers)
+class VersionDonnees(models.Model):
+    cle = models.CharField(max_length=32, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    date_modification = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.cle} v{self.version}"
@@ -8,11 +8,13 @@ class UtilisateurSerializer(serializers.ModelSerializer):
     current_password = serializers.CharField(write_only=True, required=False)
     new_password = serializers.CharField(write_only=True, required=False)
     date_naissance = serializers.DateField(required=False, allow_null=True)
+    # miniatures WebP de l'avatar générées en arrière-plan, par taille en px
+    avatar_miniatures = serializers.SerializerMethodField()
 
     class Meta:
         model = Utilisateur
         fields = ['id', 'username', 'first_name', 'last_name', 'date_naissance',
-                  'email', 'password', 'avatar', 'role',
+                  'email', 'password', 'avatar', 'avatar_miniatures', 'role',
                   'confirm_password', 'current_password', 'new_password']
         extra_kwargs = {
             'password': {'write_only': True},
@@ -22,6 +24,25 @@ class UtilisateurSerializer(serializers.ModelSerializer):
             'avatar': {'required': False}
         }
 
+    def get_avatar_miniatures(self, obj):
+        if not obj.avatar:
+            return {}
+        urls = obj.avatar.storage.urls_miniatures(obj.avatar.name)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {taille: request.build_absolute_uri(url) for taille, url in urls.items()}
+        return urls
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # dans les listes, on ne renvoie jamais l'original : la plus grande miniature le remplace,
+        # ou rien tant qu'elles ne sont pas générées (ou si la génération a échoué)
+        view = self.context.get('view')
+        if view is not None and getattr(view, 'action', None) == 'list' and data['avatar']:
+            miniatures = data['avatar_miniatures']
+            data['avatar'] = miniatures[max(miniatures, key=int)] if miniatures else None
+        return data
+
     def validate(self, data):
         # Validation du changement de mot de passe
         if data.get('new_password'):
@@ -86,6 +107,13 @@ class UtilisateurSerializer(serializers.ModelSerializer):
         return instance
 
 
+# version courte d'un utilisateur, incluse dans les tâches et projets avec ?expand=
+class UtilisateurResumeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Utilisateur
+        fields = ['id', 'username', 'first_name', 'last_name']
+
+
 # Serializer pour obtenir le token JWT
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
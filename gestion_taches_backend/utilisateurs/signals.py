@@ -0,0 +1,30 @@
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalider_utilisateur
+from .models import Utilisateur
+from .versions import incrementer_versions
+
+
+def voient_le_resume(user_id, using):
+    # ?expand=assignee et ?expand=utilisateur incluent le résumé de l'utilisateur :
+    # membres des projets où il a des tâches et des projets dont il est propriétaire
+    # import local : projets et taches dépendent d'utilisateurs
+    from projets.models import Membre, Projet
+    from taches.models import Tache
+
+    projets = Q(projet__in=Tache.objects.using(using).filter(assignee_id=user_id).values('projet_id'))
+    projets |= Q(projet__in=Projet.objects.using(using).filter(utilisateur_id=user_id).values('pk'))
+    return set(Membre.objects.using(using).filter(projets).values_list('utilisateur_id', flat=True).distinct())
+
+
+# rôle, is_active ou mot de passe modifiés : l'utilisateur en cache est retiré
+# et son profil (/api/utilisateurs/me/) change de version
+@receiver(post_save, sender=Utilisateur)
+@receiver(post_delete, sender=Utilisateur)
+def invalider_cache_authentification(sender, instance, using, created=False, **kwargs):
+    invalider_utilisateur(instance.pk)
+    # après une suppression, ses tâches et projets sont partis avec lui (signaux de taches et projets)
+    autres = voient_le_resume(instance.pk, using) if kwargs['signal'] is post_save and not created else ()
+    incrementer_versions(instance.pk, *autres, using=using)
@@ -1,3 +1,148 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication, avatars, hachage
+from .authentication import CacheLRU, CachePartage
+from .models import Utilisateur
+from .versions import incrementer_versions
+
+
+class MiniaturesTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.user = Utilisateur.objects.create_user('etudiant', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_miniatures_changent_la_version_du_profil(self):
+        tampon = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(tampon, 'JPEG')
+        taches = []
+        # HACHAGE_ASYNC : la vue reste sur le thread de la transaction du test
+        with override_settings(MEDIA_ROOT=self.media, HACHAGE_ASYNC={'ACTIF': False}), \
+                mock.patch.object(avatars.stockage_avatars, 'location', self.media), \
+                mock.patch.object(avatars._executor, 'submit', lambda *args: taches.append(args)):
+            fichier = SimpleUploadedFile('photo.jpg', tampon.getvalue(), content_type='image/jpeg')
+            self.client.put('/api/utilisateurs/update_profile/', {'avatar': fichier}, format='multipart')
+            reponse = self.client.get('/api/utilisateurs/me/')
+            self.assertEqual(reponse.json()['avatar_miniatures'], {})
+
+            # la génération en arrière-plan se termine après la réponse
+            for fonction, *args in taches:
+                fonction(*args)
+            reponse = self.client.get('/api/utilisateurs/me/', HTTP_IF_NONE_MATCH=reponse['ETag'])
+            self.assertEqual(reponse.status_code, 200)
+            self.assertEqual(sorted(reponse.json()['avatar_miniatures'], key=int), ['64', '128', '256'])
+
+    def test_liste_sans_original(self):
+        tampon = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(tampon, 'JPEG')
+        taches = []
+        with override_settings(MEDIA_ROOT=self.media, HACHAGE_ASYNC={'ACTIF': False}), \
+                mock.patch.object(avatars.stockage_avatars, 'location', self.media), \
+                mock.patch.object(avatars._executor, 'submit', lambda *args: taches.append(args)):
+            fichier = SimpleUploadedFile('photo.jpg', tampon.getvalue(), content_type='image/jpeg')
+            self.client.put('/api/utilisateurs/update_profile/', {'avatar': fichier}, format='multipart')
+
+            def avatar_liste():
+                return next(user['avatar'] for user in self.client.get('/api/utilisateurs/').json()
+                            if user['id'] == self.user.pk)
+
+            # miniatures en cours de génération (ou génération échouée) : pas d'original dans la liste
+            self.assertIsNone(avatar_liste())
+            self.assertTrue(self.client.get('/api/utilisateurs/me/').json()['avatar'].endswith('.jpg'))
+            for fonction, *args in taches:
+                fonction(*args)
+            self.assertTrue(avatar_liste().endswith('.webp'))
+
+
+class AuthentificationCacheTests(TestCase):
+    def setUp(self):
+        self.user = Utilisateur.objects.create_user('etudiant', password='x')
+        # entrées partagées entre « workers » : deux CachePartage sur le même cache
+        self.cache = CachePartage('default', 300)
+        self.addCleanup(self.cache.invalider, str(self.user.pk))
+        patcher = mock.patch.object(authentication, 'cache_utilisateurs', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_revocation_depuis_un_autre_worker(self):
+        self.assertEqual(self.client.get('/api/utilisateurs/me/').status_code, 200)
+        # ce que fait le signal post_save dans un autre processus
+        Utilisateur.objects.filter(pk=self.user.pk).update(is_active=False)
+        CachePartage('default', 300).invalider(str(self.user.pk))
+        self.assertEqual(self.client.get('/api/utilisateurs/me/').status_code, 401)
+
+    def test_entree_reutilisee(self):
+        self.client.get('/api/utilisateurs/me/')
+        # seule la version des données (ETag) est lue : l'authentification ne fait pas de requête
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/utilisateurs/me/').status_code, 200)
+
+    def test_ecriture_de_donnees_garde_l_entree(self):
+        self.client.get('/api/utilisateurs/me/')
+        # une tâche ou un projet modifié change la version des données, pas celle de l'authentification
+        incrementer_versions(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/utilisateurs/me/').status_code, 200)
+
+    def test_chargement_concurrent(self):
+        # version lue, puis l'utilisateur est modifié pendant son chargement : l'entrée écrite est périmée
+        for cache in (self.cache, CacheLRU(8, 300)):
+            _, version = cache.get(str(self.user.pk))
+            cache.invalider(str(self.user.pk))
+            cache.set(str(self.user.pk), self.user, version)
+            self.assertEqual(cache.get(str(self.user.pk)), (None, version + 1))
+
+
+# TransactionTestCase : la vue s'exécute dans un thread du pool, avec sa propre connexion
+@override_settings(HACHAGE_ASYNC={'ACTIF': True})
+class HachageAsyncTests(TransactionTestCase):
+    def setUp(self):
+        self.threads = []
+        executer = hachage._executer
+
+        def executer_espion(*args, **kwargs):
+            self.threads.append(threading.current_thread().name)
+            return executer(*args, **kwargs)
+
+        patcher = mock.patch.object(hachage, '_executer', executer_espion)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_inscription_puis_jeton(self):
+        reponse = self.client.post('/api/inscription/', {
+            'username': 'etudiant', 'email': 'etudiant@example.com', 'password': 'motdepasse',
+            'confirm_password': 'motdepasse',
+        }, content_type='application/json')
+        self.assertEqual(reponse.status_code, 201)
+
+        reponse = self.client.post('/api/token/', {'username': 'etudiant', 'password': 'motdepasse'},
+                                   content_type='application/json')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertIn('access', reponse.json())
+        # les deux vues sont passées par le pool
+        self.assertEqual(len(self.threads), 2)
+        self.assertTrue(all(nom.startswith('hachage') for nom in self.threads))
+        # et ont rendu leur place au limiteur
+        self.assertEqual(hachage.limiteur.en_cours, 0)
+
+    def test_pool_sature(self):
+        with mock.patch.object(hachage, 'limiteur', hachage.Limiteur(0)):
+            reponse = self.client.post('/api/token/', {'username': 'etudiant', 'password': 'x'},
+                                       content_type='application/json')
+        self.assertEqual(reponse.status_code, 503)
+        self.assertEqual(reponse['Retry-After'], '1')
+        self.assertEqual(self.threads, [])
@@ -0,0 +1,84 @@
+import hashlib
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from gestion_taches.cache_reponses import invalider
+from .models import VersionDonnees
+
+# version partagée par tous les superusers (ils voient toutes les données)
+CLE_GLOBALE = 'tout'
+
+
+def cle_version(user):
+    return CLE_GLOBALE if user.is_superuser else f'u:{user.pk}'
+
+
+def incrementer_versions(*user_ids, using=DEFAULT_DB_ALIAS):
+    """Invalide les ETags des utilisateurs donnés (et ceux des superusers)."""
+    cles = {CLE_GLOBALE} | {f'u:{user_id}' for user_id in user_ids if user_id}
+    versions = VersionDonnees.objects.using(using)
+    versions.bulk_create([VersionDonnees(cle=cle) for cle in cles], ignore_conflicts=True)
+    versions.filter(cle__in=cles).update(
+        version=F('version') + 1, date_modification=timezone.now()
+    )
+    # les réponses en cache de ces versions ne seront plus jamais lues
+    invalider(cles)
+
+
+def version_de(user):
+    ligne = VersionDonnees.objects.filter(cle=cle_version(user)).values_list('version', 'date_modification').first()
+    return ligne or (0, None)
+
+
+def version_de_requete(request):
+    # lue une seule fois par requête (ETag et cache des réponses)
+    if not hasattr(request, '_version_donnees'):
+        request._version_donnees = version_de(request.user)
+    return request._version_donnees
+
+
+def get_conditionnel(request, vue, *args, **kwargs):
+    """Répond 304 si l'ETag du client est à jour, sinon appelle la vue et ajoute ETag/Last-Modified.
+
+    L'ETag ne dépend que de la version de l'utilisateur et de l'URL : le 304
+    part sans exécuter la requête de la vue ni sérialiser quoi que ce soit.
+    """
+    version, date_modification = version_de_requete(request)
+    empreinte = hashlib.md5(
+        f"{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()[:16]
+    etag = f'"{request.user.pk}.{version}.{empreinte}"'
+    last_modified = int(date_modification.timestamp()) if date_modification else None
+
+    reponse = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if reponse is None:
+        reponse = vue(request, *args, **kwargs)
+        if reponse.status_code != 200:
+            return reponse
+
+    reponse['ETag'] = etag
+    if last_modified is not None:
+        reponse['Last-Modified'] = http_date(last_modified)
+    # le navigateur garde la réponse mais revalide à chaque fois
+    patch_cache_control(reponse, private=True, no_cache=True)
+    patch_vary_headers(reponse, ['Authorization'])
+    return reponse
+
+
+class GetConditionnelMixin:
+    """GET conditionnels (ETag / Last-Modified) pour list et retrieve.
+
+    À réserver aux vues dont les données sont couvertes par VersionDonnees
+    (projets, tâches et profil de l'utilisateur connecté).
+    """
+
+    def list(self, request, *args, **kwargs):
+        return get_conditionnel(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return get_conditionnel(request, super().retrieve, *args, **kwargs)
@@ -7,17 +7,20 @@ from .serializers import UtilisateurSerializer, CustomTokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from django.contrib.auth.hashers import check_password
+from gestion_taches.metriques import SerialisationMesureeMixin
+from .versions import get_conditionnel
 
 
-class UtilisateurViewSet(ModelViewSet):
+class UtilisateurViewSet(SerialisationMesureeMixin, ModelViewSet):
     queryset = Utilisateur.objects.all()
     serializer_class = UtilisateurSerializer
 
     @action(detail=False, methods=['GET'], permission_classes=[IsAuthenticated])
     def me(self, request):
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        # ETag basé sur la version du profil : 304 si rien n'a changé
+        return get_conditionnel(request, lambda request: Response(self.get_serializer(request.user).data))
 
     @action(detail=False, methods=['PUT'], permission_classes=[IsAuthenticated])
     def update_profile(self, request):
@@ -68,6 +71,19 @@ class UtilisateurViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    # import CSV de comptes (professeurs et superusers), fichier multipart « fichier »
+    # mis en file (202) : le rapport se lit ensuite sur /api/imports/<id>/
+    @action(detail=False, methods=['POST'], url_path='import', permission_classes=[IsAuthenticated],
+            parser_classes=[MultiPartParser])
+    def importer(self, request):
+        # import local : taches dépend de utilisateurs
+        from taches.views import accepter_import
+
+        if not (request.user.is_superuser or request.user.role == 'PROFESSEUR'):
+            return Response({"detail": "Vous n'avez pas la permission d'importer des comptes."},
+                            status=status.HTTP_403_FORBIDDEN)
+        return accepter_import(request, 'utilisateurs')
+
 
 # ici c une vue personnalisée pour le token JWT
 class CustomTokenObtainPairView(TokenObtainPairView):